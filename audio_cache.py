@@ -0,0 +1,306 @@
+"""Cache disque des AudioStore : répertoire central, clés validées, écritures atomiques et éviction LRU."""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+import weakref
+
+from audio_store import AudioStore
+
+try:
+    import fcntl
+except ImportError:      # Windows
+    fcntl = None
+    import msvcrt
+
+# À incrémenter à chaque changement du format des fichiers en cache
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+META_FILE = 'meta.json'
+STORE_BASE = 'audio'
+
+
+def default_cache_dir():
+    """Répertoire de cache utilisateur selon la plateforme (surchargeable par BEERTONE_CACHE_DIR)."""
+    env = os.environ.get('BEERTONE_CACHE_DIR')
+    if env:
+        return env
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'BeerToneGranular', 'cache')
+    if sys.platform == 'darwin':
+        return os.path.join(os.path.expanduser('~'), 'Library', 'Caches', 'BeerToneGranular')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'beertone-granular')
+
+
+def _lock_path(root, key):
+    return os.path.join(root, f'.{key}.lock')
+
+
+def _lock_key(root, key, shared=False, blocking=True):
+    """Verrouille l'entrée `key` entre processus (fichier `.<clé>.lock` de la racine).
+
+    Verrou exclusif pour construire ou évincer l'entrée, partagé pour la
+    lire. Retourne le descripteur à passer à `_unlock`, ou None si le
+    verrou est déjà pris et que `blocking` est faux. Sous Windows, seul le
+    verrou exclusif existe : un memmap ouvert y empêche déjà la suppression.
+    Le fichier de verrou est supprimé avec son entrée : un verrou obtenu
+    sur un fichier entre-temps supprimé est relâché et repris sur le
+    nouveau.
+    """
+    path = _lock_path(root, key)
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB))
+            elif not shared:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            if blocking:
+                raise
+            return None
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            current = None
+        held = os.fstat(fd)
+        if current is not None and (current.st_dev, current.st_ino) == (held.st_dev, held.st_ino):
+            return fd
+        _unlock(fd)
+
+
+def _unlock(fd):
+    if fcntl is None:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+    os.close(fd)
+
+
+class AudioCache:
+    """Cache des fichiers audio décodés, indépendant de l'emplacement des sources.
+
+    Chaque entrée est un dossier nommé d'après le chemin absolu, la taille et
+    la date de modification de la source : un fichier modifié obtient une
+    nouvelle clé, et l'ancienne entrée finit évincée. Les entrées sont
+    construites dans un dossier temporaire puis renommées d'un bloc, et la
+    taille totale est bornée par `max_bytes` (le moins récemment utilisé
+    part en premier). Plusieurs processus peuvent partager le cache : une
+    entrée est construite sous verrou exclusif, et un store ouvert garde un
+    verrou partagé sur son entrée, que l'éviction ne supprime donc pas. Les
+    bibliothèques en lecture seule ne sont jamais écrites.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, path):
+        st = os.stat(path)
+        ident = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|v{CACHE_FORMAT_VERSION}"
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+    def _meta_for(self, path):
+        st = os.stat(path)
+        return {
+            'version': CACHE_FORMAT_VERSION,
+            'source': os.path.abspath(path),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+        }
+
+    def _valid(self, entry, path):
+        try:
+            with open(os.path.join(entry, META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        expected = self._meta_for(path)
+        return all(meta.get(k) == v for k, v in expected.items())
+
+    def _read(self, entry, path):
+        if not self._valid(entry, path):
+            return None
+        try:
+            return AudioStore.load(os.path.join(entry, STORE_BASE))
+        except Exception:
+            return None
+
+    def load(self, path):
+        """Retourne l'AudioStore en cache pour `path`, ou None s'il est absent ou périmé.
+
+        Le store garde un verrou partagé sur son entrée jusqu'à sa libération.
+        """
+        key = self.key(path)
+        entry = os.path.join(self.root, key)
+        if not os.path.isdir(entry):
+            return None
+        try:
+            lock = _lock_key(self.root, key, shared=True)
+        except OSError:
+            lock = None          # racine en lecture seule : aucun autre processus n'y écrit
+        store = self._read(entry, path)
+        if lock is not None:
+            if store is None:
+                _unlock(lock)
+            else:
+                weakref.finalize(store, _unlock, lock)
+        if store is not None:
+            # Marque l'entrée comme récemment utilisée (ordre LRU)
+            try:
+                os.utime(os.path.join(entry, META_FILE))
+            except OSError:
+                pass
+        return store
+
+    def open(self, path, progress=None):
+        """Charge `path` depuis le cache, ou le décode et l'y ajoute."""
+        store = self.load(path)
+        if store is not None:
+            if progress is not None:
+                progress(1.0)
+            return store
+        try:
+            return self._build(path, progress)
+        except OSError:
+            # Cache inaccessible : memmap temporaire hors cache, supprimé avec le store
+            fd, tmp_path = tempfile.mkstemp(suffix='.samples.npy')
+            os.close(fd)
+            try:
+                store = AudioStore.from_file(path, samples_path=tmp_path, progress=progress)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            return store.delete_when_released()
+
+    def _build(self, path, progress):
+        os.makedirs(self.root, exist_ok=True)
+        key = self.key(path)
+        lock = _lock_key(self.root, key)
+        try:
+            # Un autre processus a pu construire l'entrée pendant l'attente du verrou
+            if not self._valid(os.path.join(self.root, key), path):
+                self._write_entry(path, key, progress)
+        finally:
+            _unlock(lock)
+        self.evict(keep=key)
+        store = self.load(path)
+        if store is None:
+            raise OSError(f"entrée de cache illisible pour {path}")
+        return store
+
+    def _write_entry(self, path, key, progress):
+        # Appelé sous le verrou exclusif de `key`
+        entry = os.path.join(self.root, key)
+        tmp = os.path.join(self.root, f'.{key}.{uuid.uuid4().hex}.tmp')
+        os.makedirs(tmp)
+        try:
+            base = os.path.join(tmp, STORE_BASE)
+            store = AudioStore.from_file(path, samples_path=base + '.samples.npy', progress=progress)
+            store.save(base)
+            meta = self._meta_for(path)
+            meta['frames'] = store.frames
+            meta['samplerate'] = store.sr
+            with open(os.path.join(tmp, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            # Libère le memmap avant de déplacer le dossier (obligatoire sous Windows)
+            del store
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        finally:
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def entries(self):
+        """Liste (dernière utilisation, taille en octets, chemin) des entrées complètes."""
+        result = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return result
+        for name in names:
+            entry = os.path.join(self.root, name)
+            meta = os.path.join(entry, META_FILE)
+            if name.startswith('.') or not os.path.isfile(meta):
+                continue
+            size = 0
+            for f in os.listdir(entry):
+                try:
+                    size += os.path.getsize(os.path.join(entry, f))
+                except OSError:
+                    pass
+            result.append((os.path.getmtime(meta), size, entry))
+        return result
+
+    def _remove(self, entry):
+        """Supprime `entry` sauf si elle est ouverte ou en construction ailleurs ; retourne True si supprimée."""
+        try:
+            lock = _lock_key(self.root, os.path.basename(entry), blocking=False)
+        except OSError:
+            return False
+        if lock is None:
+            return False
+        try:
+            shutil.rmtree(entry, ignore_errors=True)
+            if not os.path.isdir(entry):
+                self._remove_lock(os.path.basename(entry))
+        finally:
+            _unlock(lock)
+        return not os.path.isdir(entry)
+
+    def _remove_lock(self, key):
+        # Sous le verrou exclusif de `key` ; échoue sous Windows tant que le fichier est ouvert
+        try:
+            os.remove(_lock_path(self.root, key))
+        except OSError:
+            pass
+
+    def evict(self, keep=None):
+        """Supprime les entrées les moins récemment utilisées jusqu'à respecter `max_bytes`.
+
+        Les entrées ouvertes (par ce processus ou un autre) sont épargnées.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.basename(entry) == keep:
+                continue
+            if self._remove(entry):
+                total -= size
+
+    def clear(self):
+        """Supprime toutes les entrées qui ne sont pas ouvertes, et les verrous orphelins."""
+        for _, _, entry in self.entries():
+            self._remove(entry)
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            if not (name.startswith('.') and name.endswith('.lock')):
+                continue
+            key = name[1:-len('.lock')]
+            if os.path.isdir(os.path.join(self.root, key)):
+                continue
+            # Verrou d'une entrée absente : supprimé s'il n'est pas tenu (construction en cours)
+            try:
+                lock = _lock_key(self.root, key, blocking=False)
+            except OSError:
+                continue
+            if lock is None:
+                continue
+            try:
+                if not os.path.isdir(os.path.join(self.root, key)):
+                    self._remove_lock(key)
+            finally:
+                _unlock(lock)
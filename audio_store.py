@@ -0,0 +1,241 @@
+"""Stockage audio à double résolution : échantillons pleine résolution + pyramide min/max d'affichage."""
+import os
+import weakref
+
+import numpy as np
+import soundfile as sf
+
+READ_BLOCKSIZE = 44100 * 2  # 2 secondes par bloc (ajuster si besoin)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class PeakPyramid:
+    """Pyramide de crêtes min/max d'un signal mono.
+
+    Le niveau 0 résume des paquets de `base` échantillons, chaque niveau
+    suivant regroupe deux paquets du précédent (×2, ×4, ×8...).
+    """
+
+    def __init__(self, base=16):
+        self.base = base
+        self.levels = []
+        self._mins = []
+        self._maxs = []
+        self._carry = np.zeros(0, dtype=np.float32)
+
+    def append(self, mono):
+        """Ajoute un bloc mono au niveau 0 (les restes sont reportés au bloc suivant)."""
+        if self._carry.size:
+            mono = np.concatenate([self._carry, mono])
+        n = (mono.shape[0] // self.base) * self.base
+        if n:
+            buckets = mono[:n].reshape(-1, self.base)
+            self._mins.append(buckets.min(axis=1))
+            self._maxs.append(buckets.max(axis=1))
+        self._carry = mono[n:].copy()
+
+    def finish(self):
+        """Termine le niveau 0 et construit les niveaux supérieurs."""
+        if self._carry.size:
+            self._mins.append(self._carry.min(keepdims=True))
+            self._maxs.append(self._carry.max(keepdims=True))
+            self._carry = np.zeros(0, dtype=np.float32)
+        if self._mins:
+            mins = np.concatenate(self._mins).astype(np.float32)
+            maxs = np.concatenate(self._maxs).astype(np.float32)
+        else:
+            mins = maxs = np.zeros(1, dtype=np.float32)
+        self._mins, self._maxs = [], []
+        self.levels = [(mins, maxs)]
+        while mins.shape[0] > 1:
+            if mins.shape[0] % 2:
+                mins = np.append(mins, mins[-1])
+                maxs = np.append(maxs, maxs[-1])
+            mins = np.minimum(mins[0::2], mins[1::2])
+            maxs = np.maximum(maxs[0::2], maxs[1::2])
+            self.levels.append((mins, maxs))
+        return self
+
+    def bucket(self, level):
+        """Nombre d'échantillons source résumés par un point du niveau `level`."""
+        return self.base << level
+
+    def level_for(self, samples_per_point):
+        """Niveau le plus fin dont les paquets couvrent au moins `samples_per_point` échantillons."""
+        level = 0
+        while level < len(self.levels) - 1 and self.bucket(level) * 2 <= samples_per_point:
+            level += 1
+        return level
+
+    def envelope(self, level):
+        """Min et max entrelacés du niveau `level` (tracé en dents de scie)."""
+        mins, maxs = self.levels[level]
+        out = np.empty(mins.shape[0] * 2, dtype=np.float32)
+        out[0::2] = mins
+        out[1::2] = maxs
+        return out
+
+    def to_arrays(self):
+        arrays = {'base': np.array([self.base])}
+        for i, (mins, maxs) in enumerate(self.levels):
+            arrays[f'min{i}'] = mins
+            arrays[f'max{i}'] = maxs
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        pyramid = cls(int(arrays['base'][0]))
+        i = 0
+        while f'min{i}' in arrays:
+            pyramid.levels.append((arrays[f'min{i}'], arrays[f'max{i}']))
+            i += 1
+        return pyramid
+
+
+class AudioStore:
+    """Échantillons pleine résolution (frames, canaux) float32 pour la synthèse,
+    accompagnés d'une pyramide min/max pour l'affichage.
+
+    Les échantillons peuvent être un memmap (.npy ouvert en lecture seule) :
+    les fichiers de plusieurs heures ne sont alors jamais chargés en RAM et
+    l'extraction d'un grain est une simple vue.
+    """
+
+    def __init__(self, samples, sr, pyramid, samples_path=None):
+        self.samples = samples
+        self.sr = sr
+        self.pyramid = pyramid
+        self.samples_path = samples_path
+
+    @property
+    def frames(self):
+        return self.samples.shape[0]
+
+    def delete_when_released(self):
+        """Supprime le fichier des échantillons quand le store est libéré (memmap temporaire)."""
+        if self.samples_path is not None:
+            weakref.finalize(self, _remove_quietly, self.samples_path)
+        return self
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def duration(self):
+        return self.frames / self.sr
+
+    def slice(self, start, length):
+        """Extrait `length` échantillons à partir de `start` (vue, sans copie)."""
+        return self.samples[start:start + length]
+
+    def default_zone(self, size=0.5):
+        """Zone de prélèvement par défaut (début, durée) en secondes : `size` s au plus, centrée."""
+        size = min(size, self.duration)
+        return max(0, (self.duration - size) / 2), size
+
+    def random_grain(self, zone_start, zone_size, grain_ms, rng=np.random):
+        """Tire un grain de `grain_ms` dont le début est dans la zone (secondes).
+
+        Retourne (début en échantillons, vue sur les échantillons), ou
+        (None, None) si la zone fait moins de deux échantillons.
+        """
+        i0 = int(zone_start * self.sr)
+        i1 = min(int((zone_start + zone_size) * self.sr), self.frames)
+        if (i1 - i0) < 2:
+            return None, None
+        grain_len = int(self.sr * grain_ms / 1000)
+        start = rng.randint(i0, i1)
+        return start, self.slice(start, grain_len)
+
+    def display(self, target_rate=8000):
+        """Signal d'affichage (min/max entrelacés) et sa fréquence équivalente, proche de `target_rate`."""
+        level = self.pyramid.level_for(2.0 * self.sr / target_rate)
+        return self.pyramid.envelope(level), 2.0 * self.sr / self.pyramid.bucket(level)
+
+    @classmethod
+    def from_file(cls, path, samples_path=None, blocksize=READ_BLOCKSIZE, progress=None):
+        """Décode `path` en une seule passe : remplit les échantillons et la pyramide bloc par bloc.
+
+        Si `samples_path` est donné, les blocs décodés sont écrits directement
+        dans un .npy mappé en mémoire au lieu d'un tableau en RAM.
+        `progress(fraction)` est appelé après chaque bloc.
+        """
+        info = sf.info(path)
+        frames_total = max(int(info.frames), 1)
+        shape = (frames_total, info.channels)
+        if samples_path is not None:
+            samples = np.lib.format.open_memmap(samples_path, mode='w+', dtype=np.float32, shape=shape)
+        else:
+            samples = np.empty(shape, dtype=np.float32)
+        overflow = []
+        pyramid = PeakPyramid()
+        pos = 0
+        with sf.SoundFile(path) as f:
+            sr = f.samplerate
+            while True:
+                block = f.read(blocksize, dtype='float32', always_2d=True)
+                if block.shape[0] == 0:
+                    break
+                end = pos + block.shape[0]
+                fit = max(0, min(end, frames_total) - pos)
+                if fit:
+                    samples[pos:pos + fit] = block[:fit]
+                if fit < block.shape[0]:
+                    # Nombre de frames annoncé sous-estimé (certains formats compressés)
+                    overflow.append(block[fit:].copy())
+                pyramid.append(block.mean(axis=1))
+                pos = end
+                if progress is not None:
+                    progress(min(pos / frames_total, 1.0))
+        pyramid.finish()
+        if overflow:
+            extra = np.concatenate(overflow)
+            if samples_path is not None:
+                samples = cls._grow_memmap(samples, samples_path, extra)
+            else:
+                samples = np.concatenate([samples, extra])
+        if samples_path is not None:
+            samples.flush()
+            del samples
+            samples = np.load(samples_path, mmap_mode='r')
+        return cls(samples[:pos], sr, pyramid, samples_path)
+
+    @staticmethod
+    def _grow_memmap(samples, samples_path, extra):
+        tmp_path = samples_path + '.grow'
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                          shape=(samples.shape[0] + extra.shape[0], samples.shape[1]))
+        n = samples.shape[0]
+        for i in range(0, n, READ_BLOCKSIZE):
+            end = min(i + READ_BLOCKSIZE, n)
+            grown[i:end] = samples[i:end]
+        grown[n:] = extra
+        grown.flush()
+        del samples, grown
+        os.replace(tmp_path, samples_path)
+        return np.load(samples_path, mmap_mode='r+')
+
+    def save(self, base_path):
+        """Enregistre échantillons et pyramide (avec samplerate et nombre de frames) à côté de `base_path`."""
+        samples_path = base_path + '.samples.npy'
+        if self.samples_path != samples_path:
+            np.save(samples_path, self.samples)
+        with open(base_path + '.peaks.npz', 'wb') as f:
+            np.savez(f, sr=np.array([self.sr]), frames=np.array([self.frames]), **self.pyramid.to_arrays())
+
+    @classmethod
+    def load(cls, base_path):
+        """Ouvre un store enregistré ; les échantillons restent sur disque (memmap en lecture seule)."""
+        samples_path = base_path + '.samples.npy'
+        samples = np.load(samples_path, mmap_mode='r')
+        with np.load(base_path + '.peaks.npz') as z:
+            arrays = dict(z)
+        frames = int(arrays['frames'][0]) if 'frames' in arrays else samples.shape[0]
+        return cls(samples[:frames], int(arrays['sr'][0]), PeakPyramid.from_arrays(arrays), samples_path)
@@ -0,0 +1,177 @@
+"""Rendu de textures en lot, sans interface (aucun import Qt) : python batch_render.py "sons/*.wav" -o rendus"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields
+
+import numpy as np
+
+from audio_cache import AudioCache
+from engine import GranularEngine, VOICES
+from param_store import GrainParams
+
+
+def load_preset(path=None):
+    """Lit un preset JSON et retourne {voix: GrainParams}.
+
+    Le fichier contient soit un objet de réglages (champs de GrainParams)
+    appliqué aux trois voix, soit un objet {voix: réglages} ; les champs
+    absents gardent leur valeur par défaut.
+    """
+    if path is None:
+        return {name: GrainParams() for name in VOICES}
+    with open(path, 'r', encoding='utf-8') as f:
+        preset = json.load(f)
+    known = {f.name for f in fields(GrainParams)}
+    if preset and all(isinstance(v, dict) for v in preset.values()):
+        voices = preset
+    else:
+        voices = {name: preset for name in VOICES}
+    result = {}
+    for name, values in voices.items():
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"{path}: réglage(s) inconnu(s) pour '{name}' : {', '.join(sorted(unknown))}")
+        result[name] = GrainParams(**values)
+    return result
+
+
+def expand_sources(patterns):
+    """Liste triée et sans doublon des fichiers désignés par des chemins ou des motifs glob."""
+    files = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        files.extend(m for m in matches if os.path.isfile(m))
+    return sorted(set(files))
+
+
+def output_names(sources):
+    """Noms de sortie sans extension : chemin relatif à la racine commune des sources.
+
+    L'arborescence est reproduite, si bien que deux fichiers homonymes de
+    dossiers différents ne s'écrasent pas. Lève ValueError si deux sources
+    ne diffèrent que par leur extension.
+    """
+    paths = [os.path.abspath(s) for s in sources]
+    root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    names = [os.path.splitext(os.path.relpath(p, root))[0] for p in paths]
+    seen = {}
+    for source, name in zip(sources, names):
+        key = os.path.normcase(name)
+        if key in seen:
+            raise ValueError(f"{seen[key]} et {source} produiraient la même sortie '{name}'")
+        seen[key] = source
+    return names
+
+
+def render_texture(source, out_path, params, seconds=None, cycles=None, zone_start=None, zone_size=0.5,
+                   seed=None, blocksize=1024, xfade_ms=5.0, subtype=None, cache_dir=None):
+    """Tire les grains dans la zone de `source`, les traite comme l'interface puis rend le mix dans `out_path`.
+
+    La source est décodée via le cache disque `cache_dir` (memmap, comme
+    l'interface) : un long enregistrement n'est jamais chargé entier en RAM
+    par chaque processus. Le traitement des grains se fait dans le
+    processus appelant, sans pool de threads.
+    """
+    engine = GranularEngine(voices=params, blocksize=blocksize, xfade_ms=xfade_ms, max_workers=0)
+    try:
+        engine.set_audio(AudioCache(root=cache_dir).open(source))
+        rng = np.random.RandomState(seed)
+        if zone_start is None:
+            zone_start, zone_size = engine.audio.default_zone(zone_size)
+        for name, p in params.items():
+            engine.set_params(name, p)
+            engine.select_grain(name, zone_start, zone_size, rng=rng)
+            engine.process(name)
+        names = [v for v in engine.voices if engine.grain_proc[v] is not None and engine.grain_proc[v].shape[-1]]
+        if not names:
+            raise ValueError(f"{source}: zone de prélèvement vide")
+        return engine.render_to_file(out_path, names, seconds=seconds, cycles=cycles, subtype=subtype)
+    finally:
+        engine.close()
+
+
+def _job(args):
+    # Exécuté dans un processus du pool : retourne (source, sortie, frames, erreur)
+    source, out_path, kwargs = args
+    try:
+        return source, out_path, render_texture(source, out_path, **kwargs), None
+    except Exception as e:
+        return source, out_path, 0, f"{type(e).__name__}: {e}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rendu de textures granulaires en lot, sans interface graphique")
+    parser.add_argument('sources', nargs='+', help="fichiers audio ou motifs glob (entre guillemets)")
+    parser.add_argument('-o', '--out', default='renders', help="dossier de sortie")
+    parser.add_argument('-p', '--preset', help="preset JSON (réglages GrainParams, communs ou par voix)")
+    duration = parser.add_mutually_exclusive_group()
+    duration.add_argument('--seconds', type=float, help="durée de chaque texture en secondes (défaut 10)")
+    duration.add_argument('--cycles', type=float, help="durée en tours de la boucle la plus longue")
+    parser.add_argument('--zone-start', type=float, help="début de la zone de prélèvement (s), centrée par défaut")
+    parser.add_argument('--zone-size', type=float, default=0.5, help="durée de la zone de prélèvement (s)")
+    parser.add_argument('--variants', type=int, default=1, help="nombre de textures (tirages) par fichier")
+    parser.add_argument('--seed', type=int, help="graine aléatoire pour des tirages reproductibles")
+    parser.add_argument('--workers', type=int, help="nombre de processus (défaut : tous les cœurs)")
+    parser.add_argument('--blocksize', type=int, default=1024, help="taille de bloc du mixeur (comme audio_blocksize)")
+    parser.add_argument('--xfade-ms', type=float, default=5.0)
+    parser.add_argument('--format', default='wav', help="extension du fichier de sortie (wav, flac...)")
+    parser.add_argument('--subtype', help="sous-type soundfile (PCM_16, PCM_24, FLOAT...)")
+    parser.add_argument('--cache-dir', help="cache persistant des fichiers décodés (défaut : cache temporaire du lot)")
+    args = parser.parse_args(argv)
+
+    sources = expand_sources(args.sources)
+    if not sources:
+        parser.error("aucun fichier ne correspond aux sources données")
+    try:
+        names = output_names(sources)
+    except ValueError as e:
+        parser.error(str(e))
+    params = load_preset(args.preset)
+    seconds = args.seconds if args.seconds is not None or args.cycles is not None else 10.0
+    # Par défaut, un cache propre au lot, supprimé à la fin : le cache utilisateur de l'interface n'est pas rempli
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='beertone-batch-')
+    try:
+        return _run(args, sources, names, params, seconds, cache_dir)
+    finally:
+        if args.cache_dir is None:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def _run(args, sources, names, params, seconds, cache_dir):
+
+    jobs = []
+    for index, (source, name) in enumerate(zip(sources, names)):
+        os.makedirs(os.path.join(args.out, os.path.dirname(name)), exist_ok=True)
+        for variant in range(args.variants):
+            suffix = f"_{variant + 1:03d}" if args.variants > 1 else ""
+            out_path = os.path.join(args.out, f"{name}{suffix}.{args.format}")
+            seed = None if args.seed is None else [args.seed, index, variant]
+            jobs.append((source, out_path, dict(
+                params=params, seconds=seconds, cycles=args.cycles, zone_start=args.zone_start,
+                zone_size=args.zone_size, seed=seed, blocksize=args.blocksize,
+                xfade_ms=args.xfade_ms, subtype=args.subtype, cache_dir=cache_dir)))
+
+    t0 = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_job, job) for job in jobs]
+        for i, future in enumerate(as_completed(futures), 1):
+            source, out_path, frames, error = future.result()
+            if error is not None:
+                failures += 1
+                print(f"[{i}/{len(jobs)}] ÉCHEC {source} : {error}", file=sys.stderr)
+            else:
+                print(f"[{i}/{len(jobs)}] {out_path} ({frames} frames)")
+    print(f"{len(jobs) - failures}/{len(jobs)} textures rendues en {time.perf_counter() - t0:.1f} s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Moteur granulaire sans Qt : tirage des grains, chaîne d'effets, mixeur temps réel et rendu hors ligne.
+
+L'interface (gui_main.MainWindow) n'en est qu'un client : elle publie des
+GrainParams et déclenche les actions. Le même moteur tourne dans un worker,
+un script de benchmark ou sur un serveur, sans QApplication.
+"""
+import threading
+
+import numpy as np
+
+from grain_pipeline import GrainPipeline, to_frames
+from grain_worker import GrainProcessor
+from mixer import GrainMixer, CallbackBudget
+from offline_render import render_to_file
+from param_store import CloudParams, GrainParams, ParamStore
+
+VOICES = ('bass', 'medium', 'treble')
+
+
+class GranularEngine:
+    """État complet de la synthèse pour un jeu de voix nommées.
+
+    Par voix : grain source (vue sur l'AudioStore), samplerate, position de
+    départ, grain traité et état de lecture. Les dictionnaires sont publics
+    et stables (jamais réaffectés) : un client peut les lire directement.
+
+    Le traitement d'un grain est soit synchrone (`process`), soit délégué
+    au GrainProcessor (`submit`). Dans ce cas, `on_processed(name,
+    generation, grain, error)` est appelé depuis le thread de travail ; le
+    client renvoie le résultat à `apply_result` depuis le thread de son
+    choix. Sans `on_processed`, le résultat est appliqué directement.
+    Avec `max_workers=0` (rendu sans interface), aucun pool de threads
+    n'est démarré : seul `process` est disponible.
+    """
+
+    def __init__(self, voices=VOICES, blocksize=1024, xfade_ms=5.0, swap_mode='crossfade',
+                 max_workers=None, on_processed=None, pool_voices=256):
+        self.voices = tuple(voices)
+        self.pool_voices = pool_voices
+        self.blocksize = blocksize
+        self.xfade_ms = xfade_ms
+        self.swap_mode = swap_mode
+        self.audio = None
+        self.params = ParamStore()
+        self.grain = {v: None for v in self.voices}
+        self.grain_sr = {v: None for v in self.voices}
+        self.grain_start = {v: None for v in self.voices}
+        self.grain_proc = {v: None for v in self.voices}
+        self.active = {v: False for v in self.voices}
+        # Nuage de grains : zone copiée en RAM (tampon, samplerate), réglages et état de lecture
+        self.cloud_source = None
+        self.cloud_params = CloudParams()
+        self.cloud_active = False
+        # Chaîne d'effets avec cache par étage, une par voix
+        self.pipelines = {v: GrainPipeline() for v in self.voices}
+        self.processor = None
+        if max_workers != 0:
+            self.processor = GrainProcessor(max_workers=max_workers,
+                                            on_result=on_processed or self.apply_result)
+        self.budget = CallbackBudget()
+        self.tap = None          # transmis au mixeur (canal gauche de chaque bloc)
+        self.mixer = None
+        self.stream = None
+        self._stop_event = threading.Event()
+
+    # --- Source et paramètres ---
+
+    def set_audio(self, store):
+        """Change le fichier source (AudioStore) ; les grains tirés restent jusqu'au prochain tirage."""
+        self.audio = store
+
+    def set_params(self, name, params):
+        """Publie les réglages de la voix `name` (lus sans verrou par le mixeur)."""
+        self.params.publish(name, params)
+
+    def get_params(self, name):
+        return self.params.get(name) or GrainParams()
+
+    # --- Grains ---
+
+    def select_grain(self, name, zone_start, zone_size, grain_ms=None, rng=np.random):
+        """Tire un grain dans la zone (secondes) pour `name` ; retourne sa position de départ ou None."""
+        start = grain = None
+        store = self.audio
+        if store is not None and zone_start is not None:
+            if grain_ms is None:
+                grain_ms = self.get_params(name).size_ms
+            start, grain = store.random_grain(zone_start, zone_size, grain_ms, rng)
+        self.grain[name] = grain
+        self.grain_sr[name] = store.sr if grain is not None else None
+        self.grain_start[name] = start
+        return start
+
+    def process(self, name):
+        """Traite le grain de `name` dans le thread appelant et le dépose dans le mixeur."""
+        if self.grain[name] is None:
+            self.grain_proc[name] = None
+            return None
+        result = self.pipelines[name].run(self.grain[name], self.grain_sr[name], self.get_params(name))
+        self._set_processed(name, result)
+        return result
+
+    def submit(self, name):
+        """Demande le traitement de `name` en arrière-plan ; retourne la génération, ou None sans grain."""
+        if self.grain[name] is None or self.grain_sr[name] is None:
+            self.processor.cancel(name)
+            self.grain_proc[name] = None
+            return None
+        # Seuls les étages dont les paramètres (ou ceux en amont) ont changé sont recalculés,
+        # et l'ancien grain continue de jouer jusqu'à ce que le nouveau soit prêt
+        return self.processor.submit(name, self.pipelines[name].run,
+                                     self.grain[name], self.grain_sr[name], self.get_params(name))
+
+    def apply_result(self, name, generation, grain, error):
+        """Applique un résultat du GrainProcessor s'il est encore à jour ; relance l'erreur éventuelle."""
+        if not self.processor.is_current(name, generation):
+            return False
+        if error is not None:
+            raise error
+        self._set_processed(name, grain)
+        return True
+
+    def _set_processed(self, name, grain):
+        self.grain_proc[name] = grain
+        # Il remplace l'ancien grain de la voix sans rouvrir le flux audio
+        self._push_grain(name)
+
+    def stereo_grain(self, name):
+        """Grain traité de `name` (canaux, frames) converti en (frames, 2) float32 pour le mixeur."""
+        grain = self.grain_proc.get(name)
+        if grain is None:
+            return None
+        return to_frames(grain)
+
+    # --- Lecture temps réel ---
+
+    def _push_grain(self, name):
+        grain = self.grain_proc.get(name)
+        if self.mixer is not None and grain is not None:
+            # Le mixeur transpose le grain (canaux, frames) en le copiant dans son arène
+            self.mixer.set_grain(name, grain, channel_major=True)
+
+    def ensure_mixer(self, samplerate):
+        """Crée le mixeur pour `samplerate` (ou le garde) ; retourne True s'il a été recréé."""
+        if self.mixer is not None and self.mixer.samplerate == samplerate:
+            return False
+        self.mixer = GrainMixer(samplerate, self.params, xfade_ms=self.xfade_ms,
+                                swap_mode=self.swap_mode, budget=self.budget, pool_voices=self.pool_voices,
+                                blocksize=self.blocksize)
+        self.mixer.tap = self.tap
+        for name in self.voices:
+            self._push_grain(name)
+        self._push_cloud()
+        return True
+
+    def set_active(self, name, active):
+        self.active[name] = bool(active)
+        self.update_playback()
+
+    def stop_all(self):
+        """Coupe (en fondu) toutes les voix ; le flux audio reste ouvert."""
+        for name in self.voices:
+            self.active[name] = False
+        self.cloud_active = False
+        if self.mixer is not None:
+            self.mixer.pool.release_all()
+        self.update_playback()
+
+    def playing(self):
+        return [v for v in self.voices if self.active[v] and self.grain_proc[v] is not None]
+
+    def update_playback(self):
+        """Reporte l'état actif des voix dans le mixeur, en ouvrant le flux audio au besoin."""
+        playing = self.playing()
+        if playing:
+            self.start_stream(self.grain_sr[playing[0]])
+        elif self.cloud_active and self.cloud_source is not None:
+            self.start_stream(self.cloud_source[1])
+        if self.mixer is None:
+            return
+        for name in self.voices:
+            self.mixer.set_active(name, self.active[name] and self.grain_proc[name] is not None)
+        self._push_cloud()
+
+    # --- Nuage de grains ---
+
+    def set_cloud_zone(self, zone_start, zone_size):
+        """Publie la zone (secondes) comme source du nuage ; le pool du mixeur la copie dans son arène.
+
+        Le callback ne lit jamais le memmap.
+        """
+        store = self.audio
+        self.cloud_source = None
+        if store is not None and zone_start is not None:
+            i0 = int(zone_start * store.sr)
+            i1 = min(int((zone_start + zone_size) * store.sr), store.frames)
+            if i1 - i0 >= 4:
+                zone = store.slice(i0, i1 - i0)
+                if zone.shape[1] != 2:
+                    # Même réduction que pour les voix nommées : canaux pairs à gauche, impairs à droite
+                    zone = to_frames(zone.T)
+                self.cloud_source = (zone, store.sr)
+        self._push_cloud()
+
+    def set_cloud_params(self, params):
+        """Publie les réglages du nuage (CloudParams), pris en compte dès le bloc suivant."""
+        self.cloud_params = params
+        self._push_cloud()
+
+    def set_cloud_active(self, active):
+        self.cloud_active = bool(active)
+        self.update_playback()
+
+    def _push_cloud(self):
+        if self.mixer is None:
+            return
+        cloud = self.mixer.cloud
+        cloud.params = self.cloud_params
+        if self.cloud_source is not None:
+            cloud.set_source(*self.cloud_source)
+        cloud.running = self.cloud_active and self.cloud_source is not None
+
+    def start_stream(self, samplerate):
+        """Ouvre l'OutputStream persistant ; il n'est rouvert que si le samplerate change."""
+        if self.stream is not None and self.mixer is not None and self.mixer.samplerate == samplerate:
+            return
+        import sounddevice as sd  # seulement pour la lecture : le rendu hors ligne n'en a pas besoin
+        self.close_stream()
+        self.mixer = None
+        self.ensure_mixer(samplerate)
+        # Références locales : le callback ne touche qu'au mixeur
+        mixer = self.mixer
+        stop_event = self._stop_event
+        stop_event.clear()
+
+        def callback(outdata, frames, time_info, status):
+            if stop_event.is_set():
+                outdata.fill(0)
+                raise sd.CallbackStop()
+            mixer.render(outdata, frames)
+
+        self.stream = sd.OutputStream(
+            samplerate=samplerate,
+            channels=2,
+            callback=callback,
+            blocksize=self.blocksize,
+            finished_callback=stop_event.set,
+        )
+        self.stream.start()
+
+    def close_stream(self):
+        if self.stream:
+            self._stop_event.set()
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def close(self):
+        self.close_stream()
+        if self.processor is not None:
+            self.processor.shutdown()
+
+    # --- Rendu hors ligne ---
+
+    def render_to_file(self, path, names=None, seconds=None, cycles=None, subtype=None, progress=None):
+        """Rend le mix des voix `names` (par défaut celles qui jouent, sinon toutes) dans `path`.
+
+        Le nuage de grains est inclus s'il est en lecture.
+        """
+        if names is None:
+            names = self.playing() or [v for v in self.voices if self.grain_proc[v] is not None]
+        names = [v for v in names if self.grain_proc[v] is not None]
+        cloud = None
+        if self.cloud_active and self.cloud_source is not None:
+            cloud = self.cloud_source + (self.cloud_params,)
+        if not names and cloud is None:
+            raise ValueError("aucun grain traité à rendre")
+        grains = {v: self.grain_proc[v] for v in names}
+        params = {v: self.get_params(v) for v in names}
+        samplerate = self.grain_sr[names[0]] if names else self.cloud_source[1]
+        return render_to_file(path, grains, params, samplerate, seconds=seconds, cycles=cycles,
+                              blocksize=self.blocksize, xfade_ms=self.xfade_ms, swap_mode=self.swap_mode,
+                              subtype=subtype, progress=progress, cloud=cloud, channel_major=True)
@@ -0,0 +1,95 @@
+"""Tables d'enveloppe précalculées et cache LRU des enveloppes par (forme, longueur)."""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+ENVELOPES = ('Hann', 'Hamming', 'Gauss', 'Lin', 'Rect')
+TABLE_SIZE = 4096   # résolution des tables d'enveloppe
+
+
+def make_envelope(env_type, n):
+    """Calcule directement l'enveloppe `env_type` de `n` échantillons (forme inconnue : Hann)."""
+    if env_type == "Hann":
+        return np.hanning(n)
+    if env_type == "Hamming":
+        return np.hamming(n)
+    if env_type == "Gauss":
+        # Sigma = n/6 pour rester dans les limites du signal
+        x = np.linspace(-3, 3, n)
+        return np.exp(-0.5 * x**2)
+    if env_type == "Lin":
+        env = np.linspace(0, 1, n//2)
+        return np.concatenate([env, np.linspace(1, 0, n - n//2)])
+    if env_type == "Rect":
+        return np.ones(n)
+    return np.hanning(n)
+
+
+class EnvelopeTables:
+    """Enveloppes float32 servies depuis une table haute résolution par forme.
+
+    Chaque forme est calculée une seule fois, à la construction, sur
+    `table_size` points ;
+    une enveloppe de `n` échantillons en est rééchantillonnée (interpolation
+    linéaire, écart < 1e-6 pour Hann, Hamming et Gauss ; Lin et Rect,
+    affines par morceaux, sont calculées exactement) puis gardée dans un
+    cache LRU de `cache_size` entrées indexé par (forme, longueur). Les
+    tableaux rendus sont en lecture seule. Utilisable depuis plusieurs
+    threads de traitement.
+    """
+
+    def __init__(self, table_size=TABLE_SIZE, cache_size=128):
+        self.table_size = table_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._grid = np.linspace(0.0, 1.0, table_size)
+        # Tables construites d'emblée : jamais modifiées ensuite, lisibles sans verrou
+        self._tables = {}
+        for name in ENVELOPES:
+            table = make_envelope(name, table_size).astype(np.float32)
+            table.flags.writeable = False
+            self._tables[name] = table
+
+    def table(self, env_type):
+        """Table haute résolution (`table_size` points) de la forme `env_type`."""
+        return self._tables.get(env_type, self._tables['Hann'])
+
+    def stacked(self):
+        """Tables de toutes les formes, (len(ENVELOPES), table_size), dans l'ordre de ENVELOPES."""
+        return np.stack([self.table(name) for name in ENVELOPES])
+
+    def get(self, env_type, n):
+        """Enveloppe de `n` échantillons (float32, lecture seule)."""
+        key = (env_type, n)
+        with self._lock:
+            env = self._cache.get(key)
+            if env is not None:
+                self._cache.move_to_end(key)
+                return env
+        if n <= 2 or env_type in ('Lin', 'Rect'):
+            env = make_envelope(env_type, n).astype(np.float32)
+        else:
+            env = np.interp(np.linspace(0.0, 1.0, n), self._grid, self.table(env_type)).astype(np.float32)
+        env.flags.writeable = False
+        with self._lock:
+            self._cache[key] = env
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return env
+
+    def apply(self, grain, env_type, out=None):
+        """Fenêtre `grain` (mono ou (canaux, frames)) en une multiplication diffusée.
+
+        `out` reçoit le résultat (il peut être `grain` lui-même pour un
+        calcul sur place) ; par défaut un nouveau tableau float32.
+        """
+        env = self.get(env_type, grain.shape[-1])
+        if out is None:
+            out = np.empty(grain.shape, dtype=np.float32)
+        return np.multiply(grain, env, out=out, casting='unsafe')
+
+
+# Service partagé par la chaîne d'effets et le nuage de grains
+ENVELOPE_TABLES = EnvelopeTables()
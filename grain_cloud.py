@@ -0,0 +1,97 @@
+"""Nuage de grains temps réel : grains émis en continu dans la zone de prélèvement et lus par le pool de voix."""
+import numpy as np
+
+from envelopes import ENVELOPES
+from param_store import CloudParams
+
+
+class GrainCloud:
+    """Ordonnanceur de grains exécuté dans le callback audio.
+
+    À chaque bloc, `density` grains par seconde démarrent à l'échantillon
+    près ; chacun tire sa position dans la zone, sa durée, sa transposition
+    (lecture à vitesse variable, interpolation linéaire) et son pan. Le
+    nuage ne fait qu'émettre : les grains sont des voix du pool du mixeur
+    (VoicePool), fenêtrées par la table d'enveloppe de leur forme et
+    mixées dans la même passe vectorisée que les autres voix. Quand le pool
+    n'a plus de place, hors des emplacements réservés aux voix nommées,
+    les nouveaux grains sont abandonnés (compteur `dropped`).
+
+    Le thread GUI publie la zone (`set_source`, copiée dans l'arène du
+    pool), les réglages (`params`, CloudParams immuable) et `running` par
+    simple affectation d'attribut ; le callback ne prend aucun verrou.
+    """
+
+    def __init__(self, pool, samplerate, seed=None):
+        self.pool = pool
+        self.samplerate = samplerate
+        self.params = CloudParams()
+        self.running = False
+        self.dropped = 0
+        self._rng = np.random.default_rng(seed)
+        self._buffer = None      # dernière zone publiée (thread GUI)
+        self._source = None      # (source du pool, frames, samplerate) lue par les nouveaux grains
+        self._next = 0.0         # frames avant le prochain grain, depuis le début du bloc
+
+    def set_source(self, buffer, samplerate):
+        """Publie la zone de prélèvement : tampon (frames, 2) float32, en RAM (thread GUI).
+
+        Les grains en cours finissent sur l'ancienne zone, que le pool
+        libère après le dernier d'entre eux.
+        """
+        if buffer is self._buffer and self._source is not None and self._source[2] == samplerate:
+            return
+        old = self._source
+        source = self.pool.add_source(buffer)
+        self._buffer = buffer
+        self._source = None if source is None else (source, buffer.shape[0], samplerate)
+        if old is not None:
+            self.pool.drop_source(old[0])
+
+    def grains(self):
+        """Nombre de grains en cours de lecture."""
+        pool = self.pool
+        return int(np.count_nonzero(pool.active & (pool.env >= 0)))
+
+    # --- Callback audio ---
+
+    def spawn(self, frames, reserve=0):
+        """Démarre dans le pool les grains dont l'attaque tombe dans ce bloc.
+
+        `reserve` emplacements du pool restent libres pour les voix nommées.
+        """
+        p = self.params
+        source = self._source
+        if not self.running or source is None or p.density <= 0:
+            self._next = 0.0
+            return
+        source, n, src_sr = source
+        interval = self.samplerate / p.density
+        nxt = self._next
+        k = max(0, int(np.ceil((frames - nxt) / interval)))
+        self._next = nxt + k * interval - frames
+        pool = self.pool
+        # Zone publiée mais pas encore arrivée dans le callback : rien à lire pour l'instant
+        if k == 0 or n < 4 or not pool.src_live[source]:
+            return
+        room = pool.room(reserve)
+        if room < k:
+            self.dropped += k - room
+            k = room
+            if k == 0:
+                return
+        onsets = (nxt + np.arange(k) * interval).astype(np.int64)
+        u = self._rng.uniform(-1.0, 1.0, size=(4, k))
+        sr = self.samplerate
+        rate = 2.0 ** ((p.pitch + p.pitch_jitter * u[1]) / 12.0) * (src_sr / sr)
+        length = np.maximum(16, np.rint(p.size_ms * sr / 1000.0 * (1.0 + p.size_jitter * u[0]))).astype(np.int64)
+        # Le grain transposé ne doit pas dépasser la zone
+        length = np.minimum(length, ((n - 2) / rate).astype(np.int64) + 1)
+        room = np.maximum(0.0, n - 2 - (length - 1) * rate)
+        start = room * np.clip(0.5 + 0.5 * p.position_jitter * u[2], 0.0, 1.0)
+        # Pan à puissance constante, gain unité au centre ; le volume compense le recouvrement des grains
+        pan = np.clip(p.pan + p.pan_jitter * u[3], -1.0, 1.0)
+        angle = (pan + 1.0) * (np.pi / 4.0)
+        amp = p.volume * np.sqrt(2.0) / np.sqrt(max(1.0, p.density * p.size_ms / 1000.0))
+        shape = ENVELOPES.index(p.envelope) if p.envelope in ENVELOPES else 0
+        pool.spawn(source, onsets, start, rate, length, amp, np.stack([np.cos(angle), np.sin(angle)], axis=1), shape)
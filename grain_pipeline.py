@@ -0,0 +1,190 @@
+"""Chaîne de traitement des grains découpée en étages avec cache par étage.
+
+Les étages travaillent sur des grains (canaux, frames) float32 contigus :
+stretch et pitch traitent tous les canaux en un appel, sans passer par le mono.
+"""
+from collections import OrderedDict
+
+import numpy as np
+import librosa
+
+from envelopes import ENVELOPE_TABLES
+from resampler import SincResampler
+from voice_pool import write_frames
+
+# Noyaux sinc partagés par les threads de traitement (rééchantillonnage des grains courts)
+RESAMPLER = SincResampler()
+
+
+def channels_stage(grain, sr, p):
+    # Disposition de la chaîne : (canaux, frames) float32 contigu, une seule copie depuis la source.
+    # Réduction en mono uniquement sur demande (p.mono)
+    if grain.ndim == 1:
+        return np.ascontiguousarray(grain[None, :], dtype=np.float32)
+    if p.mono:
+        return np.mean(grain, axis=1, dtype=np.float32)[None, :]
+    return np.ascontiguousarray(grain.T, dtype=np.float32)
+
+
+def reverse_stage(grain, sr, p):
+    # Reverse
+    return np.ascontiguousarray(grain[:, ::-1]) if p.reverse else grain
+
+
+def stretch_stage(grain, sr, p):
+    # Stretch (timestrech), tous les canaux en un seul appel
+    if p.stretch == 1.0:
+        return grain
+    try:
+        if grain.shape[-1] > 2048:  # éviter warning n_fft
+            return librosa.effects.time_stretch(y=grain, rate=p.stretch)
+        # trop court, simple resample (sinc fenêtré, sans FFT)
+        resampled_len = int(grain.shape[-1] / p.stretch)
+        return RESAMPLER.resample(grain, resampled_len)
+    except Exception:
+        return grain
+
+
+def pitch_stage(grain, sr, p):
+    # Pitch (transposition), tous les canaux en un seul appel ; en mode 'tape', le mixeur transpose à la lecture
+    if p.shift_semitones == 0:
+        return grain
+    try:
+        return librosa.effects.pitch_shift(y=grain, n_steps=p.shift_semitones, sr=sr)
+    except Exception:
+        return grain
+
+
+def envelope_stage(grain, sr, p):
+    # Enveloppe lue dans le cache de tables, appliquée en une seule multiplication diffusée
+    return ENVELOPE_TABLES.apply(grain, p.envelope)
+
+
+def ringmod_stage(grain, sr, p):
+    # Effet Ringmod
+    if not p.ringmod or p.ringmod_freq <= 0:
+        return grain
+    t = np.arange(0, grain.shape[-1])/sr
+    mod = np.sin(2*np.pi*p.ringmod_freq*t).astype(np.float32)
+    return grain * mod
+
+
+def distortion_stage(grain, sr, p):
+    # Distortion
+    if not p.distortion:
+        return grain
+    drywet = p.distortion_mix
+    dry = 1.0 - drywet
+    g_max = np.max(np.abs(grain))
+    if g_max <= 0:
+        return grain
+    # Normaliser avant distortion
+    grain_norm = grain / g_max
+    # Oversaturation
+    k = 1.0 + p.distortion_amount * 9  # 1 à 10
+    wet = np.tanh(grain_norm * k) / np.tanh(k)
+    # Mix dry/wet
+    return dry * grain + drywet * wet * g_max
+
+
+def delay_stage(grain, sr, p):
+    # Delay (simple echo)
+    if not p.delay:
+        return grain
+    delay_samps = int(0.03 * sr)
+    wet = p.delay_mix
+    dry = 1.0 - wet
+    if grain.shape[-1] <= delay_samps:
+        return grain
+    delayed = np.zeros_like(grain)
+    delayed[:, delay_samps:] = grain[:, :-delay_samps]
+    return dry * grain + wet * delayed
+
+
+def to_frames(grain):
+    """Grain de la chaîne (canaux, frames) → tampon (frames, 2) float32 contigu (export, grains ponctuels).
+
+    Le mixeur n'en a pas besoin : il transpose les grains en les copiant
+    dans l'arène de son pool.
+    """
+    return write_frames(np.empty((grain.shape[-1], 2), dtype=np.float32), grain)
+
+
+# (nom, champs de GrainParams lus par l'étage, fonction) dans l'ordre de la chaîne
+STAGES = (
+    ('channels', ('mono',), channels_stage),
+    ('reverse', ('reverse',), reverse_stage),
+    ('stretch', ('stretch',), stretch_stage),
+    ('pitch', ('shift_semitones',), pitch_stage),
+    ('envelope', ('envelope',), envelope_stage),
+    ('ringmod', ('ringmod', 'ringmod_freq'), ringmod_stage),
+    ('distortion', ('distortion', 'distortion_amount', 'distortion_mix'), distortion_stage),
+    ('delay', ('delay', 'delay_mix'), delay_stage),
+)
+
+
+class GrainPipeline:
+    """Exécute la chaîne d'effets d'un grain en ne recalculant que les étages touchés.
+
+    La sortie de chaque étage est mise en cache sous une clé formée du grain
+    source et des paramètres de tous les étages en amont : tourner le bouton
+    de distorsion ne relance que la distorsion et le delay, jamais le
+    vocodeur de phase. Les tableaux en cache sont en lecture seule.
+    """
+
+    def __init__(self, stages=STAGES, cache_size=4):
+        self.stages = stages
+        self.cache_size = cache_size
+        self.source = None
+        self.sr = None
+        self._token = 0
+        self._caches = [OrderedDict() for _ in stages]
+        self.last_run = ()   # noms des étages réellement recalculés au dernier appel
+
+    def set_source(self, grain, sr):
+        """Change le grain source ; tous les caches deviennent invalides."""
+        self.source = grain
+        self.sr = sr
+        self._token += 1
+        for cache in self._caches:
+            cache.clear()
+
+    def run(self, source, sr, params):
+        """Change de source si besoin puis traite ; un seul thread à la fois par pipeline."""
+        if source is not self.source or sr != self.sr:
+            self.set_source(source, sr)
+        return self.process(params)
+
+    def process(self, params):
+        """Retourne le grain traité (canaux, frames) float32, en lecture seule, pour `params`."""
+        if self.source is None:
+            return None
+        keys = []
+        key = (self._token, self.sr)
+        for _, fields, _ in self.stages:
+            key = key + tuple(getattr(params, f) for f in fields)
+            keys.append(key)
+        # Étage le plus en aval déjà en cache
+        x = self.source
+        start = 0
+        for i in range(len(self.stages) - 1, -1, -1):
+            cached = self._caches[i].get(keys[i])
+            if cached is not None:
+                self._caches[i].move_to_end(keys[i])
+                x = cached
+                start = i + 1
+                break
+        ran = []
+        for i in range(start, len(self.stages)):
+            name, _, fn = self.stages[i]
+            x = fn(x, self.sr, params)
+            if i == len(self.stages) - 1:
+                x = x.astype(np.float32, copy=False)
+            x.flags.writeable = False
+            cache = self._caches[i]
+            cache[keys[i]] = x
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+            ran.append(name)
+        self.last_run = tuple(ran)
+        return x
@@ -0,0 +1,69 @@
+"""Traitement des grains (stretch/pitch...) en arrière-plan avec regroupement des requêtes."""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class GrainProcessor:
+    """Pool de threads qui ne calcule que le dernier jeu de paramètres demandé par grain.
+
+    Au plus une tâche par grain est en cours : une requête arrivant pendant
+    un calcul remplace la requête en attente (les intermédiaires ne sont
+    jamais lancés) et le résultat d'une tâche dépassée est ignoré. Les
+    résultats à jour sont passés à `on_result(name, generation, result,
+    error)`, appelé depuis le thread de travail.
+    """
+
+    def __init__(self, max_workers=None, on_result=None):
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='grain')
+        self._lock = threading.Lock()
+        self._generation = {}
+        self._pending = {}
+        self._running = set()
+        self.on_result = on_result
+
+    def submit(self, name, fn, *args):
+        """Demande le calcul `fn(*args)` pour le grain `name` ; retourne sa génération."""
+        with self._lock:
+            gen = self._generation.get(name, 0) + 1
+            self._generation[name] = gen
+            self._pending[name] = (gen, fn, args)
+            if name not in self._running:
+                self._start(name)
+        return gen
+
+    def cancel(self, name):
+        """Abandonne la requête en attente et rend obsolète celle en cours pour `name`."""
+        with self._lock:
+            self._generation[name] = self._generation.get(name, 0) + 1
+            self._pending.pop(name, None)
+
+    def is_current(self, name, gen):
+        return self._generation.get(name) == gen
+
+    def _start(self, name):
+        # Appelé avec self._lock tenu
+        gen, fn, args = self._pending.pop(name)
+        self._running.add(name)
+        self._executor.submit(self._run, name, gen, fn, args)
+
+    def _run(self, name, gen, fn, args):
+        result, error = None, None
+        try:
+            result = fn(*args)
+        except Exception as e:
+            error = e
+        with self._lock:
+            current = self._generation.get(name) == gen
+            self._running.discard(name)
+            if name in self._pending:
+                self._start(name)
+        if current and self.on_result is not None:
+            self.on_result(name, gen, result, error)
+
+    def shutdown(self):
+        with self._lock:
+            self._pending.clear()
+        self._executor.shutdown(wait=False)
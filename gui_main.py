@@ -1,21 +1,20 @@
 import sys
 import os
 import json
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QVBoxLayout, QWidget, QFileDialog, QSpinBox, QHBoxLayout, QDoubleSpinBox, QComboBox, QCheckBox, QSlider, QDial, QGroupBox, QGridLayout, QFrame, QProgressBar, QSizePolicy, QScrollArea, QSplitter, QStackedLayout)
-from PyQt5.QtCore import Qt, QTimer, QCoreApplication, QRect, QSize, QPoint, QEvent
+import functools
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QVBoxLayout, QWidget, QFileDialog, QSpinBox, QHBoxLayout, QDoubleSpinBox, QComboBox, QCheckBox, QSlider, QDial, QGroupBox, QGridLayout, QFrame, QProgressBar, QSizePolicy, QScrollArea, QSplitter, QStackedLayout, QInputDialog, QMessageBox)
+from PyQt5.QtCore import Qt, QTimer, QRect, QRectF, QSize, QPoint, QEvent, QObject, QThread, pyqtSignal
 from PyQt5.QtGui import QPixmap, QPainter, QColor, QFont, QMoveEvent
 from PyQt5.QtWidgets import QSplashScreen, QDesktopWidget
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import numpy as np
 import soundfile as sf
-import threading
-import sounddevice as sd
-import time
-import librosa
-import scipy.signal
 from custom_dial import CustomDial
-import queue  # File d'attente pour spectrogramme
+from param_store import CloudParams, GrainParams
+from engine import GranularEngine, VOICES
+from audio_cache import AudioCache, DEFAULT_MAX_BYTES
+from waveform_view import make_waveform_widget
+from spectrum import BandAnalyzer
+from ring_buffer import SampleRing
 
 SETTINGS_FILE = os.path.join(os.path.dirname(__file__), 'settings.json')
 
@@ -29,240 +28,89 @@ def save_settings(settings):
     with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
         json.dump(settings, f)
 
-class WaveformCanvas(FigureCanvas):
-    def __init__(self, parent=None):
-        self.fig, self.ax = plt.subplots(dpi=100)
-        super().__init__(self.fig)
-        self.setParent(parent)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        # Fond bleu-vert très foncé
-        dark_teal = '#012b2f'
-        self.fig.patch.set_facecolor(dark_teal)
-        
-        self.ax.set_facecolor(dark_teal)
-        
-        self.ax.spines['bottom'].set_color('white')
-        
-        self.ax.spines['top'].set_color('white')
-        
-        self.ax.spines['left'].set_color('white')
-        
-        self.ax.spines['right'].set_color('white')
-        
-        self.ax.title.set_color('white')
-        
-        self.ax.xaxis.label.set_color('white')
-        
-        self.ax.yaxis.label.set_color('white')        
-        self.fig.patch.set_facecolor(dark_teal)
-
-        # ---- Attributs pour la sélection et affichage des grains ----
-        self.selection_start = None  # début de la zone sélectionnée (sec)
-        self.selection_size = 0.5    # durée de la zone sélectionnée (sec)
-        self.data = None             # waveform complète
-        self.sr = None               # samplerate
-        self.selection_patch = None
-        self.grain_patches = []
-
-        # RÉTABLIT LES RÉFÉRENCES PERDUES
-        self.parent = parent  # nécessaire pour accéder aux grains et à la zone depuis MainWindow
-        self.zoom_xlim = None  # mémorise la fenêtre de zoom courante
-
-        # Pour le panning fluide
-        self._panning = False
-        self._pan_start_x = None
-        self._pan_xlim_start = None
-
-        self.setMouseTracking(True)
-        self.mpl_connect('button_press_event', self.on_mouse_press)
-        self.mpl_connect('button_release_event', self.on_mouse_release)
-        self.mpl_connect('motion_notify_event', self.on_mouse_move)
-        self.mpl_connect('scroll_event', self.on_scroll)
-
-        self.draw_selection()
-        self.fig.tight_layout(pad=0.2)
-        
-        self.ax.set_xticks([])
-        
-        self.ax.set_yticks([])
-        self.draw()
-        self.zoom_xlim = None
-
-    def plot_waveform(self, data, samplerate):
-        self.ax.clear()
-        self.data = data
-        self.sr = samplerate
-        duration = len(data) / samplerate
-        times = np.linspace(0, duration, num=len(data))
-        
-        self.ax.plot(times, data, color='cyan', linewidth=0.8)
-        dark_teal = '#012b2f'
-        self.ax.set_facecolor(dark_teal)
-        
-        self.ax.title.set_color('white')
-        
-        self.ax.xaxis.label.set_color('white')
-        
-        self.ax.yaxis.label.set_color('white')        
-        self.ax.spines['bottom'].set_color('white')
-        
-        self.ax.spines['top'].set_color('white')
-        
-        self.ax.spines['left'].set_color('white')
-        
-        self.ax.spines['right'].set_color('white')
-        self.fig.patch.set_facecolor(dark_teal)
-        self.draw_selection()
-        self.fig.tight_layout(pad=0.2)
-        
-        self.ax.set_xticks([])
-        
-        self.ax.set_yticks([])
-        self.draw()
-        self.zoom_xlim = None
+class GrainResultBridge(QObject):
+    """Relaie vers le thread GUI les grains calculés en arrière-plan."""
+    processed = pyqtSignal(str, int, object, object)
+
+
+class LoadCancelled(Exception):
+    """Chargement (ou export) abandonné : autre fichier demandé, ou fermeture."""
+
 
-    def draw_selection(self):
-        # Correction : ignorer l'erreur si l'artiste n'existe plus
+class AudioLoader(QThread):
+    """Décode un fichier audio (via le cache) hors du thread GUI, bloc par bloc."""
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, file, cache, parent=None):
+        super().__init__(parent)
+        self.file = file
+        self.cache = cache
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _on_progress(self, fraction):
+        # Appelé après chaque bloc décodé : point d'annulation
+        if self._cancelled:
+            raise LoadCancelled()
+        self.progress.emit(int(100 * fraction))
+
+    def run(self):
         try:
-            if self.selection_patch:
-                self.selection_patch.remove()
-                self.selection_patch = None
-            if hasattr(self, 'grain_patches'):
-                for patch in self.grain_patches:
-                    patch.remove()
-                self.grain_patches = []
-        except Exception:
-            self.selection_patch = None
-            if hasattr(self, 'grain_patches'):
-                self.grain_patches = []
-        if self.selection_start is not None and self.selection_size > 0 and self.data is not None and len(self.data) > 0:
-            x0 = self.selection_start
-            x1 = min(x0 + self.selection_size, len(self.data)/self.sr)
-            self.selection_patch = self.ax.axvspan(x0, x1, color='yellow', alpha=0.25, zorder=1)
-        # --- Affichage des 3 grains colorés ---
-        self.grain_patches = []
-        if self.parent and hasattr(self.parent, '_grain') and hasattr(self.parent, '_grain_start'):
-            colors = {'bass': 'deepskyblue', 'medium': 'limegreen', 'treble': 'magenta'}
-            for grain_type in ['bass', 'medium', 'treble']:
-                grain = self.parent._grain.get(grain_type)
-                sr = self.parent._grain_sr.get(grain_type)
-                start = self.parent._grain_start.get(grain_type)
-                if grain is not None and sr is not None and start is not None and hasattr(self, 'data') and self.data is not None:
-                    grain_len = grain.shape[0]
-                    t0 = start / sr
-                    t1 = (start + grain_len) / sr
-                    # Ligne verticale début
-                    line_start = self.ax.axvline(t0, color=colors[grain_type], linestyle='-', linewidth=2.5, zorder=20, label=f'{grain_type}_start')
-                    # Ligne verticale fin
-                    line_end = self.ax.axvline(t1, color=colors[grain_type], linestyle='-', linewidth=2.5, zorder=20, label=f'{grain_type}_end')
-                    self.grain_patches.extend([line_start, line_end])
-        self.draw()
-
-    def zoom_to_selection(self):
-        # Centre la fenêtre sur la zone de prélèvement (sélection), mais élargit si un grain déborde
-        if self.selection_start is not None and self.selection_size > 0 and self.data is not None and self.sr is not None:
-            x0 = self.selection_start
-            x1 = min(x0 + self.selection_size, len(self.data)/self.sr)
-            # Recherche les bornes min/max de tous les grains actifs (début et fin)
-            min_grain = x0
-            max_grain = x1
-            if self.parent and hasattr(self.parent, '_grain_start') and hasattr(self.parent, '_grain') and hasattr(self.parent, '_grain_sr'):
-                for grain_type in ('bass','medium','treble'):
-                    start = self.parent._grain_start.get(grain_type)
-                    grain = self.parent._grain.get(grain_type)
-                    sr = self.parent._grain_sr.get(grain_type)
-                    if start is not None and grain is not None and sr is not None:
-                        t_start = start / sr
-                        t_end = (start + grain.shape[0]) / sr
-                        min_grain = min(min_grain, t_start)
-                        max_grain = max(max_grain, t_end)
-            # Affiche la zone la plus large (zone de prélèvement + grains)
-            zone_width = max_grain - min_grain
-            view_width = zone_width * 3
-            center = (min_grain + max_grain) / 2
-            left = max(0, center - view_width / 2)
-            right = min(len(self.data)/self.sr, center + view_width / 2)
-            
-            self.ax.set_xlim([left, right])
-            self.zoom_xlim = (left, right)
-            self.draw()
+            store = self.cache.open(self.file, progress=self._on_progress)
+        except LoadCancelled:
+            return
+        except Exception as e:
+            if not self._cancelled:
+                self.failed.emit(self.file, str(e))
+            return
+        if not self._cancelled:
+            self.loaded.emit(self.file, store)
 
-    def on_mouse_press(self, event):
-        if self.data is None or len(self.data) == 0 or not event.inaxes:
+
+class MixExporter(QThread):
+    """Rend le mix dans un fichier hors du thread GUI ; `render(progress=...)` fait le travail."""
+    progress = pyqtSignal(int)
+    done = pyqtSignal(str, int)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, path, render, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.render = render
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _on_progress(self, fraction):
+        # Appelé après chaque écriture disque : point d'annulation
+        if self._cancelled:
+            raise LoadCancelled()
+        self.progress.emit(int(100 * fraction))
+
+    def run(self):
+        try:
+            frames = self.render(progress=self._on_progress)
+        except LoadCancelled:
+            # Fichier partiel d'un export abandonné
+            if os.path.exists(self.path):
+                os.remove(self.path)
             return
-        if event.button == 3:  # Clic droit = début de sélection
-            self.parent.zone_start = max(0, event.xdata)
-            self.selection_start = self.parent.zone_start
-            self.draw_selection()
-            # Réinitialise un grain aléatoire dans la zone pour chaque type
-            for grain_type in ('bass', 'medium', 'treble'):
-                self.parent.select_random_grain(grain_type=grain_type)
-            # Correction : forcer la mise à jour des lignes de couleur
-            self.draw_selection()
-            self.zoom_to_selection()
-            # Sélectionne un nouveau grain aléatoire à chaque sélection de zone
-            if self.parent:
-                self.parent.on_new_zone_selected()
-        elif event.button == 1:  # Clic gauche = début du panning
-            self._panning = True
-            self._pan_start_x = event.xdata   # position initiale du drag
-            # Correction : stocker la fenêtre courante SANS zoom_to_selection
-            self._pan_xlim_start = self.ax.get_xlim()
-
-    def on_mouse_release(self, event):
-        if self._panning:
-            self._panning = False
-            self._pan_start_x = None
-            self._pan_xlim_start = None
-
-    def on_mouse_move(self, event):
-        # Navigation ultra-fluide : déplacement proportionnel, sans saut, redraw optimisé
-        if self._panning and event.inaxes and self.data is not None and len(self.data) > 0 and event.xdata is not None:
-            dx = event.xdata - self._pan_start_x
-            left0, right0 = self._pan_xlim_start
-            width = right0 - left0
-            duration = len(self.data) / self.sr
-            # Déplacement proportionnel à la largeur de la vue, sans limite
-            new_left = left0 - dx
-            new_right = right0 - dx
-            # Clamp
-            if new_left < 0:
-                new_left = 0
-                new_right = width
-            if new_right > duration:
-                new_right = duration
-                new_left = duration - width
-            # Correction anti-saccade : ne redessiner que si la fenêtre change vraiment
-            if abs(self.ax.get_xlim()[0] - new_left) > 1e-6 or abs(self.ax.get_xlim()[1] - new_right) > 1e-6:
-                self.ax.set_xlim([new_left, new_right])
-                self.draw_idle()
-
-    def on_scroll(self, event):
-        if self.data is None or len(self.data) == 0 or not event.inaxes:
+        except Exception as e:
+            self.failed.emit(self.path, str(e))
             return
-        cur_xlim = self.ax.get_xlim()
-        xdata = event.xdata if event.xdata is not None else (cur_xlim[0] + cur_xlim[1]) / 2
-        scale_factor = 0.8 if event.button == 'up' else 1.25
-        new_width = (cur_xlim[1] - cur_xlim[0]) * scale_factor
-        xcenter = xdata
-        left = max(0, xcenter - new_width / 2)
-        right = min(len(self.data)/self.sr, xcenter + new_width / 2)
-        
-        self.ax.set_xlim([left, right])
-        self.zoom_xlim = self.ax.get_xlim()
-        self.draw()
-
-    def get_selection_times(self):
-        if self.selection_start is not None and self.selection_size > 0 and self.data is not None and len(self.data) > 0:
-            t0 = max(0, self.selection_start)
-            t1 = min(len(self.data)/self.sr, t0 + self.selection_size)
-            return t0, t1
-        return None, None
-
-class BassEffectsWindow(QMainWindow):
-    def __init__(self, grain_bass_widget=None):
+        self.done.emit(self.path, frames)
+
+
+class EffectsWindow(QMainWindow):
+    """Fenêtre d'effets d'un grain (une instance par voix)."""
+    def __init__(self, grain_widget=None, title="Effets Grain"):
         super().__init__(None)
-        self.setWindowTitle("Effets Grain Bass")
+        self.setWindowTitle(title)
         self.setMinimumWidth(520)
         self.setWindowFlags(Qt.Window | Qt.WindowStaysOnTopHint)
         
@@ -272,13 +120,13 @@ class BassEffectsWindow(QMainWindow):
         layout.setContentsMargins(8, 8, 8, 8)
         layout.setSpacing(8)
         
-        if grain_bass_widget is not None:
+        if grain_widget is not None:
             # Ajoute les rectangles d'effets à la nouvelle fenêtre
-            layout.addWidget(grain_bass_widget.pitch_stretch_box)
-            layout.addWidget(grain_bass_widget.reverb_box)
-            layout.addWidget(grain_bass_widget.delay_box)
-            layout.addWidget(grain_bass_widget.dist_box)
-            layout.addWidget(grain_bass_widget.ringmod_box)
+            layout.addWidget(grain_widget.pitch_stretch_box)
+            layout.addWidget(grain_widget.reverb_box)
+            layout.addWidget(grain_widget.delay_box)
+            layout.addWidget(grain_widget.dist_box)
+            layout.addWidget(grain_widget.ringmod_box)
         
         self.setCentralWidget(central_widget)
 
@@ -299,70 +147,6 @@ class BassEffectsWindow(QMainWindow):
             screen.center().y() - self.height() // 2
         )
 
-class MediumEffectsWindow(QMainWindow):
-    def __init__(self, grain_medium_widget=None):
-        super().__init__(None)
-        self.setWindowTitle("Effets Grain Medium")
-        self.setMinimumWidth(520)
-        self.setWindowFlags(Qt.Window | Qt.WindowStaysOnTopHint)
-        
-        # Créer un widget central
-        central_widget = QWidget()
-        layout = QVBoxLayout(central_widget)
-        layout.setContentsMargins(8, 8, 8, 8)
-        layout.setSpacing(8)
-        
-        if grain_medium_widget is not None:
-            # Ajoute les rectangles d'effets à la nouvelle fenêtre
-            layout.addWidget(grain_medium_widget.pitch_stretch_box)
-            layout.addWidget(grain_medium_widget.reverb_box)
-            layout.addWidget(grain_medium_widget.delay_box)
-            layout.addWidget(grain_medium_widget.dist_box)
-            layout.addWidget(grain_medium_widget.ringmod_box)
-        
-        self.setCentralWidget(central_widget)
-
-    def center_on_mainwindow(self, mainwindow):
-        if mainwindow is not None:
-            main_geom = mainwindow.geometry()
-            self.adjustSize()
-            w, h = self.width(), self.height()
-            x = main_geom.center().x() - w // 2
-            y = main_geom.center().y() - h // 2
-            self.move(x, y)
-
-class TrebleEffectsWindow(QMainWindow):
-    def __init__(self, grain_treble_widget=None):
-        super().__init__(None)
-        self.setWindowTitle("Effets Grain Treble")
-        self.setMinimumWidth(520)
-        self.setWindowFlags(Qt.Window | Qt.WindowStaysOnTopHint)
-        
-        # Créer un widget central
-        central_widget = QWidget()
-        layout = QVBoxLayout(central_widget)
-        layout.setContentsMargins(8, 8, 8, 8)
-        layout.setSpacing(8)
-        
-        if grain_treble_widget is not None:
-            # Ajoute les rectangles d'effets à la nouvelle fenêtre
-            layout.addWidget(grain_treble_widget.pitch_stretch_box)
-            layout.addWidget(grain_treble_widget.reverb_box)
-            layout.addWidget(grain_treble_widget.delay_box)
-            layout.addWidget(grain_treble_widget.dist_box)
-            layout.addWidget(grain_treble_widget.ringmod_box)
-        
-        self.setCentralWidget(central_widget)
-
-    def center_on_mainwindow(self, mainwindow):
-        if mainwindow is not None:
-            main_geom = mainwindow.geometry()
-            self.adjustSize()
-            w, h = self.width(), self.height()
-            x = main_geom.center().x() - w // 2
-            y = main_geom.center().y() - h // 2
-            self.move(x, y)
-
 class GrainControlWidget(QGroupBox):
     def __init__(self, grain_name, parent=None):
         super().__init__(f"Grain {grain_name}")
@@ -404,6 +188,10 @@ class GrainControlWidget(QGroupBox):
         self.reverse.setStyleSheet(self.label_style)
         self.reverse.setToolTip("Lecture du grain à l'envers")
 
+        self.mono = QCheckBox('Mono')
+        self.mono.setStyleSheet(self.label_style)
+        self.mono.setToolTip("Réduit le grain en mono avant les effets (sinon l'image stéréo est conservée)")
+
         # Création des rectangles d'effets (pour tous les types, même si bass les place dans une fenêtre séparée)
         knob_size = 44
 
@@ -446,6 +234,14 @@ class GrainControlWidget(QGroupBox):
         self.pitch.setMinimumWidth(40)
         self.pitch.setMaximumWidth(50)
         pitch_stretch_layout.addWidget(self.pitch, alignment=Qt.AlignLeft)
+        self.pitch_mode = QComboBox()
+        self.pitch_mode.addItem('Shift', 'shift')
+        self.pitch_mode.addItem('Tape', 'tape')
+        self.pitch_mode.setToolTip("Shift : transposition à durée constante (vocodeur de phase)\n"
+                                   "Tape : vitesse de lecture, transposée en temps réel sans recalcul du grain")
+        self.pitch_mode.setStyleSheet(self.control_style)
+        self.pitch_mode.setMaximumWidth(70)
+        pitch_stretch_layout.addWidget(self.pitch_mode, alignment=Qt.AlignLeft)
         stretch_label = QLabel('Stretch:')
         stretch_label.setStyleSheet("color: black; margin: 0px; padding: 0px;")
         stretch_label.setContentsMargins(0, 0, 0, 0)
@@ -633,6 +429,7 @@ class GrainControlWidget(QGroupBox):
         param_layout.addWidget(volume_label, alignment=Qt.AlignLeft)
         param_layout.addWidget(self.vol, alignment=Qt.AlignLeft)
         param_layout.addWidget(self.reverse, alignment=Qt.AlignLeft)
+        param_layout.addWidget(self.mono, alignment=Qt.AlignLeft)
         content_layout.addLayout(param_layout)
 
         # Ligne 2: Effets sur deux lignes (aucun type de grain)
@@ -718,6 +515,140 @@ class GrainControlWidget(QGroupBox):
         if hasattr(self.parent, 'export_grain'):
             self.parent.export_grain(self.grain_name)
 
+    def get_params(self):
+        """Construit l'instantané immuable des réglages courants du grain"""
+        return GrainParams(
+            size_ms=self.size.value(),
+            volume=self.vol.value() / 100.0,
+            mono=self.mono.isChecked(),
+            reverse=self.reverse.isChecked(),
+            envelope=self.env.currentText(),
+            pitch=self.pitch.value(),
+            pitch_mode=self.pitch_mode.currentData(),
+            stretch=self.stretch.value(),
+            reverb=self.reverb.isChecked(),
+            reverb_amount=self.reverb_amount.value() / 100.0,
+            reverb_room_size=self.reverb_roomsize.value() / 100.0,
+            reverb_decay=self.reverb_decay.value() / 1000.0,
+            delay=self.delay.isChecked(),
+            delay_mix=self.delay_drywet.value() / 100.0,
+            distortion=self.dist.isChecked(),
+            distortion_amount=self.dist_amount.value() / 100.0,
+            distortion_mix=self.dist_drywet.value() / 100.0,
+            ringmod=self.ringmod.isChecked(),
+            ringmod_freq=self.ringmod_freq.value(),
+        )
+
+
+class GrainCloudWidget(QGroupBox):
+    """Contrôles du nuage de grains : densité, durée, transposition, pan et leurs dispersions."""
+
+    # (attribut, libellé, minimum, maximum, valeur par défaut, diviseur, format d'affichage)
+    SLIDERS = (
+        ('density', 'Densité (grains/s):', 1, 500, 40, 1, "{:.0f}"),
+        ('size', 'Durée (ms):', 5, 500, 60, 1, "{:.0f}"),
+        ('size_jitter', 'Dispersion durée:', 0, 100, 30, 100, "{:.0%}"),
+        ('position_jitter', 'Dispersion position:', 0, 100, 100, 100, "{:.0%}"),
+        ('pitch', 'Pitch (demi-tons):', -240, 240, 0, 10, "{:+.1f}"),
+        ('pitch_jitter', 'Dispersion pitch:', 0, 240, 0, 10, "±{:.1f}"),
+        ('pan', 'Pan:', -100, 100, 0, 100, "{:+.2f}"),
+        ('pan_jitter', 'Dispersion pan:', 0, 100, 50, 100, "±{:.2f}"),
+        ('vol', 'Volume:', 0, 200, 100, 100, "{:.2f}"),
+    )
+
+    def __init__(self, parent=None):
+        super().__init__("Nuage de grains")
+        self.parent = parent
+        self.setStyleSheet(
+            "QGroupBox { font-weight: bold; font-size: 13pt; border: 2px solid #3b6c7e; border-radius: 16px; "
+            "margin-top: 20px; background-color: #10242f; color: white; } "
+            "QGroupBox::title { color: white; subcontrol-origin: margin; left: 10px; padding: 0 5px 0 5px; "
+            "background-color: #10242f; }"
+        )
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Maximum)
+        label_style = "color: white; margin: 0px; padding: 0px;"
+        control_style = "color: white; background-color: #012b2f; margin: 0px; padding: 0px;"
+        button_style = "color: white; background-color: rgba(255,225,0,0.5); font-weight: bold;"
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(10, 12, 10, 10)
+        layout.setSpacing(6)
+
+        # Ligne 1 : lecture du nuage et forme d'enveloppe des grains
+        header_layout = QHBoxLayout()
+        header_layout.setAlignment(Qt.AlignLeft)
+        self.btn_play_stop = QPushButton('Lecture nuage')
+        self.btn_play_stop.setCheckable(True)
+        self.btn_play_stop.setStyleSheet(button_style)
+        self.btn_play_stop.setToolTip("Émet en continu des grains tirés dans la zone jaune")
+        self.btn_play_stop.clicked.connect(self.toggle_play_stop)
+        header_layout.addWidget(self.btn_play_stop, alignment=Qt.AlignLeft)
+        env_label = QLabel('Env:')
+        env_label.setStyleSheet(label_style)
+        header_layout.addWidget(env_label, alignment=Qt.AlignLeft)
+        self.env = QComboBox()
+        self.env.addItems(['Hann', 'Hamming', 'Gauss', 'Lin', 'Rect'])
+        self.env.setToolTip("Forme d'enveloppe appliquée à chaque grain du nuage")
+        self.env.setStyleSheet(control_style)
+        self.env.setMaximumWidth(80)
+        self.env.currentIndexChanged.connect(self.publish)
+        header_layout.addWidget(self.env, alignment=Qt.AlignLeft)
+        layout.addLayout(header_layout)
+
+        # Curseurs sur deux colonnes : libellé, curseur, valeur
+        grid = QGridLayout()
+        grid.setHorizontalSpacing(6)
+        grid.setVerticalSpacing(2)
+        self._labels = {}
+        for i, (attr, text, lo, hi, default, div, fmt) in enumerate(self.SLIDERS):
+            row, col = i // 2, (i % 2) * 3
+            label = QLabel(text)
+            label.setStyleSheet(label_style)
+            slider = QSlider(Qt.Horizontal)
+            slider.setRange(lo, hi)
+            slider.setValue(default)
+            slider.setFixedWidth(120)
+            slider.setStyleSheet(control_style)
+            value_label = QLabel(fmt.format(default / div))
+            value_label.setStyleSheet(label_style)
+            value_label.setFixedWidth(50)
+            slider.valueChanged.connect(lambda v, label=value_label, d=div, f=fmt: label.setText(f.format(v / d)))
+            slider.valueChanged.connect(self.publish)
+            setattr(self, attr, slider)
+            grid.addWidget(label, row, col)
+            grid.addWidget(slider, row, col + 1)
+            grid.addWidget(value_label, row, col + 2)
+        layout.addLayout(grid)
+        self.setLayout(layout)
+
+    def toggle_play_stop(self):
+        if self.btn_play_stop.isChecked():
+            self.btn_play_stop.setText('Stop nuage')
+        else:
+            self.btn_play_stop.setText('Lecture nuage')
+        if hasattr(self.parent, 'set_cloud_playing'):
+            self.parent.set_cloud_playing(self.btn_play_stop.isChecked())
+
+    def publish(self, _=None):
+        if hasattr(self.parent, 'publish_cloud_params'):
+            self.parent.publish_cloud_params()
+
+    def get_params(self):
+        """Construit l'instantané immuable des réglages courants du nuage"""
+        return CloudParams(
+            density=float(self.density.value()),
+            size_ms=float(self.size.value()),
+            size_jitter=self.size_jitter.value() / 100.0,
+            position_jitter=self.position_jitter.value() / 100.0,
+            pitch=self.pitch.value() / 10.0,
+            pitch_jitter=self.pitch_jitter.value() / 10.0,
+            pan=self.pan.value() / 100.0,
+            pan_jitter=self.pan_jitter.value() / 100.0,
+            envelope=self.env.currentText(),
+            volume=self.vol.value() / 100.0,
+        )
+
+
 class EqualizerWidget(QWidget):
     """Barres spectrales façon equalizer rétro (transparent)."""
     def __init__(self, main_window=None, n_bands=32, max_blocks=20, parent=None):
@@ -726,6 +657,12 @@ class EqualizerWidget(QWidget):
         self.n_bands = n_bands
         self.max_blocks = max_blocks
         self.levels = np.zeros(n_bands)
+        # Fenêtre et indices de bandes précalculés par taille de FFT et samplerate
+        self.analyzer = BandAnalyzer(n_bands)
+        # Colonne de blocs pré-rendue (recréée si la taille change)
+        self._strip = None
+        self._strip_key = None
+        self._last_written = 0
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setAttribute(Qt.WA_TransparentForMouseEvents)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -736,44 +673,27 @@ class EqualizerWidget(QWidget):
         self._sr = 44100
 
     def process_audio(self):
-        if not self.main_window or not hasattr(self.main_window, 'spectro_queue'):
+        if not self.main_window or not hasattr(self.main_window, 'spectro_ring'):
             self.levels *= 0.9
             self.update()
             return
-        q = self.main_window.spectro_queue
-        chunks = []
-        while not q.empty():
-            try:
-                chunks.append(q.get_nowait())
-            except queue.Empty:
-                break
-        if chunks:
-            audio = np.concatenate(chunks)
-            if audio.ndim > 1:
-                audio = audio.mean(axis=1)
+        ring = self.main_window.spectro_ring
+        written = ring.written
+        if written != self._last_written:
+            self._last_written = written
             # sample rate
             for v in getattr(self.main_window, '_grain_sr', {}).values():
                 if v:
                     self._sr = v
                     break
-            if audio.size < 512:
+            available = ring.available()
+            if available < 512:
                 self.levels *= 0.9
                 self.update()
                 return
-            n_fft = 1024 if audio.size >= 1024 else 512
-            segment = audio[-n_fft:]
-            window = np.hanning(segment.size)
-            spec = np.abs(np.fft.rfft(segment * window))
-            freqs = np.fft.rfftfreq(segment.size, 1.0 / self._sr)
-            edges = np.logspace(np.log10(20), np.log10(self._sr/2), self.n_bands+1)
-            new_levels = []
-            for i in range(self.n_bands):
-                idx = np.where((freqs >= edges[i]) & (freqs < edges[i+1]))[0]
-                if idx.size == 0:
-                    new_levels.append(0)
-                else:
-                    new_levels.append(spec[idx].mean())
-            new_levels = np.array(new_levels)
+            n_fft = 1024 if available >= 1024 else 512
+            segment = ring.latest(n_fft)
+            new_levels = self.analyzer.analyze(segment, self._sr)
             db = 20*np.log10(new_levels+1e-6)
             norm = np.clip((db+60)/60,0,1)
             alpha = 0.5
@@ -782,38 +702,58 @@ class EqualizerWidget(QWidget):
             self.levels *= 0.9
         self.update()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def _bar_strip(self, w, h):
+        """Colonne de blocs en dégradé, rendue une fois par taille puis réutilisée à chaque image."""
+        key = (w, h, self.n_bands, self.max_blocks)
+        if self._strip_key == key:
+            return self._strip
+        band_w = w/self.n_bands
+        bar_area_height = h // 3
+        block_h = bar_area_height / self.max_blocks
+        bar_width = int(band_w * 0.8)
+        bar_height = int(block_h * 0.8)
+        bar_spacing = int(band_w * 0.2)
+        block_spacing = int(block_h * 0.2)
+        ratio = self.devicePixelRatioF()
+        strip = QPixmap(int((bar_spacing//2 + bar_width + 1) * ratio), int(bar_area_height * ratio) + 1)
+        strip.setDevicePixelRatio(ratio)
+        strip.fill(Qt.transparent)
+        painter = QPainter(strip)
         painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        for b in range(self.max_blocks):
+            frac = b/self.max_blocks
+            hue = (1-frac)*120
+            color = QColor.fromHsv(int(hue),255,255)
+            color.setAlpha(220)  # 0=transparent, 255=opaque
+            painter.setBrush(color)
+            y = int(bar_area_height - (b+1)*block_h)
+            painter.drawRoundedRect(bar_spacing//2, y+block_spacing//2, bar_width, bar_height, 2, 2)
+        painter.end()
+        self._strip_key = key
+        self._strip = strip
+        return strip
+
+    def paintEvent(self, event):
         w,h = self.width(), self.height()
         if w==0 or h==0:
             return
+        strip = self._bar_strip(w, h)
+        ratio = strip.devicePixelRatio()
+        strip_w = strip.width() / ratio
         band_w = w/self.n_bands
         # Les barres occupent seulement le tiers bas de la fenêtre
         bar_area_height = h // 3
         y_base = h - bar_area_height
         block_h = bar_area_height / self.max_blocks
-        bar_width = int(band_w * 0.8)
-        bar_height = int(block_h * 0.8)
-        bar_spacing = int(band_w * 0.2)
-        block_spacing = int(block_h * 0.2)
-        for i,lvl in enumerate(self.levels):
-            if lvl <= 0:
-                continue
-            blocks = int(lvl*self.max_blocks)
-            if blocks == 0:
+        painter = QPainter(self)
+        # Chaque barre est la partie basse de la colonne pré-rendue (un seul blit)
+        for i, blocks in enumerate((self.levels * self.max_blocks).astype(int)):
+            if blocks <= 0:
                 continue
-            for b in range(blocks):
-                frac = b/self.max_blocks
-                hue = (1-frac)*120
-                color = QColor.fromHsv(int(hue),255,255)
-                color.setAlpha(220)  # 0=transparent, 255=opaque
-                painter.setBrush(color)
-                painter.setPen(Qt.NoPen)
-                x=int(i*band_w)
-                y=int(y_base + bar_area_height - (b+1)*block_h)
-                painter.drawRoundedRect(x+bar_spacing//2, y+block_spacing//2, 
-                                      bar_width, bar_height, 2, 2)
+            top = int(bar_area_height - min(blocks, self.max_blocks)*block_h)
+            painter.drawPixmap(QRectF(int(i*band_w), y_base + top, strip_w, bar_area_height - top), strip,
+                               QRectF(0, top * ratio, strip.width(), (bar_area_height - top) * ratio))
         painter.end()
 
 class ImageWindow(QMainWindow):
@@ -836,7 +776,9 @@ class ImageWindow(QMainWindow):
             self.image_label.setStyleSheet("font-size: 16pt; color: white; background-color: #222;")
         stack.addWidget(self.image_label)
         # Equalizer overlay
-        self.equalizer = EqualizerWidget(main_window=parent)
+        # Nombre de bandes configurable ('equalizer_bands' dans settings.json)
+        n_bands = int(getattr(parent, 'settings', {}).get('equalizer_bands', 32))
+        self.equalizer = EqualizerWidget(main_window=parent, n_bands=n_bands)
         self.equalizer.setStyleSheet("background-color: rgba(0,0,0,120)") # Fond transparent
         stack.addWidget(self.equalizer)
         self.equalizer.raise_()
@@ -886,6 +828,29 @@ class ImageWindow(QMainWindow):
         self._moving = False
 
 class MainWindow(QMainWindow):
+    # (contrôle du GrainControlWidget, signal, méthode appelée avec le nom de la voix)
+    GRAIN_CONNECTIONS = (
+        ('size', 'valueChanged', 'on_new_zone_selected'),
+        ('env', 'currentIndexChanged', 'update_grain'),
+        ('vol', 'valueChanged', 'publish_params'),
+        ('reverse', 'stateChanged', 'update_grain'),
+        ('mono', 'stateChanged', 'update_grain'),
+        ('pitch', 'valueChanged', 'on_pitch_changed'),
+        ('pitch_mode', 'currentIndexChanged', 'update_grain'),
+        ('stretch', 'valueChanged', 'update_grain'),
+        ('reverb', 'stateChanged', 'publish_params'),
+        ('reverb_amount', 'valueChanged', 'publish_params'),
+        ('reverb_roomsize', 'valueChanged', 'publish_params'),
+        ('reverb_decay', 'valueChanged', 'publish_params'),
+        ('delay', 'stateChanged', 'update_grain'),
+        ('delay_drywet', 'valueChanged', 'update_grain'),
+        ('dist', 'stateChanged', 'update_grain'),
+        ('dist_amount', 'valueChanged', 'update_grain'),
+        ('dist_drywet', 'valueChanged', 'update_grain'),
+        ('ringmod', 'stateChanged', 'update_grain'),
+        ('ringmod_freq', 'valueChanged', 'update_grain'),
+    )
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("BeerTone Granular by Beercan.fr")
@@ -901,9 +866,7 @@ class MainWindow(QMainWindow):
         self.image_window = None
         
         # Initialiser les fenêtres d'effets
-        self.bass_effects_window = None
-        self.medium_effects_window = None
-        self.treble_effects_window = None
+        self.effects_windows = {}
         
         # Suivre les déplacements pour éviter la récursion
         self._moving = False
@@ -941,8 +904,11 @@ class MainWindow(QMainWindow):
         self.splitter = QSplitter(Qt.Vertical)
         self.splitter.setChildrenCollapsible(False)
         self.splitter.setStyleSheet("QSplitter::handle { background: #3b6c7e; height: 8px; }")
-        # Création de WaveformCanvas avec politique de taille adaptative
-        self.waveform = WaveformCanvas(self)
+        # Création de la vue waveform avec politique de taille adaptative
+        # ('waveform_backend' dans settings.json : 'matplotlib' ou 'qpainter', sans Matplotlib)
+        # ('waveform_max_fps' plafonne la cadence des rafraîchissements de zoom/déplacement)
+        self.waveform = make_waveform_widget(self.settings.get('waveform_backend', 'matplotlib'), self,
+                                             max_fps=int(self.settings.get('waveform_max_fps', 60)))
         # On force la waveform à 1/3 de la hauteur de la fenêtre
         tier = int(self.height() / 9)
         self.waveform.setMinimumHeight(tier)
@@ -1037,126 +1003,82 @@ class MainWindow(QMainWindow):
         
         # Finaliser le groupe
         top_controls_box.setLayout(top_controls_inner_layout)
-        # --- Ajout des widgets de contrôle du grain bass, medium et treble ---
-        self.grain_bass = GrainControlWidget("bass", parent=self)
-        self.grain_medium = GrainControlWidget("medium", parent=self)
-        self.grain_treble = GrainControlWidget("treble", parent=self)
+        # Moteur granulaire sans Qt (grains, chaîne d'effets, mixeur) ; la fenêtre n'en est qu'un client.
+        # Les résultats du traitement en arrière-plan reviennent dans le thread GUI par un signal.
+        self._grain_bridge = GrainResultBridge(self)
+        self._grain_bridge.processed.connect(self._on_grain_processed)
+        # Taille de bloc audio et voix nommées (configurables dans settings.json)
+        self.audio_blocksize = int(self.settings.get('audio_blocksize', 1024))
+        self.engine = GranularEngine(
+            voices=self.settings.get('voices') or VOICES,
+            blocksize=self.audio_blocksize,
+            xfade_ms=float(self.settings.get('grain_xfade_ms', 5.0)),
+            swap_mode=self.settings.get('grain_swap', 'crossfade'),
+            max_workers=self.settings.get('processing_workers'),
+            on_processed=self._grain_bridge.processed.emit,
+        )
+        # --- Un widget de contrôle par voix du moteur ---
+        self.grain_widgets = {name: GrainControlWidget(name, parent=self) for name in self.engine.voices}
         self.bottom_layout.addWidget(top_controls_box)
-        self.bottom_layout.addWidget(self.grain_bass)
-        self.bottom_layout.addWidget(self.grain_medium)
-        self.bottom_layout.addWidget(self.grain_treble)
+        for widget in self.grain_widgets.values():
+            self.bottom_layout.addWidget(widget)
+        self.grain_cloud = GrainCloudWidget(parent=self)
+        self.bottom_layout.addWidget(self.grain_cloud)
         self.bottom_layout.addStretch(0)
         # 1 part pour la waveform, 2 parts pour le reste
         self.splitter.setStretchFactor(0, 1)
         self.splitter.setStretchFactor(1, 2)
         
-        # Pour chaque bande, état de lecture et thread séparés
-        self._grain_looping = {'bass': False, 'medium': False, 'treble': False}
-        self._grain_thread = {'bass': None, 'medium': None, 'treble': None}
-        self._stop_grain = {'bass': threading.Event(), 'medium': threading.Event(), 'treble': threading.Event()}
-        self._grain = {'bass': None, 'medium': None, 'treble': None}
-        self._grain_sr = {'bass': None, 'medium': None, 'treble': None}
-        self._grain_proc = {'bass': None, 'medium': None, 'treble': None}
-        # Ajout d'un dictionnaire pour stocker les grains "secs" (avant réverb)
-        self._grain_dry = {'bass': None, 'medium': None, 'treble': None}
-        # Ajout d'un dictionnaire pour stocker la position de début réelle de chaque grain
-        self._grain_start = {'bass': None, 'medium': None, 'treble': None}
-        
-        # Pour la lecture polyphonique
-        self.poly_playing = False
-        self.stream_stop_event = threading.Event()
-        self.output_stream = None
-        
-        # Actifs pour le mixeur central
-        self.active_grains = {'bass': False, 'medium': False, 'treble': False}
-        
-        # File d'attente pour le spectrogramme
-        self.spectro_queue = queue.Queue(maxsize=50)
+        # Vues sur l'état du moteur (mêmes dictionnaires)
+        self._grain = self.engine.grain
+        self._grain_sr = self.engine.grain_sr
+        self._grain_start = self.engine.grain_start
+        self._grain_proc = self.engine.grain_proc
+        self.active_grains = self.engine.active
+        self.param_store = self.engine.params
+        self.grain_processor = self.engine.processor
+        # Mesure du budget CPU par callback
+        self.callback_budget = self.engine.budget
+
+        # Derniers échantillons joués (canal gauche) pour le spectrogramme, écrits par le callback audio
+        self.spectro_ring = SampleRing(4096)
+        self.engine.tap = self.spectro_ring.write
+
+        # Fichier chargé (AudioStore, dans self.engine.audio) et cache disque associé
+        self._loader = None
+        self._exporter = None    # MixExporter en cours
+        cache_max_mb = self.settings.get('cache_max_mb')
+        self.audio_cache = AudioCache(
+            root=self.settings.get('cache_dir'),
+            max_bytes=int(cache_max_mb) * 1024 ** 2 if cache_max_mb else DEFAULT_MAX_BYTES,
+        )
         
         # Si un précédent fichier existe, le charger
         if self.last_file and os.path.exists(self.last_file):
             self.display_audio(self.last_file)
         elif self.waveform.data is not None:
             self.place_random_zone()
-        # Connexion des boutons du widget grain_bass
-        self.grain_bass.btn_play_stop.clicked.connect(lambda: self.grain_bass.toggle_play_stop())
-        # Connexion des contrôles à update_grain
-        self.grain_bass.size.valueChanged.connect(lambda: self.on_new_zone_selected('bass'))
-        self.grain_bass.env.currentIndexChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.vol.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.reverse.stateChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.pitch.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.stretch.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.reverb.stateChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.reverb_amount.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.reverb_roomsize.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.reverb_decay.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.delay.stateChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.delay_drywet.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.dist.stateChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.dist_amount.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.dist_drywet.valueChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.ringmod.stateChanged.connect(lambda: self.update_grain('bass'))
-        self.grain_bass.ringmod_freq.valueChanged.connect(lambda: self.update_grain('bass'))
-        # Connexion des boutons et contrôles pour medium
-        self.grain_medium.btn_play_stop.clicked.connect(lambda: self.grain_medium.toggle_play_stop())
-        self.grain_medium.size.valueChanged.connect(lambda: self.on_new_zone_selected('medium'))
-        self.grain_medium.env.currentIndexChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.vol.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.reverse.stateChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.pitch.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.stretch.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.reverb.stateChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.reverb_amount.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.reverb_roomsize.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.reverb_decay.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.delay.stateChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.delay_drywet.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.dist.stateChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.dist_amount.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.dist_drywet.valueChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.ringmod.stateChanged.connect(lambda: self.update_grain('medium'))
-        self.grain_medium.ringmod_freq.valueChanged.connect(lambda: self.update_grain('medium'))
-        # Connexion des boutons et contrôles pour treble
-        self.grain_treble.btn_play_stop.clicked.connect(lambda: self.grain_treble.toggle_play_stop())
-        self.grain_treble.size.valueChanged.connect(lambda: self.on_new_zone_selected('treble'))
-        self.grain_treble.env.currentIndexChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.vol.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.reverse.stateChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.pitch.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.stretch.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.reverb.stateChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.reverb_amount.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.reverb_roomsize.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.reverb_decay.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.delay.stateChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.delay_drywet.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.dist.stateChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.dist_amount.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.dist_drywet.valueChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.ringmod.stateChanged.connect(lambda: self.update_grain('treble'))
-        self.grain_treble.ringmod_freq.valueChanged.connect(lambda: self.update_grain('treble'))
+        # Contrôles de chaque voix (volume et réverb sont appliqués en temps réel :
+        # ils ne font que publier un nouvel instantané de paramètres pour le mixeur)
+        for name, widget in self.grain_widgets.items():
+            self._connect_grain_widget(name, widget)
         # Connexion des boutons principaux
         self.btn_load.clicked.connect(self.load_audio_file)
         # Le bouton fusionne (plus besoin des connexions séparées)
         # self.btn_play_all.clicked.connect(self.play_all_grains)
         # self.btn_stop_all.clicked.connect(self.stop_all_grains)
-        # Pour la lecture en boucle
-        self._loop_playing = False
-        self._loop_thread = None
-        self._stop_loop = threading.Event()
-        self._loop_lock = threading.Lock()
-        # Si un précédent fichier existe, le charger
-        if self.last_file and os.path.exists(self.last_file):
-            self.display_audio(self.last_file)
-        elif self.waveform.data is not None:
-            self.place_random_zone()
         # Créer les fenêtres d'effets sans les afficher
         self.create_effects_windows()
         # --- Appliquer les valeurs par défaut sur les grains dès le lancement ---
-        for grain_type in ("bass", "medium", "treble"):
+        for grain_type in self.engine.voices:
             self.select_random_grain(grain_type=grain_type)
 
+    def _connect_grain_widget(self, name, widget):
+        widget.btn_play_stop.clicked.connect(lambda _=False, w=widget: w.toggle_play_stop())
+        for control, signal, method in self.GRAIN_CONNECTIONS:
+            getattr(getattr(widget, control), signal).connect(
+                lambda *_, n=name, m=method: getattr(self, m)(n))
+
     def get_zone_indices(self):
         # Utilise la zone globale
         data = self.waveform.data
@@ -1169,173 +1091,70 @@ class MainWindow(QMainWindow):
         i1 = int(t1 * sr)
         return i0, i1, data, sr
 
-    def select_random_grain(self, grain_ms=None, grain_type='bass'):
-        # Synchronise la zone de prélèvement avec la zone jaune affichée
-        # (i0, i1) doivent TOUJOURS correspondre à la zone jaune
-        i0 = int(self.waveform.selection_start * self.waveform.sr)
-        i1 = int((self.waveform.selection_start + self.waveform.selection_size) * self.waveform.sr)
-        data = self.waveform.data
-        sr = self.waveform.sr
-        if i0 is None or i1 is None or data is None or sr is None or (i1-i0) < 2:
-            self._grain[grain_type] = None
-            self._grain_sr[grain_type] = None
-            self._grain_start[grain_type] = None
-            return
-        if grain_ms is None:
-            grain_ms = getattr(self, f'grain_{grain_type}').size.value()
-        grain_len = int(sr * grain_ms / 1000)
-        # Le début du grain DOIT être dans la zone de prélèvement
-        if (i1 - i0) <= 1:
-            start = i0
-        else:
-            start = np.random.randint(i0, i1)
-        end = start + grain_len
-        self._grain[grain_type] = data[start:end].copy()
-        self._grain_sr[grain_type] = sr
-        self._grain_start[grain_type] = start
-        # print(f"[DEBUG] select_random_grain({grain_type}): zone {i0}-{i1} samples, grain_len={grain_len}, start={start}, end={end}")
+    @property
+    def audio(self):
+        return self.engine.audio
+
+    @property
+    def mixer(self):
+        return self.engine.mixer
+
+    @property
+    def output_stream(self):
+        return self.engine.stream
+
+    def select_random_grain(self, grain_ms=None, grain_type=None):
+        # Synchronise la zone de prélèvement avec la zone jaune affichée : le début du grain
+        # DOIT être dans la zone de prélèvement (vue sur les échantillons, aucune copie)
+        if grain_type is None:
+            grain_type = self.engine.voices[0]
+        self.publish_params(grain_type)
+        self.engine.select_grain(grain_type, self.waveform.selection_start, self.waveform.selection_size, grain_ms)
         self.update_grain(grain_type)
 
-    def update_grain(self, grain_type='bass'):
-        # print(f"[DEBUG] update_grain called for {grain_type}")
-        if self._grain[grain_type] is None or self._grain_sr[grain_type] is None:
-            # print(f"[ERROR] update_grain: _grain[{grain_type}] or _grain_sr[{grain_type}] is None")
-            self._grain_proc[grain_type] = None
-            return
-        grain = self._grain[grain_type].copy()
-        sr = self._grain_sr[grain_type]
-        # Reverse
-        if getattr(self, f'grain_{grain_type}').reverse.isChecked():
-            grain = grain[::-1]
-        # Stretch (timestrech)
-        stretch = getattr(self, f'grain_{grain_type}').stretch.value()
-        if stretch != 1.0:
-            try:
-                # convertir en mono pour éviter problème n_fft et longueur
-                grain_mono = np.mean(grain, axis=1) if grain.ndim == 2 else grain
-                if len(grain_mono) > 2048:  # éviter warning n_fft
-                    grain_mono = librosa.effects.time_stretch(y=grain_mono.astype(np.float32), rate=stretch)
-                else:
-                    # trop court, simple resample
-                    resampled_len = int(len(grain_mono) / stretch)
-                    grain_mono = scipy.signal.resample(grain_mono, resampled_len)
-                grain = grain_mono  # stocke mono temporairement
-            except Exception as e:
-                # print(f"[ERROR] time_stretch: {e}")
-                pass
-        # Pitch (transposition)
-        pitch = getattr(self, f'grain_{grain_type}').pitch.value()
-        if pitch != 0:
-            try:
-                grain_mono = np.mean(grain, axis=1) if grain.ndim == 2 else grain
-                grain_mono = librosa.effects.pitch_shift(y=grain_mono.astype(np.float32), n_steps=pitch, sr=sr)
-                grain = grain_mono
-            except Exception as e:
-                # print(f"[ERROR] pitch_shift: {e}")
-                pass
-        # After time/pitch, ensure stereo
-        if grain.ndim == 1:
-            grain = np.stack([grain, grain], axis=-1)
-        # Panning (mono -> stéréo)
-        pan = 0.0
-        if grain.ndim == 1:
-            grain = np.stack([grain, grain], axis=-1)
-        # Enveloppe
-        env_type = getattr(self, f'grain_{grain_type}').env.currentText()
-        n = grain.shape[0]
-        if env_type == "Hann":
-            env = np.hanning(n)
-        elif env_type == "Hamming":
-            env = np.hamming(n)
-        elif env_type == "Gauss":
-            # Sigma = n/6 pour rester dans les limites du signal
-            sigma = n/6
-            x = np.linspace(-3, 3, n)
-            env = np.exp(-0.5 * x**2)
-        elif env_type == "Lin":
-            env = np.linspace(0, 1, n//2)
-            env = np.concatenate([env, np.linspace(1, 0, n - n//2)])
-        elif env_type == "Rect":
-            env = np.ones(n)
-        else:
-            env = np.hanning(n)
-        for c in range(grain.shape[1]):
-            grain[:, c] *= env
-        # Effet Ringmod
-        if getattr(self, f'grain_{grain_type}').ringmod.isChecked():
-            freq = getattr(self, f'grain_{grain_type}').ringmod_freq.value()
-            if freq > 0:
-                t = np.arange(0, len(grain))/sr
-                mod = np.sin(2*np.pi*freq*t)
-                for c in range(grain.shape[1]):
-                    grain[:, c] *= mod
-        # Distortion
-        if getattr(self, f'grain_{grain_type}').dist.isChecked():
-            dist_amount = getattr(self, f'grain_{grain_type}').dist_amount.value() / 100.0
-            drywet = getattr(self, f'grain_{grain_type}').dist_drywet.value() / 100.0
-            dry = 1.0 - drywet
-            # Hard clipping
-            g_max = np.max(np.abs(grain))
-            if g_max > 0:
-                # Normaliser avant distortion
-                grain_norm = grain / g_max
-                # Oversaturation
-                k = 1.0 + dist_amount * 9  # 1 à 10
-                wet = np.tanh(grain_norm * k) / np.tanh(k)
-                # Mix dry/wet
-                grain = (dry * grain + drywet * wet * g_max)
-        # Delay (simple echo)
-        if getattr(self, f'grain_{grain_type}').delay.isChecked():
-            delay_samps = int(0.03 * sr)
-            wet = getattr(self, f'grain_{grain_type}').delay_drywet.value() / 100.0
-            dry = 1.0 - wet
-            if grain.shape[0] > delay_samps:
-                delayed = np.zeros_like(grain)
-                delayed[delay_samps:] = grain[:-delay_samps]
-                grain = dry * grain + wet * delayed
-        # Stockons le grain sans réverb (pour permettre application en temps réel)
-        self._grain_dry[grain_type] = grain.astype(np.float32).copy()
-        # Stockons le grain final pour la lecture (sans réverb pour le moment)
-        # La réverb sera appliquée en temps réel dans le callback audio si activée
-        self._grain_proc[grain_type] = grain.astype(np.float32)
-        # print(f"[DEBUG] update_grain: grain_proc[{grain_type}] shape: {grain.shape if hasattr(grain, 'shape') else type(grain)}")
-        # Si ce grain est actuellement actif en lecture, redémarrer le mixeur pour appliquer les changements en temps réel
-        if self.active_grains.get(grain_type, False):
-            self._restart_mixer()
-
-    def ensure_valid_shape(self, g):
-        if g.ndim == 1:
-            # Déjà mono, c'est bon
-            return g
-        elif g.ndim == 2:
-            if g.shape[1] == 2:
-                # Déjà stéréo, c'est bon
-                return g
-            else:
-                # Forme inhabituelle (comme 20 canaux), prendre la moyenne
-                return np.mean(g, axis=1)
+    def update_cloud_zone(self):
+        """Recopie la zone jaune comme source du nuage de grains"""
+        self.engine.set_cloud_zone(self.waveform.selection_start, self.waveform.selection_size)
+
+    def publish_cloud_params(self):
+        self.engine.set_cloud_params(self.grain_cloud.get_params())
+
+    def set_cloud_playing(self, playing):
+        if playing:
+            if self.engine.cloud_source is None:
+                self.update_cloud_zone()
+            self.publish_cloud_params()
+            self.open_visual_window()
+        self.engine.set_cloud_active(playing)
+
+    def publish_params(self, grain_type):
+        """Publie l'instantané des réglages du grain vers le moteur (lu par le mixeur temps réel)"""
+        params = self.grain_widgets[grain_type].get_params()
+        self.engine.set_params(grain_type, params)
+        return params
+
+    def update_grain(self, grain_type):
+        # Chaîne reverse → stretch → pitch → enveloppe → ringmod → distorsion → delay, calculée en
+        # arrière-plan par le moteur
+        self.publish_params(grain_type)
+        self.engine.submit(grain_type)
+
+    def on_pitch_changed(self, grain_type):
+        # En mode 'tape', la transposition est appliquée à la lecture : rien à recalculer
+        if self.grain_widgets[grain_type].pitch_mode.currentData() == 'tape':
+            self.publish_params(grain_type)
         else:
-            # Forme vraiment étrange, convertir en mono
-            return np.mean(np.array(g).reshape(-1, g.size//g.shape[0]), axis=1)
+            self.update_grain(grain_type)
 
-    def apply_pan(self, g, pan):
+    def _on_grain_processed(self, grain_type, generation, grain, error):
+        """Reçoit (dans le thread GUI) un grain traité par le moteur"""
         try:
-            if g.ndim == 1:
-                # Dupliquer le signal mono sur les deux canaux (pas de panning)
-                return np.stack([g, g], axis=-1)
-            elif g.ndim == 2 and g.shape[1] == 2:
-                # Signal déjà stéréo, retourner tel quel
-                return g
-            else:
-                # Si forme invalide, convertir en mono puis dupliquer
-                g_mono = np.mean(g, axis=1) if g.ndim > 1 else g
-                return np.stack([g_mono, g_mono], axis=-1)
+            # Grain sans réverb : la réverb est appliquée en temps réel par le mixeur si activée
+            self.engine.apply_result(grain_type, generation, grain, error)
         except Exception as e:
-            # print(f"[ERROR] Problème dans apply_pan: {e}")
-            # Créer un signal silencieux de secours
-            return np.zeros((1000, 2))  # Signal de secours silencieux
+            self.label_file.setText(f'Erreur de traitement du grain {grain_type} : {e}')
 
-    def play_grain_loop(self, grain_type='bass'):
+    def play_grain_loop(self, grain_type):
         # Active uniquement le grain demandé
         if self._grain_proc[grain_type] is None or self._grain_sr[grain_type] is None:
             self.label_file.setText(f'Aucun grain {grain_type} sélectionné.')
@@ -1343,11 +1162,11 @@ class MainWindow(QMainWindow):
         # Active le grain sans désactiver les autres
         self.active_grains[grain_type] = True
         self.open_visual_window()
-        self._restart_mixer()
+        self._update_playback()
 
-    def stop_grain_loop(self, grain_type='bass'):
+    def stop_grain_loop(self, grain_type):
         self.active_grains[grain_type] = False
-        self._restart_mixer()
+        self._update_playback()
 
     def play_all_grains(self):
         """
@@ -1356,128 +1175,30 @@ class MainWindow(QMainWindow):
         self.open_visual_window()
         
         # Active tous les grains disponibles puis démarre le mixeur
-        for g in ('bass','medium','treble'):
+        for g in self.engine.voices:
             self.active_grains[g] = (self._grain_proc[g] is not None)
-        self._restart_mixer()
+        self._update_playback()
         return
 
-    def _restart_mixer(self):
-        """(Re)démarre le mixeur central avec la liste courante de grains actifs."""
-        # Arrête stream courant
-        self.stop_all_grains()
-        # Réinitialise le drapeau d'arrêt pour permettre au nouveau stream de fonctionner
-        self.stream_stop_event.clear()
-        # Construits la liste des grains actifs
-        grains = []
-        grain_names = []
-        pans = []
-        for g, active in self.active_grains.items():
-            if not active:
-                continue
-            grain = self._grain_proc.get(g)
-            if grain is None:
-                continue
-            grains.append(grain.astype(np.float32))
-            grain_names.append(g)
-            pans.append(0.0)  # Fixé à 0 car pan supprimé
-
-        # Si aucun grain actif
-        if not grains:
-            return
-
-        # Position de lecture dans chaque grain
-        positions = [0] * len(grains)
-        # Longueur de chaque grain
-        lengths = [len(g) for g in grains]
-
-        # Convertir les grains en stéréo
-        stereo_grains = [self.apply_pan(g, p) for g,p in zip(grains, pans)]
-        
-        # Fonction de callback pour le stream
-        def callback(outdata, frames, time, status):
-            outdata.fill(0)  # Initialiser le buffer à zéro
-            if self.stream_stop_event.is_set():
-                raise sd.CallbackStop()
-                
-            for i,g in enumerate(stereo_grains):
-                pname = grain_names[i]
-                vol = getattr(self, f'grain_{pname}').vol.value()/100.0
-                pos = positions[i]
-
-                # Appliquer la réverb uniquement si la case est cochée
-                if getattr(self, f'grain_{pname}').reverb.isChecked():
-                    delay_ms = 100 + 400 * getattr(self, f'grain_{pname}').reverb_roomsize.value() / 100.0
-                    delay_samples = int(delay_ms * self._grain_sr[pname] / 1000)
-                    # Buffer circulaire pour la réverb (par canal)
-                    if not hasattr(self, '_reverb_buffer'):
-                        self._reverb_buffer = {}
-                    key = f'{pname}_reverb'
-                    if key not in self._reverb_buffer or self._reverb_buffer[key].shape[0] != delay_samples:
-                        self._reverb_buffer[key] = np.zeros((delay_samples, 2), dtype=np.float32)
-                        self._reverb_idx = 0
-                    buf = self._reverb_buffer[key]
-                    idx_buf = self._reverb_idx
-                    decay = 0.2 + 0.75 * getattr(self, f'grain_{pname}').reverb_decay.value() / 1000.0  # decay_factor ~ room_size
-                    reverb_amount = getattr(self, f'grain_{pname}').reverb_amount.value() / 100.0
-                    for j in range(frames):
-                        idx = (pos+j)%lengths[i]
-                        dry_sample = g[idx]
-                        echo = buf[idx_buf]
-                        wet_sample = dry_sample + echo * decay
-                        buf[idx_buf] = wet_sample
-                        idx_buf = (idx_buf + 1) % delay_samples
-                        final_sample = dry_sample * (1-reverb_amount) + wet_sample * reverb_amount
-                        outdata[j] += final_sample * vol
-                    self._reverb_buffer[key] = buf
-                    self._reverb_idx = idx_buf
-                else:
-                    # Sans réverb, lecture normale et reset du buffer pour éviter l'emballement
-                    if hasattr(self, '_reverb_buffer'):
-                        key = f'{pname}_reverb'
-                        if key in self._reverb_buffer:
-                            self._reverb_buffer[key].fill(0)
-                    for j in range(frames):
-                        idx = (pos+j)%lengths[i]
-                        outdata[j] += g[idx] * vol
-                positions[i] = (positions[i]+frames)%lengths[i]
-            
-            # Normalisation simple si plusieurs grains actifs
-            if len(grains) > 0:
-                outdata /= len(grains)
-            
-            # Envoi des données audio au spectrogramme (canal gauche)
-            try:
-                if self.spectro_queue.full():
-                    self.spectro_queue.get_nowait()
-                self.spectro_queue.put_nowait(outdata[:,0].copy())
-            except Exception:
-                pass
-        
-        # Démarrer le stream
-        self.output_stream = sd.OutputStream(
-            samplerate=self._grain_sr[grain_names[0]],
-            channels=2,
-            callback=callback,
-            blocksize=1024,
-            finished_callback=self._stream_finished_callback
-        )
-        self.output_stream.start()
-
-    def _stream_finished_callback(self):
-        self.stream_stop_event.set()
+    def _update_playback(self):
+        """Reporte l'état actif des grains dans le moteur, en ouvrant le flux audio au besoin."""
+        self.engine.update_playback()
 
     def stop_all_grains(self):
-        if self.output_stream:
-            self.output_stream.stop()
-            self.output_stream = None
-        self.stream_stop_event.set()
+        """Coupe (en fondu) toutes les voix ; le flux audio reste ouvert."""
+        self.engine.stop_all()
+        if self.grain_cloud.btn_play_stop.isChecked():
+            self.grain_cloud.btn_play_stop.setChecked(False)
+            self.grain_cloud.btn_play_stop.setText('Lecture nuage')
 
     def get_zone_size_ms(self):
-        return self.grain_bass.size.value()
+        return self.grain_widgets[self.engine.voices[0]].size.value()
 
     def on_new_zone_selected(self, grain_type=None):
         if grain_type is None:
-            grain_type = 'bass'
+            grain_type = self.engine.voices[0]
+            # Nouvelle zone jaune : le nuage y puise désormais ses grains
+            self.update_cloud_zone()
         self.select_random_grain(grain_type=grain_type)
 
     def random_grain_action(self, grain_type):
@@ -1506,20 +1227,12 @@ class MainWindow(QMainWindow):
             self.display_audio(file)
 
     def display_audio(self, file):
+        """Lance le chargement asynchrone de `file` ; l'interface et les grains en lecture continuent."""
         # Ajout d'une barre de progression pour le chargement du fichier audio
-        import matplotlib.pyplot as plt
-        import numpy as np
-        import os
-        
         if not hasattr(self, 'progress_bar'):
-            self.progress_bar = QProgressBar(self)
-            self.progress_bar.setGeometry(100, 40, 400, 25)
-            self.progress_bar.setStyleSheet("QProgressBar { color: white; background-color: #222; border: 2px solid #3b6c7e; border-radius: 8px; text-align: center; } QProgressBar::chunk { background-color: #ffcc00; }")
-            self.progress_bar.setAlignment(Qt.AlignCenter)
-            self.bottom_layout.insertWidget(0, self.progress_bar)
+            self.progress_bar = self._make_progress_bar()
         self.progress_bar.setValue(0)
         self.progress_bar.show()
-        QCoreApplication.processEvents()
 
         self.last_file = file
         self.last_dir = os.path.dirname(file)
@@ -1527,81 +1240,58 @@ class MainWindow(QMainWindow):
         self.settings['last_file'] = self.last_file
         save_settings(self.settings)
 
-        # --- Nouvelle logique : cache waveform ---
-        waveform_cache_file = file + ".waveform.npy"
-        sr_cache_file = file + ".sr.txt"
-        if os.path.exists(waveform_cache_file) and os.path.exists(sr_cache_file):
-            try:
-                data = np.load(waveform_cache_file).astype(np.float32)
-                with open(sr_cache_file, 'r') as f:
-                    sr = int(f.read())
-                self.progress_bar.setValue(100)
-                QCoreApplication.processEvents()
-                self.progress_bar.hide()
-                self.waveform.plot_waveform(data, sr)
-                duration = len(data) / sr
-                default_size = min(0.5, duration)
-                default_start = max(0, (duration - default_size) / 2)
-                self.waveform.selection_start = default_start
-                self.waveform.selection_size = default_size
-                for grain_type in ('bass', 'medium', 'treble'):
-                    self.select_random_grain(grain_type=grain_type)
-                self.waveform.draw_selection()
-                self.waveform.zoom_to_selection()
-                self.label_file.setText(file)
-                return
-            except Exception:
-                pass  # Si erreur, on régénère
-        # --- Fin logique cache ---
-
-        # Lecture par blocs pour simuler la progression
-        file_info = sf.info(file)
-        frames_total = file_info.frames
-        blocksize = 44100 * 2  # 2 secondes par bloc (ajuster si besoin)
-        data_blocks = []
-        with sf.SoundFile(file) as f:
-            sr = f.samplerate
-            while True:
-                block = f.read(blocksize)
-                if block.size == 0:
-                    break
-                data_blocks.append(block)
-                progress = min(int(100 * f.tell() / frames_total), 100)
-                self.progress_bar.setValue(progress)
-                QCoreApplication.processEvents()
-        data = np.concatenate(data_blocks) if len(data_blocks) > 1 else data_blocks[0]
+        # Un nouveau fichier annule le chargement en cours
+        if self._loader is not None:
+            self._loader.cancel()
+        # --- Cache central (versionné, validé par taille/date, borné en taille) ---
+        # Au premier chargement, une seule passe de lecture par blocs écrit directement les
+        # échantillons dans un .npy mappé en mémoire et construit la pyramide min/max
+        loader = AudioLoader(file, self.audio_cache, self)
+        loader.progress.connect(lambda value: self._on_load_progress(loader, value))
+        loader.loaded.connect(lambda f, store: self._on_audio_loaded(loader, f, store))
+        loader.failed.connect(lambda f, error: self._on_load_failed(loader, f, error))
+        loader.finished.connect(loader.deleteLater)
+        self._loader = loader
+        self.label_file.setText(f'Chargement de {file}...')
+        loader.start()
+
+    def _make_progress_bar(self):
+        bar = QProgressBar(self)
+        bar.setGeometry(100, 40, 400, 25)
+        bar.setStyleSheet("QProgressBar { color: white; background-color: #222; border: 2px solid #3b6c7e; border-radius: 8px; text-align: center; } QProgressBar::chunk { background-color: #ffcc00; }")
+        bar.setAlignment(Qt.AlignCenter)
+        self.bottom_layout.insertWidget(0, bar)
+        return bar
+
+    def _on_load_progress(self, loader, value):
+        if loader is self._loader:
+            self.progress_bar.setValue(value)
+
+    def _on_load_failed(self, loader, file, error):
+        if loader is not self._loader:
+            return
+        self._loader = None
+        self.progress_bar.hide()
+        self.label_file.setText(f'Erreur de chargement : {error}')
+
+    def _on_audio_loaded(self, loader, file, store):
+        if loader is not self._loader:
+            return  # Résultat d'un chargement annulé
+        self._loader = None
         self.progress_bar.setValue(100)
-        QCoreApplication.processEvents()
         self.progress_bar.hide()
 
-        # Sauvegarder la waveform pour la prochaine fois
-        try:
-            # --- Conversion en mono & float32 ---
-            if data.ndim == 2:
-                data = np.mean(data, axis=1)
-            data = data.astype(np.float32)
-            # --- Décimation pour réduire la taille (cible ~8 kHz) ---
-            step = max(1, int(sr // 8000))
-            if step > 1:
-                data = data[::step]
-                sr = int(sr / step)
-            # Conversion float16 pour gagner 2x
-            data_to_save = data.astype(np.float16)
-            np.save(waveform_cache_file, data_to_save)
-            with open(sr_cache_file, 'w') as f:
-                f.write(str(sr))
-        except Exception:
-            pass
-
-        self.waveform.plot_waveform(data, sr)
+        # Synthèse sur les échantillons pleine résolution, affichage sur la pyramide (~8 kHz équivalent)
+        self.engine.set_audio(store)
+        display_data, display_sr = store.display(target_rate=8000)
+        self.waveform.plot_waveform(display_data, display_sr, pyramid=store.pyramid, source_sr=store.sr)
         # --- Ajout : définir une sélection par défaut (centrée, 0.5s ou moins si fichier court) ---
-        duration = len(data) / sr
-        default_size = min(0.5, duration)  # 0.5s max, ou toute la durée si plus court
-        default_start = max(0, (duration - default_size) / 2)  # centré
+        default_start, default_size = store.default_zone(0.5)  # 0.5s max, centrée
         self.waveform.selection_start = default_start
         self.waveform.selection_size = default_size
-        # --- Initialiser les 3 grains aléatoirement dans la zone ---
-        for grain_type in ('bass', 'medium', 'treble'):
+        self.update_cloud_zone()
+        # --- Initialiser les grains de chaque voix aléatoirement dans la zone ---
+        for grain_type in self.engine.voices:
             self.select_random_grain(grain_type=grain_type)
         # --- Afficher la sélection et zoomer (après création des grains) ---
         self.waveform.draw_selection()
@@ -1614,29 +1304,10 @@ class MainWindow(QMainWindow):
             start = np.random.uniform(0, duration - 0.5)
             self.waveform.selection_start = start
             self.waveform.selection_size = 0.5
+            self.update_cloud_zone()
             self.waveform.draw_selection()
             self.waveform.zoom_to_selection()
 
-    def start_loop_playback(self):
-        self._loop_playing = True
-        self._stop_loop.clear()
-        self._loop_thread = threading.Thread(target=self._loop_playback)
-        self._loop_thread.start()
-
-    def _loop_playback(self):
-        while not self._stop_loop.is_set():
-            for g in ('bass', 'medium', 'treble'):
-                if self._grain_looping[g]:
-                    self.play_grain_loop(g)
-            time.sleep(0.5)
-
-    def stop_loop_playback(self):
-        self._loop_playing = False
-        self._stop_loop.set()
-        if self._loop_thread:
-            self._loop_thread.join()
-            self._loop_thread = None
-
     def on_zone_size_slider_changed(self, value):
         """Convertit la valeur du slider (en millisecondes) en secondes et met à jour la zone"""
         # Convertir la valeur du slider (ms) en secondes pour l'affichage
@@ -1646,17 +1317,17 @@ class MainWindow(QMainWindow):
         # Mettre à jour la taille de la sélection dans le waveform
         self.waveform.selection_size = size_seconds
         self.waveform.draw_selection()
-        # Sélectionner un nouveau grain aléatoire pour chaque type
-        self.select_random_grain(grain_type='bass')
-        self.select_random_grain(grain_type='medium')
-        self.select_random_grain(grain_type='treble')
+        self.update_cloud_zone()
+        # Sélectionner un nouveau grain aléatoire pour chaque voix
+        for grain_type in self.engine.voices:
+            self.select_random_grain(grain_type=grain_type)
 
     def on_zone_size_changed(self, val):
         self.zone_size = val
         self.waveform.selection_size = val
         self.waveform.draw_selection()
-        # Réinitialise un grain aléatoire dans la zone pour chaque type
-        for grain_type in ('bass', 'medium', 'treble'):
+        # Réinitialise un grain aléatoire dans la zone pour chaque voix
+        for grain_type in self.engine.voices:
             self.select_random_grain(grain_type=grain_type)
 
     def toggle_play_stop_all(self):
@@ -1679,16 +1350,10 @@ class MainWindow(QMainWindow):
         play_all_before = self.btn_play_stop_all.isChecked()
 
         # Désactive temporairement la relance automatique de lecture pour chaque grain
-        # On génère les 3 grains sans relancer la lecture
-        if hasattr(self, 'grain_bass') and hasattr(self.grain_bass, 'random_grain'):
-            self.active_grains['bass'] = False
-            self.grain_bass.random_grain()
-        if hasattr(self, 'grain_medium') and hasattr(self.grain_medium, 'random_grain'):
-            self.active_grains['medium'] = False
-            self.grain_medium.random_grain()
-        if hasattr(self, 'grain_treble') and hasattr(self.grain_treble, 'random_grain'):
-            self.active_grains['treble'] = False
-            self.grain_treble.random_grain()
+        # On génère les grains de toutes les voix sans relancer la lecture
+        for name, widget in self.grain_widgets.items():
+            self.active_grains[name] = False
+            widget.random_grain()
 
         # Si "Lecture TOUT" était activé avant, relance la lecture globale
         if play_all_before:
@@ -1759,6 +1424,13 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Ferme également la fenêtre d'image lors de la fermeture"""
+        self.engine.close()
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader.wait()
+        if self._exporter is not None:
+            self._exporter.cancel()
+            self._exporter.wait()
         if self.image_window:
             self.image_window.close()
         super().closeEvent(event)
@@ -1783,34 +1455,23 @@ class MainWindow(QMainWindow):
         self.move(x, y)
 
     def create_effects_windows(self):
-        """Crée les fenêtres d'effets pour les trois types de grains sans les afficher"""
+        """Crée les fenêtres d'effets de chaque voix sans les afficher"""
         if hasattr(self, '_created_effects') and self._created_effects:
             return
         self._created_effects = True
         
         # Création des fenêtres d'effets sans les afficher
-        self.bass_effects_window = BassEffectsWindow(grain_bass_widget=self.grain_bass)
-        self.bass_effects_window.center_on_mainwindow(self)
-        
-        self.medium_effects_window = MediumEffectsWindow(grain_medium_widget=self.grain_medium)
-        self.medium_effects_window.center_on_mainwindow(self)
-        
-        self.treble_effects_window = TrebleEffectsWindow(grain_treble_widget=self.grain_treble)
-        self.treble_effects_window.center_on_mainwindow(self)
+        for grain_type in self.engine.voices:
+            window = EffectsWindow(grain_widget=self.grain_widgets[grain_type],
+                                   title=f"Effets Grain {grain_type.capitalize()}")
+            window.center_on_mainwindow(self)
+            self.effects_windows[grain_type] = window
 
     def open_effects_window(self, grain_type):
-        if grain_type == 'bass':
-            if self.bass_effects_window:
-                self.bass_effects_window.show()
-                self.bass_effects_window.raise_()
-        elif grain_type == 'medium':
-            if self.medium_effects_window:
-                self.medium_effects_window.show()
-                self.medium_effects_window.raise_()
-        elif grain_type == 'treble':
-            if self.treble_effects_window:
-                self.treble_effects_window.show()
-                self.treble_effects_window.raise_()
+        window = self.effects_windows.get(grain_type)
+        if window:
+            window.show()
+            window.raise_()
 
     def open_visual_window(self):
         """Ouvre la fenêtre visuelle avec égaliseur"""
@@ -1835,10 +1496,30 @@ class MainWindow(QMainWindow):
         self.image_window.raise_()
 
     def export_mix(self):
-        """Exporte un fichier WAV du mix complet de tous les grains actifs"""
-        if not any(self._grain[g] is not None for g in ['bass', 'medium', 'treble']):
-            return  # Aucun grain n'est disponible
-        
+        """Exporte un fichier WAV du mix, rendu hors ligne par le même mixeur que l'écoute en direct"""
+        if self._exporter is not None:
+            return  # Un export est déjà en cours
+        # Grains en cours de lecture, sinon tous les grains disponibles
+        names = [g for g in self.engine.voices
+                 if self.active_grains.get(g) and self._grain_proc[g] is not None]
+        if not names:
+            names = [g for g in self.engine.voices if self._grain_proc[g] is not None]
+        cloud = self.engine.cloud_active and self.engine.cloud_source is not None
+        if not names and not cloud:
+            return  # Ni grain ni nuage à rendre
+
+        # Durée du rendu : en secondes ou en nombre de tours de la boucle la plus longue (s'il y a des grains)
+        units = ["secondes", "boucles"] if names else ["secondes"]
+        unit, ok = QInputDialog.getItem(self, "Exporter le mix complet", "Durée exprimée en :", units, 0, False)
+        if not ok:
+            return
+        if unit == "secondes":
+            amount, ok = QInputDialog.getDouble(self, "Exporter le mix complet", "Durée (s) :", 10.0, 0.1, 36000.0, 1)
+        else:
+            amount, ok = QInputDialog.getInt(self, "Exporter le mix complet", "Nombre de boucles :", 4, 1, 100000)
+        if not ok:
+            return
+
         # Demander le nom du fichier pour sauvegarder
         filepath, _ = QFileDialog.getSaveFileName(
             self, "Exporter le mix complet", 
@@ -1848,44 +1529,37 @@ class MainWindow(QMainWindow):
         
         if not filepath:
             return  # L'utilisateur a annulé
-            
-        # Préparer les grains et les volumes
-        exported_data = None
-        sample_rate = None
-        for grain_type in ['bass', 'medium', 'treble']:
-            if self._grain_proc[grain_type] is not None:
-                # Récupérer le volume du grain (0.0 - 2.0)
-                volume = getattr(self, f'grain_{grain_type}').vol.value() / 100.0
-                grain_data = self._grain_proc[grain_type].copy() * volume
-                
-                if exported_data is None:
-                    # Premier grain actif, initialiser le tableau
-                    exported_data = grain_data
-                    sample_rate = self._grain_sr[grain_type]
-                else:
-                    # Ajouter ce grain au mix
-                    # S'assurer que les grains ont la même longueur
-                    if len(grain_data) > len(exported_data):
-                        padding = np.zeros((len(grain_data) - len(exported_data), 2), dtype=np.float32)
-                        exported_data = np.vstack((exported_data, padding))
-                    elif len(grain_data) < len(exported_data):
-                        padding = np.zeros((len(exported_data) - len(grain_data), 2), dtype=np.float32)
-                        grain_data = np.vstack((grain_data, padding))
-                    
-                    # Ajouter le grain au mix
-                    exported_data += grain_data
-        
-        if exported_data is not None and sample_rate is not None:
-            # Normaliser le mix pour éviter l'écroulement
-            max_amp = np.max(np.abs(exported_data))
-            if max_amp > 1.0:
-                exported_data = exported_data / max_amp * 0.95  # Petite marge de sécurité
-            
-            # Sauvegarder le fichier WAV
-            try:
-                sf.write(filepath, exported_data, sample_rate)
-            except Exception as e:
-                print(f"Erreur lors de l'export du mix: {e}")
+
+        # Rendu dans un thread : l'interface et la lecture en direct continuent pendant l'export
+        render = functools.partial(self.engine.render_to_file, filepath, names,
+                                   seconds=amount if unit == "secondes" else None,
+                                   cycles=amount if unit == "boucles" else None)
+        if not hasattr(self, 'export_progress'):
+            self.export_progress = self._make_progress_bar()
+        self.export_progress.setFormat("Export du mix : %p%")
+        self.export_progress.setValue(0)
+        self.export_progress.show()
+        self.btn_export_mix.setEnabled(False)
+        exporter = MixExporter(filepath, render, self)
+        exporter.progress.connect(self.export_progress.setValue)
+        exporter.done.connect(self._on_export_done)
+        exporter.failed.connect(self._on_export_failed)
+        exporter.finished.connect(self._on_export_finished)
+        exporter.finished.connect(exporter.deleteLater)
+        self._exporter = exporter
+        exporter.start()
+
+    def _on_export_finished(self):
+        self._exporter = None
+        self.export_progress.hide()
+        self.btn_export_mix.setEnabled(True)
+
+    def _on_export_done(self, path, frames):
+        seconds = frames / sf.info(path).samplerate
+        QMessageBox.information(self, "Exporter le mix complet", f"Mix exporté vers {path} ({seconds:.1f} s).")
+
+    def _on_export_failed(self, path, error):
+        QMessageBox.critical(self, "Exporter le mix complet", f"Erreur lors de l'export du mix vers {path} :\n{error}")
 
     def export_grain(self, grain_type):
         """Exporte un fichier WAV pour un grain spécifique"""
@@ -1903,8 +1577,8 @@ class MainWindow(QMainWindow):
             return  # L'utilisateur a annulé
             
         # Récupérer le grain avec son volume
-        volume = getattr(self, f'grain_{grain_type}').vol.value() / 100.0
-        grain_data = self._grain_proc[grain_type].copy() * volume
+        volume = self.grain_widgets[grain_type].vol.value() / 100.0
+        grain_data = self.engine.stereo_grain(grain_type) * volume
         sample_rate = self._grain_sr[grain_type]
         
         # Normaliser pour éviter l'écroulement
@@ -1927,18 +1601,16 @@ class MainWindow(QMainWindow):
         if width < 800:
             # Mode compact pour petits écrans
             self.bottom_layout.setAlignment(self.waveform, Qt.AlignTop)
-            self.bottom_layout.setAlignment(self.grain_bass, Qt.AlignTop)
-            self.bottom_layout.setAlignment(self.grain_medium, Qt.AlignTop)
-            self.bottom_layout.setAlignment(self.grain_treble, Qt.AlignTop)
+            for widget in self.grain_widgets.values():
+                self.bottom_layout.setAlignment(widget, Qt.AlignTop)
             # Réduire les marges pour maximiser l'espace
             self.bottom_layout.setContentsMargins(4, 4, 4, 4)
             self.bottom_layout.setSpacing(4) 
         else:
             # Mode normal pour grands écrans
             self.bottom_layout.setAlignment(self.waveform, Qt.AlignTop | Qt.AlignHCenter)
-            self.bottom_layout.setAlignment(self.grain_bass, Qt.AlignTop | Qt.AlignHCenter)
-            self.bottom_layout.setAlignment(self.grain_medium, Qt.AlignTop | Qt.AlignHCenter)
-            self.bottom_layout.setAlignment(self.grain_treble, Qt.AlignTop | Qt.AlignHCenter)
+            for widget in self.grain_widgets.values():
+                self.bottom_layout.setAlignment(widget, Qt.AlignTop | Qt.AlignHCenter)
             # Restaurer les marges normales
             self.bottom_layout.setContentsMargins(8, 8, 8, 8)
             self.bottom_layout.setSpacing(8)
@@ -1957,7 +1629,7 @@ class MainWindow(QMainWindow):
         # Si l'application est trop petite, réorganiser les controls
         if width < 800:
             # Mode compact 
-            for widget in [self.grain_bass, self.grain_medium, self.grain_treble]:
+            for widget in self.grain_widgets.values():
                 # Réduire la taille des contrôles sur petits écrans
                 for child in widget.findChildren(QSlider):
                     child.setFixedWidth(100)  # Réduire la largeur des sliders
@@ -1968,7 +1640,7 @@ class MainWindow(QMainWindow):
                     child.setFont(font)
         else:
             # Mode étendu
-            for widget in [self.grain_bass, self.grain_medium, self.grain_treble]:
+            for widget in self.grain_widgets.values():
                 # Restaurer les tailles normales
                 for child in widget.findChildren(QSlider):
                     child.setFixedWidth(120)  # Taille normale des sliders
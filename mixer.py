@@ -0,0 +1,314 @@
+"""Mixeur temps réel des grains : voix nommées rendues par blocs via le pool de voix, budget CPU du callback."""
+import time
+from collections import deque
+
+import numpy as np
+
+from reverb import BlockReverb
+from grain_cloud import GrainCloud
+from voice_pool import VoicePool
+
+
+class CallbackBudget:
+    """Mesure le temps CPU de chaque callback audio par rapport au budget du bloc.
+
+    Le budget d'un bloc est sa durée réelle (frames / samplerate) : au-delà,
+    la carte son manque de données (underrun).
+    """
+
+    def __init__(self, samplerate=44100):
+        self.samplerate = samplerate
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.last = 0.0
+        self.overruns = 0
+        self.budget = 0.0
+
+    def record(self, frames, elapsed):
+        """Enregistre la durée `elapsed` (s) d'un callback de `frames` échantillons."""
+        budget = frames / self.samplerate
+        self.budget = budget
+        self.count += 1
+        self.total += elapsed
+        self.last = elapsed
+        if elapsed > self.worst:
+            self.worst = elapsed
+        if elapsed > budget:
+            self.overruns += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def load(self):
+        """Charge moyenne : fraction du budget consommée (1.0 = limite d'underrun)."""
+        return self.mean / self.budget if self.budget else 0.0
+
+    @property
+    def peak_load(self):
+        return self.worst / self.budget if self.budget else 0.0
+
+    def summary(self):
+        return (f"{self.count} callbacks, budget {self.budget * 1000:.3f} ms, "
+                f"moyenne {self.mean * 1000:.3f} ms ({self.load:.1%}), "
+                f"pire {self.worst * 1000:.3f} ms ({self.peak_load:.1%}), "
+                f"{self.overruns} dépassements")
+
+
+class _Voice:
+    """Entrée de la table des voix : un grain nommé, lu en boucle par le pool sur son propre bus."""
+
+    def __init__(self, samplerate, bus):
+        self.bus = bus           # ligne des tampons de bus du mixeur
+        self.pending = deque()   # sources déposées par le thread GUI, la dernière l'emporte
+        self.slot = -1           # voix du pool qui lit le grain courant
+        self.next = -1           # source en attente de la fin de boucle
+        self.active = False      # état demandé par le GUI
+        self.playing = False     # rendue dans le bloc courant
+        self.gain = 0.0          # gain de fondu (entrée/sortie) courant
+        self.reverb = BlockReverb(samplerate)
+
+
+class GrainMixer:
+    """Mixeur persistant : des voix nommées et des grains anonymes rendus par un unique OutputStream.
+
+    Toutes les voix sont lues par le pool (`self.pool`, VoicePool) : le
+    thread GUI dépose le nouveau grain d'une voix nommée avec `set_grain`
+    et (dés)active la voix avec `set_active` ; le callback audio (`render`)
+    prend les changements en compte sans verrou. Un nouveau grain remplace
+    l'ancien soit par un fondu enchaîné de quelques millisecondes
+    (swap_mode='crossfade'), soit à la fin de la boucle en cours
+    (swap_mode='loop'). Chaque voix nommée est sommée sur son bus pour
+    recevoir sa réverb, son volume et son fondu d'activation, puis le mix
+    est normalisé par le nombre de voix actives. Le pool accueille en plus
+    des grains anonymes, bouclés ou joués une fois, et ceux que le nuage
+    (`self.cloud`, GrainCloud) y émet depuis le callback, dans la limite de
+    `pool_voices` voix au total. Le périphérique n'est jamais rouvert. Les tampons de travail
+    sont alloués pour `blocksize` frames : un bloc plus long est rendu par
+    tranches.
+    """
+
+    def __init__(self, samplerate, param_store, xfade_ms=5.0, swap_mode='crossfade', budget=None, pool_voices=256,
+                 blocksize=1024):
+        self.samplerate = samplerate
+        self.param_store = param_store
+        self.swap_mode = swap_mode
+        self.xfade_len = max(1, int(samplerate * xfade_ms / 1000.0))
+        self.blocksize = blocksize
+        self.budget = budget if budget is not None else CallbackBudget(samplerate)
+        self.budget.samplerate = samplerate
+        self.budget.reset()
+        self.tap = None          # appelé avec le canal gauche de chaque bloc (spectrogramme)
+        self._voices = {}
+        self._voice_list = ()    # remplacée en bloc : le callback l'itère sans verrou
+        self._norm = 1.0
+        self.pool = VoicePool(pool_voices, self.xfade_len, max_frames=blocksize)
+        self.cloud = GrainCloud(self.pool, samplerate)
+        self._buses = np.zeros((0, blocksize, 2), dtype=np.float32)
+        self._direct = np.zeros((blocksize, 2), dtype=np.float32)
+        self._steps = np.arange(1, blocksize + 1, dtype=np.float32)[:, None]
+        self._ramp = np.empty((blocksize, 1), dtype=np.float32)
+        self._ramp_frames = 0
+
+    def _voice(self, name):
+        v = self._voices.get(name)
+        if v is None:
+            v = _Voice(self.samplerate, len(self._voices))
+            self._voices[name] = v
+            # Tampons de bus publiés avant la liste : le callback n'y voit jamais une voix sans bus
+            self._buses = np.zeros((len(self._voices), self.blocksize, 2), dtype=np.float32)
+            self._voice_list = tuple(self._voices.items())
+        return v
+
+    def set_grain(self, name, buffer, channel_major=False):
+        """Dépose un nouveau grain stéréo (frames, 2) pour la voix `name` (thread GUI).
+
+        Avec `channel_major`, `buffer` est directement le grain (canaux,
+        frames) de la chaîne d'effets : voir VoicePool.add_source.
+        """
+        v = self._voice(name)
+        source = self.pool.add_source(buffer, channel_major)
+        if source is not None:
+            v.pending.append(source)
+
+    def set_active(self, name, active):
+        """Démarre ou arrête (avec fondu) la lecture de la voix `name` (thread GUI)."""
+        self._voice(name).active = bool(active)
+
+    def is_active(self, name):
+        v = self._voices.get(name)
+        return v is not None and v.active
+
+    def _start(self, v, source, rate, pos=0.0, fade_in=False, delay=0):
+        pool = self.pool
+        v.slot = pool.start_voice(source, pos=pos, rate=rate, fade_in=fade_in, bus=v.bus,
+                                  sinc=rate != 1.0, delay=delay)
+        pool.drop(source)
+
+    def _take_pending(self, v, rate, frames):
+        pool = self.pool
+        source = -1
+        # Une source déposée après apply_commands n'est pas encore arrivée dans le callback :
+        # elle reste en attente jusqu'au bloc suivant (les sources arrivent dans l'ordre de dépôt)
+        while v.pending and pool.src_live[v.pending[0]]:
+            if source >= 0:
+                pool.drop(source)    # remplacé avant d'avoir été entendu
+            source = v.pending.popleft()
+        if source >= 0:
+            if v.next >= 0:
+                pool.drop(v.next)
+                v.next = -1
+            if v.slot < 0 or v.gain == 0.0:
+                # Voix silencieuse : remplacement immédiat
+                pool.reset_bus(v.bus)
+                self._start(v, source, rate)
+            elif self.swap_mode == 'loop':
+                v.next = source
+            else:
+                # Fondu enchaîné ; la phase de la boucle est conservée pour que les balayages restent continus
+                old = v.slot
+                n = pool.src_length[source]
+                pos = int(pool.pos[old] * n / max(1, pool.length[old])) % max(1, n)
+                pool.fade_out(old)
+                self._start(v, source, rate, pos=pos, fade_in=True)
+        if v.next >= 0 and v.slot >= 0:
+            slot = v.slot
+            to_wrap = int(np.ceil((pool.length[slot] - pool.pos[slot]) / rate))
+            if to_wrap <= frames:
+                # Fin de boucle dans ce bloc : le nouveau grain prend le relais à l'échantillon près
+                pool.end_loop(slot, to_wrap)
+                self._start(v, v.next, rate, delay=to_wrap)
+                v.next = -1
+
+    def render(self, outdata, frames):
+        """Corps du callback audio : remplit `outdata` (frames, 2)."""
+        t_start = time.perf_counter()
+        self.pool.apply_commands()
+        step = self.blocksize
+        for i in range(0, frames, step):
+            self._render_block(outdata[i:i + step], min(step, frames - i))
+        if self.tap is not None:
+            self.tap(outdata[:, 0])
+        self.budget.record(frames, time.perf_counter() - t_start)
+
+    def _render_block(self, outdata, frames):
+        outdata.fill(0)
+        pool = self.pool
+        params = self.param_store.snapshot()
+        voices = self._voice_list
+        if frames != self._ramp_frames:
+            np.divide(self._steps[:frames], frames, out=self._ramp[:frames])
+            self._ramp_frames = frames
+        ramp = self._ramp[:frames]
+        n_active = 0
+        for name, v in voices:
+            p = params.get(name)
+            rate = p.playback_rate if p is not None else 1.0
+            self._take_pending(v, rate, frames)
+            if v.slot < 0:
+                v.playing = False
+                continue
+            if v.active:
+                n_active += 1
+            # Voix éteinte ou sans réglages : sa lecture est suspendue
+            v.playing = p is not None and (v.active or v.gain != 0.0)
+            pool.set_bus(v.bus, rate, not v.playing)
+        # Grains du nuage, sans prendre les places des voix nommées (voix, ancienne en fondu, suivante)
+        self.cloud.spawn(frames, reserve=3 * len(voices))
+        direct = self._direct[:frames]
+        direct.fill(0)
+        buses = self._buses[:, :frames]
+        pool.mix(direct, frames, buses)
+        step = frames / self.xfade_len
+        for name, v in voices:
+            if v.playing and v.bus < buses.shape[0]:
+                self._mix_bus(outdata, v, params[name], buses[v.bus], ramp, step)
+        # Normalisation par le nombre de grains actifs, lissée pour éviter les sauts de niveau
+        if n_active > 0:
+            norm = 1.0 / n_active
+            if norm == self._norm:
+                outdata *= norm
+            else:
+                outdata *= self._norm + (norm - self._norm) * ramp
+                self._norm = norm
+        else:
+            outdata *= self._norm
+        outdata += direct
+
+    def _mix_bus(self, outdata, v, p, scratch, ramp, step):
+        """Ajoute le bus de la voix `v` à la sortie : réverb, volume et fondu d'activation."""
+        pool = self.pool
+        reverb = v.reverb
+        if p.reverb or not reverb.idle:
+            reverb.set_params(room_size=p.reverb_room_size, decay=p.reverb_decay,
+                              amount=p.reverb_amount if p.reverb else 0.0)
+            reverb.process(scratch)
+        target = 1.0 if v.active else 0.0
+        g0 = v.gain
+        if g0 == target:
+            outdata += scratch * (g0 * p.volume)
+        else:
+            g1 = min(g0 + step, 1.0) if target > g0 else max(g0 - step, 0.0)
+            outdata += scratch * ((g0 + (g1 - g0) * ramp) * p.volume)
+            v.gain = g1
+            if g1 == 0.0:
+                # Voix éteinte : la prochaine lecture repart du début, sans queue de réverb
+                if v.next >= 0:
+                    pool.reset_bus(v.bus)
+                    self._start(v, v.next, p.playback_rate)
+                    v.next = -1
+                else:
+                    pool.reset_bus(v.bus, keep=v.slot)
+                reverb.reset()
+
+
+def benchmark(blocksize=64, samplerate=44100, n_grains=3, reverb=True, seconds=10.0, swap_every=0):
+    """Fait tourner le callback du mixeur hors carte son et retourne le CallbackBudget mesuré.
+
+    Un GrainMixer reçoit `n_grains` voix nommées, leurs GrainParams publiés
+    dans un ParamStore et leurs grains déposés comme par le GUI ; chaque bloc
+    passe par `render`, exactement comme dans le callback. Avec
+    `swap_every`, un nouveau grain est déposé tous les `swap_every` blocs
+    (hors mesure) pour inclure les fondus enchaînés.
+    """
+    from param_store import GrainParams, ParamStore
+    rng = np.random.default_rng(0)
+    store = ParamStore()
+    names = [f'voix{i}' for i in range(n_grains)]
+    for name in names:
+        store.publish(name, GrainParams(reverb=reverb))
+    mixer = GrainMixer(samplerate, store, blocksize=blocksize)
+
+    def new_grain():
+        n = int(rng.integers(int(0.01 * samplerate), int(1.0 * samplerate)))
+        return rng.standard_normal((n, 2)).astype(np.float32) * 0.1
+
+    for name in names:
+        mixer.set_grain(name, new_grain())
+        mixer.set_active(name, True)
+    outdata = np.zeros((blocksize, 2), dtype=np.float32)
+    for i in range(int(seconds * samplerate / blocksize)):
+        if swap_every and i and i % swap_every == 0:
+            mixer.set_grain(names[(i // swap_every) % n_grains], new_grain())
+        mixer.render(outdata, blocksize)
+    return mixer.budget
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Mesure du budget CPU par callback du mixeur")
+    parser.add_argument('--blocksize', type=int, default=64)
+    parser.add_argument('--samplerate', type=int, default=44100)
+    parser.add_argument('--grains', type=int, default=3)
+    parser.add_argument('--no-reverb', action='store_true')
+    parser.add_argument('--swap-every', type=int, default=0, help="blocs entre deux remplacements de grain")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+    result = benchmark(args.blocksize, args.samplerate, args.grains, not args.no_reverb, args.seconds,
+                       args.swap_every)
+    print(result.summary())
@@ -0,0 +1,82 @@
+"""Rendu hors ligne (plus rapide que le temps réel) du mixeur de grains, écrit en flux sur disque."""
+import numpy as np
+import soundfile as sf
+
+from mixer import GrainMixer
+from param_store import ParamStore
+
+WRITE_BLOCKSIZE = 65536  # frames accumulées avant chaque écriture disque
+
+
+def loop_frames(grains, cycles, params=None, channel_major=False):
+    """Nombre de frames pour `cycles` tours de la boucle la plus longue.
+
+    Avec `params` ({nom: GrainParams}), la durée d'une boucle tient compte
+    de sa vitesse de lecture (mode 'tape') : un grain joué deux fois plus
+    vite boucle en deux fois moins de frames.
+    """
+    if not grains:
+        raise ValueError("durée en tours de boucle impossible sans grain bouclé")
+    axis = -1 if channel_major else 0
+    rates = {name: p.playback_rate for name, p in (params or {}).items()}
+    return int(round(cycles * max(g.shape[axis] / rates.get(name, 1.0) for name, g in grains.items())))
+
+
+def render_mix(grains, params, samplerate, frames, blocksize=1024, xfade_ms=5.0,
+               swap_mode='crossfade', write_blocksize=WRITE_BLOCKSIZE, cloud=None, channel_major=False):
+    """Génère le mix de `grains` ({nom: stéréo float32}) par morceaux de `write_blocksize` frames.
+
+    Le rendu passe par un GrainMixer neuf appelé exactement comme le
+    callback audio, bloc de `blocksize` par bloc de `blocksize` : fondus,
+    réverb, normalisation et bouclage sont identiques à l'écoute en direct
+    lancée depuis le silence. `params` associe chaque nom à ses GrainParams ;
+    `cloud` (zone stéréo, samplerate, CloudParams) ajoute un nuage de grains.
+    Avec `channel_major`, les grains sont ceux de la chaîne d'effets
+    (canaux, frames), transposés par le mixeur. Les morceaux produits sont réutilisés d'un appel à l'autre.
+    """
+    store = ParamStore()
+    for name, p in params.items():
+        store.publish(name, p)
+    mixer = GrainMixer(samplerate, store, xfade_ms=xfade_ms, swap_mode=swap_mode, blocksize=blocksize)
+    for name, buffer in grains.items():
+        mixer.set_grain(name, buffer, channel_major)
+        mixer.set_active(name, True)
+    if cloud is not None:
+        zone, zone_sr, cloud_params = cloud
+        mixer.cloud.set_source(zone, zone_sr)
+        mixer.cloud.params = cloud_params
+        mixer.cloud.running = True
+    chunk_frames = max(blocksize, write_blocksize - write_blocksize % blocksize)
+    chunk = np.zeros((chunk_frames, 2), dtype=np.float32)
+    done = 0
+    while done < frames:
+        n = min(chunk_frames, frames - done)
+        for i in range(0, n, blocksize):
+            m = min(blocksize, n - i)
+            mixer.render(chunk[i:i + m], m)
+        done += n
+        yield chunk[:n]
+
+
+def render_to_file(path, grains, params, samplerate, seconds=None, cycles=None, blocksize=1024,
+                   xfade_ms=5.0, swap_mode='crossfade', subtype=None, progress=None, cloud=None,
+                   channel_major=False):
+    """Rend `seconds` secondes (ou `cycles` tours de boucle) du mix directement dans `path`.
+
+    Le fichier est écrit au fil du rendu : la mémoire utilisée ne dépend
+    pas de la durée. `progress(fraction)` est appelé après chaque écriture.
+    Retourne le nombre de frames écrites.
+    """
+    if cycles is not None:
+        frames = loop_frames(grains, cycles, params, channel_major)
+    else:
+        frames = int(round(seconds * samplerate))
+    written = 0
+    with sf.SoundFile(path, 'w', samplerate=samplerate, channels=2, subtype=subtype) as f:
+        for chunk in render_mix(grains, params, samplerate, frames, blocksize, xfade_ms, swap_mode, cloud=cloud,
+                                channel_major=channel_major):
+            f.write(chunk)
+            written += chunk.shape[0]
+            if progress is not None:
+                progress(written / max(1, frames))
+    return written
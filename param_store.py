@@ -0,0 +1,92 @@
+"""Paramètres de grain immuables partagés entre l'interface et le thread audio."""
+import threading
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+
+
+@dataclass(frozen=True)
+class GrainParams:
+    """Instantané des réglages d'un grain, en unités physiques (gain, secondes, Hz)."""
+    size_ms: int = 200
+    volume: float = 1.0
+    mono: bool = False          # réduit le grain en mono avant la chaîne d'effets
+    reverse: bool = False
+    envelope: str = 'Hann'
+    pitch: int = 0
+    pitch_mode: str = 'shift'   # 'shift' : vocodeur de phase (durée conservée) ; 'tape' : vitesse de lecture
+    stretch: float = 1.0
+    reverb: bool = False
+    reverb_amount: float = 0.2
+    reverb_room_size: float = 0.5
+    reverb_decay: float = 0.375
+    delay: bool = False
+    delay_mix: float = 0.3
+    distortion: bool = False
+    distortion_amount: float = 0.5
+    distortion_mix: float = 1.0
+    ringmod: bool = True
+    ringmod_freq: float = 1.0
+
+    @property
+    def shift_semitones(self):
+        """Transposition calculée par la chaîne d'effets (nulle en mode 'tape')."""
+        return 0 if self.pitch_mode == 'tape' else self.pitch
+
+    @property
+    def playback_rate(self):
+        """Vitesse de lecture appliquée par le mixeur (1.0 hors mode 'tape')."""
+        return 2.0 ** (self.pitch / 12.0) if self.pitch_mode == 'tape' else 1.0
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+
+@dataclass(frozen=True)
+class CloudParams:
+    """Réglages du nuage de grains : densité (grains/s), durée (ms) et dispersions aléatoires.
+
+    Les dispersions sont des amplitudes de tirage uniforme autour de la
+    valeur centrale : `size_jitter` relative (0.5 = ±50 %), `pitch_jitter`
+    en demi-tons, `pan_jitter` en unités de pan (-1 à 1), `position_jitter`
+    en fraction de la zone (1.0 = toute la zone).
+    """
+    density: float = 40.0
+    size_ms: float = 60.0
+    size_jitter: float = 0.3
+    position_jitter: float = 1.0
+    pitch: float = 0.0
+    pitch_jitter: float = 0.0
+    pan: float = 0.0
+    pan_jitter: float = 0.5
+    envelope: str = 'Hann'
+    volume: float = 1.0
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+
+class ParamStore:
+    """Publie des instantanés de paramètres vers le callback audio sans verrou côté lecture.
+
+    L'interface remplace le dictionnaire complet à chaque publication ; le
+    callback récupère la référence courante par une simple lecture
+    d'attribut (atomique sous le GIL) et ne voit jamais d'état partiel.
+    """
+
+    def __init__(self):
+        self._write_lock = threading.Lock()
+        self._snapshot = MappingProxyType({})
+
+    def publish(self, name, params):
+        """Remplace les paramètres du grain `name` (appelé depuis le thread GUI)."""
+        with self._write_lock:
+            new = dict(self._snapshot)
+            new[name] = params
+            self._snapshot = MappingProxyType(new)
+
+    def snapshot(self):
+        """Retourne l'instantané courant (lecture seule) de tous les grains."""
+        return self._snapshot
+
+    def get(self, name, default=None):
+        return self._snapshot.get(name, default)
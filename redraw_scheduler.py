@@ -0,0 +1,63 @@
+"""Planification des rafraîchissements de la waveform : cadence plafonnée et demandes regroupées."""
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class RedrawScheduler(QObject):
+    """Regroupe les demandes de rafraîchissement et les exécute au plus `max_fps` fois par seconde.
+
+    `request()` ne dessine rien : il programme un appel unique à `render`
+    au prochain créneau libre. Les demandes arrivant avant ce créneau sont
+    absorbées (comptées dans `dropped`) ; `render` lit l'état courant de
+    la vue et ne rend donc que la dernière position demandée.
+    """
+
+    def __init__(self, render, max_fps=60, parent=None):
+        super().__init__(parent)
+        self.render = render
+        self.interval = 1.0 / max(1, max_fps)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._fire)
+        self._pending = False
+        self._last_frame = 0.0
+        self._frame_times = deque(maxlen=256)
+        self.frames = 0
+        self.dropped = 0
+
+    def request(self):
+        """Demande un rafraîchissement (regroupé avec les demandes en attente)."""
+        if self._pending:
+            self.dropped += 1
+            return
+        self._pending = True
+        wait = self.interval - (time.perf_counter() - self._last_frame)
+        self._timer.start(max(0, int(wait * 1000)))
+
+    def flush(self):
+        """Exécute immédiatement le rafraîchissement en attente, s'il y en a un."""
+        if self._pending:
+            self._timer.stop()
+            self._fire()
+
+    def _fire(self):
+        self._pending = False
+        self._last_frame = time.perf_counter()
+        self.render()
+        self.frames += 1
+        self._frame_times.append(self._last_frame)
+
+    def fps(self, window=1.0):
+        """Images rendues par seconde sur la dernière `window` secondes."""
+        now = time.perf_counter()
+        return sum(1 for t in self._frame_times if now - t <= window) / window
+
+    def stats(self):
+        return {'frames': self.frames, 'dropped': self.dropped, 'fps': self.fps()}
+
+    def reset(self):
+        self.frames = 0
+        self.dropped = 0
+        self._frame_times.clear()
@@ -0,0 +1,115 @@
+"""Rééchantillonnage par noyaux sinc fenêtrés précalculés (polyphase) : transposition « bande » à la lecture."""
+import numpy as np
+
+TAPS = 16       # points d'interpolation par échantillon de sortie
+PHASES = 256    # décalages fractionnaires tabulés
+
+
+def sinc_table(cutoff=1.0, taps=TAPS, phases=PHASES, beta=8.0):
+    """Noyaux (phases + 1, taps) float32, un par décalage fractionnaire.
+
+    Sinc de fréquence de coupure `cutoff` (1.0 = Nyquist de la source)
+    fenêtré par Kaiser, normalisé à un gain unité en continu. La ligne
+    `round(frac * phases)` interpole entre `i - taps/2 + 1` et `i + taps/2`.
+    """
+    frac = np.arange(phases + 1)[:, None] / phases
+    x = np.arange(taps)[None, :] - (taps // 2 - 1) - frac
+    half = taps / 2
+    window = np.i0(beta * np.sqrt(np.clip(1.0 - (x / half) ** 2, 0.0, None))) / np.i0(beta)
+    h = cutoff * np.sinc(cutoff * x) * window
+    h /= h.sum(axis=1, keepdims=True)
+    return h.astype(np.float32)
+
+
+class SincResampler:
+    """Lecture à vitesse variable par interpolation sinc polyphase.
+
+    Les tables de noyaux sont toutes calculées à la construction, une par
+    demi-ton de transposition vers le haut jusqu'à `max_semitones` (la
+    plage du réglage de hauteur) : au-dessus de 1.0, la coupure descend en
+    0.9/rate contre le repliement, et un rapport fractionnaire prend la
+    table du demi-ton supérieur (coupure un peu plus basse, jamais plus
+    haute). Choisir une table est une simple indexation, sans verrou ni
+    calcul. Le calcul d'un bloc est un gather (frames, taps) suivi d'une
+    somme pondérée ; `read_loop` travaille dans des tampons alloués pour
+    `max_frames` frames de `channels` canaux (les blocs plus longs sont
+    lus par tranches) : une instance par callback. `resample` et `table`
+    peuvent être appelés depuis plusieurs threads.
+    """
+
+    def __init__(self, taps=TAPS, phases=PHASES, max_semitones=24, max_frames=1024, channels=2):
+        self.taps = taps
+        self.phases = phases
+        self.max_semitones = max_semitones
+        rates = 2.0 ** (np.arange(max_semitones + 1) / 12.0)
+        # Table 0 : coupure au Nyquist (rate <= 1.0) ; table s : transposition de s demi-tons
+        self._tables = np.stack([sinc_table(0.9 / r if r > 1.0 else 1.0, taps, phases) for r in rates])
+        self._k = np.arange(taps, dtype=np.int64) - (taps // 2 - 1)
+        # Tampons de travail de read_loop
+        self.max_frames = max_frames
+        self._t = np.arange(max_frames, dtype=np.float64)
+        self._x = np.empty(max_frames, dtype=np.float64)
+        self._i = np.empty(max_frames, dtype=np.int64)
+        self._phase = np.empty(max_frames, dtype=np.int64)
+        self._idx = np.empty((max_frames, taps), dtype=np.int64)
+        self._h = np.empty((max_frames, taps), dtype=np.float32)
+        self._g = np.empty((max_frames, taps, channels), dtype=np.float32)
+
+    def table(self, rate):
+        """Table de noyaux adaptée au rapport de lecture `rate` (2.0 = une octave plus haut)."""
+        if rate <= 1.0:
+            return self._tables[0]
+        # Demi-ton supérieur ; au-delà de la plage, la dernière table
+        s = int(np.ceil(12.0 * np.log2(rate) - 1e-9))
+        return self._tables[min(max(s, 1), self.max_semitones)]
+
+    def _positions(self, pos, rate, t):
+        x = t * rate
+        x += pos
+        i = np.floor(x)
+        phase = np.rint((x - i) * self.phases).astype(np.int64)
+        return i.astype(np.int64), phase
+
+    def read_loop(self, dest, grain, pos, rate):
+        """Lit `grain` (frames, canaux) en boucle depuis `pos` (fractionnaire) à la vitesse `rate`.
+
+        Écrit `dest` et retourne la nouvelle position de lecture.
+        """
+        frames = dest.shape[0]
+        n = grain.shape[0]
+        if n == 0:
+            dest.fill(0)
+            return 0.0
+        table = self.table(rate)
+        step = self.max_frames
+        for s in range(0, frames, step):
+            m = min(step, frames - s)
+            # Position de lecture : partie entière et phase du noyau (x >= 0 : troncature = partie entière)
+            x = self._x[:m]
+            np.multiply(self._t[:m], rate, out=x)
+            x += pos + s * rate
+            i = self._i[:m]
+            np.copyto(i, x, casting='unsafe')
+            x -= i
+            x *= self.phases
+            np.rint(x, out=x)
+            phase = self._phase[:m]
+            np.copyto(phase, x, casting='unsafe')
+            idx = self._idx[:m]
+            np.add(i[:, None], self._k, out=idx)
+            idx %= n     # indices dans la source : `take` en mode clip ne recopie pas `out`
+            h = np.take(table, phase, axis=0, out=self._h[:m], mode='clip')
+            np.einsum('ft,ftc->fc', h, np.take(grain, idx, axis=0, out=self._g[:m], mode='clip'), out=dest[s:s + m])
+        return (pos + frames * rate) % n
+
+    def resample(self, x, n_out):
+        """Rééchantillonne `x` (mono ou (canaux, frames)) sur `n_out` échantillons, bords prolongés."""
+        n = x.shape[-1]
+        if n_out <= 0 or n == 0:
+            return np.zeros(x.shape[:-1] + (max(0, n_out),), dtype=np.float32)
+        rate = n / n_out
+        i, phase = self._positions(0.0, rate, np.arange(n_out, dtype=np.float64))
+        idx = np.clip(i[:, None] + self._k, 0, n - 1)
+        h = self.table(rate)[phase]
+        # Tous les canaux dans la même somme pondérée
+        return np.einsum('ft,...ft->...f', h, np.take(np.asarray(x, dtype=np.float32), idx, axis=-1))
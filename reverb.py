@@ -0,0 +1,188 @@
+"""Réverbération temps réel traitée par blocs (peignes + passe-tout façon Freeverb)."""
+import numpy as np
+
+# Longueurs de référence (échantillons à 44.1 kHz) des filtres de Freeverb
+COMB_TUNINGS = (1116, 1188, 1277, 1356)
+ALLPASS_TUNINGS = (556, 441, 341)
+ALLPASS_FEEDBACK = 0.5
+# Plage du facteur d'échelle des peignes selon la taille de salle (0..1)
+ROOM_SCALE_MIN = 0.5
+ROOM_SCALE_MAX = 3.0
+
+
+class _Comb:
+    """Peigne à rétroaction dont le tampon est dimensionné pour la plus grande salle."""
+
+    def __init__(self, max_delay, channels, delay):
+        self.buf = np.zeros((max_delay + 1, channels), dtype=np.float32)
+        self.idx = 0
+        self.delay = delay
+        self.feedback = 0.0
+
+    def process(self, x, acc, delay, feedback, ramp):
+        """Ajoute la sortie du peigne pour le bloc `x` dans `acc`.
+
+        Si la longueur du retard change, la lecture passe de l'ancienne à la
+        nouvelle position par un fondu sur le bloc ; le gain de rétroaction est
+        lui aussi interpolé, ce qui évite les clics sans réallouer le tampon.
+        """
+        buf = self.buf
+        size = buf.shape[0]
+        frames = x.shape[0]
+        d0, d1 = self.delay, delay
+        g0, g1 = self.feedback, feedback
+        w = self.idx
+        s = 0
+        while s < frames:
+            r0 = (w - d0) % size
+            r1 = (w - d1) % size
+            n = min(frames - s, d0, d1, size - w, size - r0, size - r1)
+            t = ramp[s:s + n]
+            if d0 == d1:
+                out = buf[r0:r0 + n].copy()
+            else:
+                out = buf[r0:r0 + n] * (1.0 - t) + buf[r1:r1 + n] * t
+            gain = g1 if g0 == g1 else g0 + (g1 - g0) * t
+            buf[w:w + n] = x[s:s + n] + out * gain
+            acc[s:s + n] += out
+            s += n
+            w = (w + n) % size
+        self.idx = w
+        self.delay = d1
+        self.feedback = g1
+
+    def reset(self):
+        self.buf.fill(0)
+        self.idx = 0
+
+
+class _Allpass:
+    """Passe-tout de Schroeder à retard fixe (diffusion)."""
+
+    def __init__(self, delay, channels):
+        self.buf = np.zeros((delay, channels), dtype=np.float32)
+        self.idx = 0
+
+    def process(self, x):
+        """Traite `x` en place."""
+        buf = self.buf
+        size = buf.shape[0]
+        frames = x.shape[0]
+        s = 0
+        i = self.idx
+        while s < frames:
+            n = min(frames - s, size - i)
+            bufout = buf[i:i + n].copy()
+            chunk = x[s:s + n]
+            buf[i:i + n] = chunk + bufout * ALLPASS_FEEDBACK
+            chunk *= -1.0
+            chunk += bufout
+            s += n
+            i = (i + n) % size
+        self.idx = i
+
+    def reset(self):
+        self.buf.fill(0)
+        self.idx = 0
+
+
+class BlockReverb:
+    """Réverbération stéréo traitée par blocs, un objet par grain.
+
+    room_size (0..1) allonge les peignes, decay est le temps de décroissance
+    à -60 dB en secondes et amount (0..1) le mélange sec/réverbéré. Les
+    changements de paramètres sont lissés sur un bloc ; les tampons sont
+    alloués une fois pour toutes à la taille de salle maximale.
+    """
+
+    def __init__(self, samplerate, channels=2, max_block=4096):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.max_block = max_block
+        scale = samplerate / 44100.0
+        self._comb_base = [max(1, int(t * scale)) for t in COMB_TUNINGS]
+        self._combs = [_Comb(int(b * ROOM_SCALE_MAX) + 1, channels, self._delay_for(b, 0.5))
+                       for b in self._comb_base]
+        self._allpasses = [_Allpass(max(1, int(t * scale)), channels) for t in ALLPASS_TUNINGS]
+        self._dry = np.zeros((max_block, channels), dtype=np.float32)
+        self._wet = np.zeros((max_block, channels), dtype=np.float32)
+        self._ramps = {}
+        self.room_size = 0.5
+        self.decay = 0.375
+        self.amount = 0.0
+        self._amount_cur = 0.0
+        self._idle = True
+
+    def _delay_for(self, base, room_size):
+        return max(1, int(base * (ROOM_SCALE_MIN + (ROOM_SCALE_MAX - ROOM_SCALE_MIN) * room_size)))
+
+    def _feedback_for(self, delay):
+        # Gain tel que le signal perde 60 dB en `decay` secondes
+        return 10.0 ** (-3.0 * delay / (max(self.decay, 1e-3) * self.samplerate))
+
+    def _ramp(self, frames):
+        ramp = self._ramps.get(frames)
+        if ramp is None:
+            ramp = (np.arange(1, frames + 1, dtype=np.float32) / frames)[:, None]
+            self._ramps[frames] = ramp
+        return ramp
+
+    def set_params(self, room_size=None, decay=None, amount=None):
+        """Met à jour les cibles ; elles sont atteintes progressivement au bloc suivant."""
+        if room_size is not None:
+            self.room_size = min(max(room_size, 0.0), 1.0)
+        if decay is not None:
+            self.decay = decay
+        if amount is not None:
+            self.amount = min(max(amount, 0.0), 1.0)
+            if self.amount > 0:
+                self._idle = False
+
+    @property
+    def idle(self):
+        """Vrai quand la réverb est coupée et que sa queue est retombée."""
+        return self._idle
+
+    def reset(self):
+        for c in self._combs:
+            c.reset()
+        for a in self._allpasses:
+            a.reset()
+        self._amount_cur = 0.0
+        self._idle = True
+
+    def process(self, block):
+        """Applique la réverb sur `block` (frames, canaux) en place."""
+        frames = block.shape[0]
+        start = 0
+        while start < frames:
+            n = min(frames - start, self.max_block)
+            self._process_chunk(block[start:start + n])
+            start += n
+
+    def _process_chunk(self, block):
+        frames = block.shape[0]
+        ramp = self._ramp(frames)
+        dry = self._dry[:frames]
+        wet = self._wet[:frames]
+        dry[:] = block
+        wet.fill(0)
+        for comb, base in zip(self._combs, self._comb_base):
+            delay = self._delay_for(base, self.room_size)
+            comb.process(dry, wet, delay, self._feedback_for(delay), ramp)
+        wet *= 1.0 / len(self._combs)
+        for ap in self._allpasses:
+            ap.process(wet)
+        a0, a1 = self._amount_cur, self.amount
+        if a0 == a1:
+            block *= 1.0 - a1
+            wet *= a1
+        else:
+            amount = a0 + (a1 - a0) * ramp
+            block *= 1.0 - amount
+            wet *= amount
+        block += wet
+        self._amount_cur = a1
+        if a1 == 0.0 and a0 == 0.0:
+            # Réverb coupée : on purge l'état pour repartir proprement à la prochaine activation
+            self.reset()
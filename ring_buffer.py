@@ -0,0 +1,52 @@
+"""Tampon circulaire float32 un producteur / un consommateur, sans verrou ni allocation côté audio."""
+import numpy as np
+
+
+class SampleRing:
+    """Tampon circulaire « miroir » : les échantillons sont écrits deux fois,
+    à `i` et à `i + capacity`, si bien que les `n` derniers échantillons
+    forment toujours une tranche contiguë lisible sans copie.
+
+    Un seul thread écrit (le callback audio), un seul lit (l'interface).
+    `written` (total d'échantillons écrits) n'est publié qu'après la copie
+    des données ; sa mise à jour est atomique sous le GIL. La vue rendue
+    par `latest` peut être réécrite par le producteur si le lecteur la
+    garde plus d'un tour de tampon : suffisant pour de l'affichage.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._buf = np.zeros(2 * capacity, dtype=np.float32)
+        self.written = 0
+
+    def write(self, block):
+        """Ajoute `block` (1D, contigu ou non) ; appelé depuis le callback audio."""
+        cap = self.capacity
+        total = block.shape[0]
+        n = total
+        if n > cap:
+            # Seuls les `cap` derniers échantillons sont gardés ; `written` avance quand même de tout le bloc
+            block = block[n - cap:]
+            n = cap
+        pos = (self.written + total - n) % cap
+        end = pos + n
+        buf = self._buf
+        buf[pos:end] = block
+        if end <= cap:
+            buf[pos + cap:end + cap] = block
+        else:
+            k = cap - pos
+            buf[pos + cap:] = block[:k]
+            buf[:end - cap] = block[k:]
+        self.written += total
+
+    def available(self):
+        """Nombre d'échantillons lisibles (au plus `capacity`)."""
+        return min(self.written, self.capacity)
+
+    def latest(self, n):
+        """Vue (sans copie) sur les `n` derniers échantillons écrits, dans l'ordre."""
+        written = self.written
+        n = min(n, written, self.capacity)
+        start = (written - n) % self.capacity
+        return self._buf[start:start + n]
@@ -0,0 +1,40 @@
+"""Analyse spectrale par bandes logarithmiques pour l'égaliseur (réduction vectorisée)."""
+import numpy as np
+
+
+class BandAnalyzer:
+    """Énergie moyenne par bande logarithmique d'un segment audio mono.
+
+    Pour chaque couple (taille de FFT, samplerate), la fenêtre de Hann et
+    les indices de début de bande sont calculés une fois puis réutilisés :
+    la réduction des bins en bandes est un unique `np.add.reduceat`, quel
+    que soit le nombre de bandes.
+    """
+
+    def __init__(self, n_bands=32, fmin=20.0):
+        self.n_bands = n_bands
+        self.fmin = fmin
+        self._plans = {}
+
+    def _plan(self, n_fft, sr):
+        plan = self._plans.get((n_fft, sr))
+        if plan is None:
+            freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+            edges = np.logspace(np.log10(self.fmin), np.log10(sr / 2), self.n_bands + 1)
+            # Bande i = bins de fréquence dans [edges[i], edges[i+1])
+            bounds = np.searchsorted(freqs, edges, side='left')
+            stop = int(bounds[-1])
+            starts = np.minimum(bounds[:-1], stop)
+            counts = np.diff(bounds)
+            scale = np.where(counts > 0, 1.0 / np.maximum(counts, 1), 0.0)
+            plan = (np.hanning(n_fft), starts, stop, scale)
+            self._plans[(n_fft, sr)] = plan
+        return plan
+
+    def analyze(self, segment, sr):
+        """Magnitude moyenne par bande (0 pour une bande sans bin) de `segment` fenêtré."""
+        window, starts, stop, scale = self._plan(segment.shape[0], sr)
+        spec = np.abs(np.fft.rfft(segment * window))
+        # Zéro final : une bande vide en fin de spectre pointe dessus sans sortir du tableau
+        sums = np.add.reduceat(np.append(spec[:stop], 0.0), starts)
+        return sums * scale
@@ -0,0 +1,140 @@
+import gc
+import os
+
+import numpy as np
+import soundfile as sf
+
+import audio_cache
+from audio_cache import AudioCache
+
+SR = 8000
+
+
+def _write(path, seconds=0.5, seed=0):
+    data = np.random.default_rng(seed).uniform(-0.5, 0.5, size=(int(seconds * SR), 2)).astype(np.float32)
+    sf.write(path, data, SR, subtype='FLOAT')
+    return data
+
+
+def test_cache_hit_returns_decoded_samples(tmp_path):
+    src = tmp_path / 'a.wav'
+    data = _write(src)
+    cache = AudioCache(root=str(tmp_path / 'cache'))
+    store = cache.open(str(src))
+    np.testing.assert_array_equal(np.asarray(store.samples), data)
+    assert cache.load(str(src)) is not None
+    assert len(cache.entries()) == 1
+
+
+def test_modified_source_invalidates_entry(tmp_path):
+    src = tmp_path / 'a.wav'
+    _write(src, seed=0)
+    cache = AudioCache(root=str(tmp_path / 'cache'))
+    cache.open(str(src))
+    st = os.stat(src)
+    new = _write(src, seed=1)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert cache.load(str(src)) is None
+    store = cache.open(str(src))
+    np.testing.assert_array_equal(np.asarray(store.samples), new)
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = AudioCache(root=str(tmp_path / 'cache'))
+    sources = []
+    for i in range(3):
+        src = tmp_path / f'{i}.wav'
+        _write(src, seed=i)
+        cache.open(str(src))
+        sources.append(str(src))
+    size = max(s for _, s, _ in cache.entries())
+    # Dates d'utilisation explicites : 0 le plus ancien, puis 2, puis 1
+    for src, t in zip(sources, (100, 300, 200)):
+        meta = os.path.join(cache.root, cache.key(src), audio_cache.META_FILE)
+        os.utime(meta, (t, t))
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert cache.load(sources[0]) is None
+    assert cache.load(sources[1]) is not None
+    assert cache.load(sources[2]) is not None
+
+
+def test_unwritable_cache_uses_temp_file_removed_with_store(tmp_path, monkeypatch):
+    src = tmp_path / 'a.wav'
+    data = _write(src)
+    cache = AudioCache(root=str(tmp_path / 'cache'))
+
+    def fail(path, progress):
+        raise OSError("cache en lecture seule")
+
+    monkeypatch.setattr(cache, '_build', fail)
+    store = cache.open(str(src))
+    path = store.samples_path
+    assert os.path.exists(path)
+    np.testing.assert_array_equal(np.asarray(store.samples), data)
+    del store
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_open_store_is_not_evicted(tmp_path):
+    cache = AudioCache(root=str(tmp_path / 'cache'))
+    src = tmp_path / 'a.wav'
+    _write(src)
+    store = cache.open(str(src))
+    cache.max_bytes = 0
+    cache.evict()
+    assert os.path.isdir(os.path.join(cache.root, cache.key(str(src))))
+    del store
+    gc.collect()
+    cache.evict()
+    assert cache.entries() == []
+
+
+def _open_in_process(args):
+    root, src = args
+    store = AudioCache(root=root).open(src)
+    return float(np.asarray(store.samples).sum())
+
+
+def test_concurrent_processes_share_one_entry(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+    src = tmp_path / 'a.wav'
+    data = _write(src, seconds=2.0)
+    root = str(tmp_path / 'cache')
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        sums = list(pool.map(_open_in_process, [(root, str(src))] * 8))
+    np.testing.assert_allclose(sums, float(data.sum()), rtol=1e-6)
+    assert len(AudioCache(root=root).entries()) == 1
+    assert not [n for n in os.listdir(root) if n.endswith('.tmp')]
+
+
+def _locks(cache):
+    return sorted(n for n in os.listdir(cache.root) if n.endswith('.lock'))
+
+
+def test_lock_files_are_removed_with_their_entries(tmp_path):
+    cache = AudioCache(root=str(tmp_path / 'cache'))
+    sources = []
+    for i in range(3):
+        src = tmp_path / f'{i}.wav'
+        _write(src, seed=i)
+        cache.open(str(src))
+        sources.append(str(src))
+    gc.collect()
+    assert len(_locks(cache)) == 3
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.entries() == [] and _locks(cache) == []
+    # Verrous orphelins (entrées supprimées à la main) : balayés par clear, sauf celui d'une entrée ouverte
+    store = cache.open(sources[0])
+    for name in ('0' * 40, '1' * 40):
+        open(os.path.join(cache.root, f'.{name}.lock'), 'w').close()
+    cache.clear()
+    assert _locks(cache) == [f'.{cache.key(sources[0])}.lock']
+    del store
+    gc.collect()
+    cache.clear()
+    assert os.listdir(cache.root) == []
+    # Le cache reste utilisable après la suppression des verrous
+    assert cache.open(sources[1]) is not None
@@ -0,0 +1,86 @@
+import types
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import audio_store
+from audio_store import AudioStore, PeakPyramid
+
+SR = 8000
+
+
+def _write(path, frames=5000, seed=0):
+    data = np.random.default_rng(seed).uniform(-0.5, 0.5, size=(frames, 2)).astype(np.float32)
+    sf.write(path, data, SR, subtype='FLOAT')
+    return data
+
+
+def _brute_force(mono, bucket):
+    edges = range(0, mono.shape[0], bucket)
+    return (np.array([mono[i:i + bucket].min() for i in edges]),
+            np.array([mono[i:i + bucket].max() for i in edges]))
+
+
+@pytest.mark.parametrize('n', [1, 15, 16, 1000, 4099])
+def test_pyramid_levels_match_brute_force_reduction(n):
+    mono = np.random.default_rng(n).standard_normal(n).astype(np.float32)
+    pyramid = PeakPyramid(base=16)
+    # Blocs de tailles quelconques : les restes sont reportés d'un bloc à l'autre
+    for chunk in np.array_split(mono, [7, 300, 301, 2500]):
+        pyramid.append(chunk)
+    pyramid.finish()
+    assert pyramid.levels[-1][0].shape == (1,)
+    for level, (mins, maxs) in enumerate(pyramid.levels):
+        exp_min, exp_max = _brute_force(mono, pyramid.bucket(level))
+        np.testing.assert_array_equal(mins, exp_min)
+        np.testing.assert_array_equal(maxs, exp_max)
+    envelope = pyramid.envelope(0)
+    np.testing.assert_array_equal(envelope[0::2], pyramid.levels[0][0])
+    np.testing.assert_array_equal(envelope[1::2], pyramid.levels[0][1])
+
+
+def test_level_for_picks_the_finest_covering_level():
+    pyramid = PeakPyramid(base=16)
+    pyramid.append(np.zeros(16 * 64, dtype=np.float32))
+    pyramid.finish()
+    assert pyramid.level_for(1) == 0
+    assert pyramid.level_for(31) == 0
+    assert pyramid.level_for(32) == 1
+    assert pyramid.level_for(100) == 2
+    assert pyramid.level_for(10 ** 9) == len(pyramid.levels) - 1
+
+
+def test_memmapped_slice_is_a_zero_copy_view(tmp_path):
+    src = tmp_path / 'a.wav'
+    data = _write(src)
+    store = AudioStore.from_file(str(src), samples_path=str(tmp_path / 'a.npy'), blocksize=1024)
+    assert isinstance(store.samples, np.memmap)
+    grain = store.slice(1234, 500)
+    assert np.shares_memory(grain, store.samples)
+    np.testing.assert_array_equal(grain, data[1234:1734])
+    store.save(str(tmp_path / 'a'))
+    loaded = AudioStore.load(str(tmp_path / 'a'))
+    assert isinstance(loaded.samples, np.memmap)
+    assert np.shares_memory(loaded.slice(10, 20), loaded.samples)
+    np.testing.assert_array_equal(loaded.pyramid.levels[0][0], store.pyramid.levels[0][0])
+
+
+@pytest.mark.parametrize('memmap', [False, True])
+def test_blocks_past_the_announced_length_grow_the_store(tmp_path, monkeypatch, memmap):
+    src = tmp_path / 'a.wav'
+    data = _write(src, frames=5000)
+    info = sf.info(str(src))
+    # Nombre de frames sous-estimé par l'en-tête (formats compressés)
+    monkeypatch.setattr(audio_store.sf, 'info', lambda path: types.SimpleNamespace(
+        frames=1800, channels=info.channels))
+    samples_path = str(tmp_path / 'a.npy') if memmap else None
+    store = AudioStore.from_file(str(src), samples_path=samples_path, blocksize=1024)
+    assert store.frames == 5000
+    np.testing.assert_array_equal(np.asarray(store.samples), data)
+    exp_min, exp_max = _brute_force(data.mean(axis=1), 16)
+    np.testing.assert_allclose(store.pyramid.levels[0][0], exp_min, atol=1e-7)
+    np.testing.assert_allclose(store.pyramid.levels[0][1], exp_max, atol=1e-7)
+    if memmap:
+        assert isinstance(store.samples, np.memmap)
+        assert not (tmp_path / 'a.npy.grow').exists()
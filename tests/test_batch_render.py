@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import batch_render
+
+SR = 8000
+
+
+def test_batch_renders_mirrored_tree_without_leaving_a_cache(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    for sub in ('a', 'b'):
+        os.makedirs(tmp_path / 'src' / sub)
+        sf.write(tmp_path / 'src' / sub / 'x.wav', rng.uniform(-0.5, 0.5, (SR, 2)).astype(np.float32), SR)
+    tmp_root = tmp_path / 'tmp'
+    os.makedirs(tmp_root)
+    monkeypatch.setattr(batch_render.tempfile, 'tempdir', str(tmp_root))
+    out = tmp_path / 'out'
+    status = batch_render.main([str(tmp_path / 'src' / '**' / '*.wav'), '-o', str(out), '--seconds', '0.5',
+                                '--variants', '2', '--workers', '2', '--seed', '1'])
+    assert status == 0
+    for sub in ('a', 'b'):
+        for variant in ('001', '002'):
+            data, sr = sf.read(out / sub / f'x_{variant}.wav')
+            assert sr == SR and data.shape == (SR // 2, 2)
+    assert os.listdir(tmp_root) == []
+
+
+def test_output_names_reject_extension_only_duplicates(tmp_path):
+    names = batch_render.output_names([str(tmp_path / 'a' / 'x.wav'), str(tmp_path / 'b' / 'x.wav')])
+    assert names == [os.path.join('a', 'x'), os.path.join('b', 'x')]
+    with pytest.raises(ValueError):
+        batch_render.output_names([str(tmp_path / 'x.wav'), str(tmp_path / 'x.flac')])
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from envelopes import ENVELOPES, EnvelopeTables, make_envelope
+
+
+@pytest.mark.parametrize('shape', ['Hann', 'Hamming', 'Gauss'])
+@pytest.mark.parametrize('n', [3, 64, 441, 2205, 44100])
+def test_table_envelopes_within_error_bound(shape, n):
+    env = EnvelopeTables().get(shape, n)
+    assert env.dtype == np.float32
+    assert np.abs(env - make_envelope(shape, n)).max() < 1e-6
+
+
+@pytest.mark.parametrize('shape', ['Lin', 'Rect'])
+def test_piecewise_linear_envelopes_are_exact(shape):
+    for n in (1, 2, 7, 1000):
+        np.testing.assert_array_equal(EnvelopeTables().get(shape, n), make_envelope(shape, n).astype(np.float32))
+
+
+def test_cache_is_lru_and_read_only():
+    tables = EnvelopeTables(cache_size=2)
+    a = tables.get('Hann', 100)
+    tables.get('Hann', 200)
+    assert tables.get('Hann', 100) is a
+    tables.get('Hann', 300)          # évince 200, le moins récemment utilisé
+    assert tables.get('Hann', 100) is a
+    assert ('Hann', 200) not in tables._cache
+    assert not a.flags.writeable
+
+
+def test_tables_are_built_once_and_read_only():
+    tables = EnvelopeTables()
+    for name in ENVELOPES:
+        table = tables.table(name)
+        assert table is tables.table(name)
+        assert not table.flags.writeable
+    assert tables.table('inconnue') is tables.table('Hann')
+
+
+def test_apply_windows_every_channel():
+    tables = EnvelopeTables()
+    grain = np.ones((2, 500), dtype=np.float32)
+    out = tables.apply(grain, 'Hann')
+    np.testing.assert_allclose(out, np.broadcast_to(tables.get('Hann', 500), (2, 500)))
+    assert tables.stacked().shape == (len(ENVELOPES), tables.table_size)
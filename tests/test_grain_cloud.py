@@ -0,0 +1,86 @@
+import numpy as np
+
+from audio_store import AudioStore
+from engine import GranularEngine
+from envelopes import ENVELOPE_TABLES
+from grain_cloud import GrainCloud
+from param_store import CloudParams
+from voice_pool import VoicePool, write_frames
+
+SR = 44100
+
+
+def _cloud(params, source, capacity=64, seed=0):
+    pool = VoicePool(capacity=capacity, max_frames=256)
+    cloud = GrainCloud(pool, SR, seed=seed)
+    cloud.set_source(source, SR)
+    cloud.params = params
+    cloud.running = True
+    return pool, cloud
+
+
+def _run(pool, cloud, frames, block=256, reserve=0):
+    out = np.zeros((frames, 2), dtype=np.float32)
+    for i in range(0, frames, block):
+        m = min(block, frames - i)
+        pool.apply_commands()
+        cloud.spawn(m, reserve)
+        pool.mix(out[i:i + m], m)
+    return out
+
+
+def test_cloud_grains_are_enveloped_source_slices():
+    # Zone constante, transposition et pan fixes : chaque grain vaut son enveloppe fois le gain
+    source = np.ones((SR, 2), dtype=np.float32)
+    params = CloudParams(density=10, size_ms=50, size_jitter=0, pitch_jitter=0, pan_jitter=0, envelope='Hann')
+    pool, cloud = _cloud(params, source)
+    out = _run(pool, cloud, SR // 4)
+    length = int(round(0.05 * SR))
+    size = ENVELOPE_TABLES.table('Hann').shape[0]
+    env = ENVELOPE_TABLES.table('Hann')[np.arange(length) * (size - 1) // (length - 1)]
+    gain = np.cos(np.pi / 4.0) * np.sqrt(2.0)
+    onsets = np.arange(0, SR // 4, SR // 10)
+    expected = np.zeros(SR // 4, dtype=np.float32)
+    for onset in onsets:
+        seg = expected[onset:onset + length]
+        seg += env[:seg.shape[0]] * gain
+    np.testing.assert_allclose(out[:, 0], expected, atol=1e-5)
+    np.testing.assert_allclose(out[:, 1], expected, atol=1e-5)
+
+
+def test_cloud_keeps_reserved_slots_and_counts_drops():
+    source = np.ones((SR, 2), dtype=np.float32)
+    params = CloudParams(density=2000, size_ms=200)
+    pool, cloud = _cloud(params, source, capacity=32)
+    _run(pool, cloud, 4096, reserve=8)
+    assert cloud.grains() == 24
+    assert cloud.dropped > 0
+    cloud.running = False
+    _run(pool, cloud, SR // 2)
+    assert cloud.grains() == 0
+
+
+def test_cloud_zone_switch_frees_old_zone():
+    rng = np.random.default_rng(2)
+    zone = rng.standard_normal((4000, 2)).astype(np.float32)
+    pool, cloud = _cloud(CloudParams(density=200, size_ms=40), zone)
+    _run(pool, cloud, 1024)
+    cloud.set_source(zone[:2000].copy(), SR)
+    _run(pool, cloud, 1024)
+    cloud.running = False
+    _run(pool, cloud, SR // 10)
+    assert cloud.grains() == 0
+    assert int(pool.src_live.sum()) == 1
+
+
+def test_multichannel_zone_keeps_the_voices_stereo_image():
+    sr = 8000
+    samples = np.random.default_rng(5).standard_normal((sr, 4)).astype(np.float32)
+    engine = GranularEngine(max_workers=0)
+    engine.audio = AudioStore(samples, sr, None)
+    engine.set_cloud_zone(0.25, 0.5)
+    zone, zone_sr = engine.cloud_source
+    assert zone_sr == sr
+    # Canaux pairs à gauche, impairs à droite, comme les grains des voix nommées
+    expected = write_frames(np.empty((4000, 2), np.float32), samples[2000:6000].T)
+    np.testing.assert_array_equal(zone, expected)
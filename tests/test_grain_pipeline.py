@@ -0,0 +1,52 @@
+import numpy as np
+
+from grain_pipeline import GrainPipeline
+from param_store import GrainParams
+
+SR = 44100
+
+
+def _source():
+    t = np.arange(4410) / SR
+    return np.stack([np.sin(2 * np.pi * 220 * t), np.sin(2 * np.pi * 330 * t)], axis=1).astype(np.float32)
+
+
+def test_first_run_computes_every_stage():
+    pipeline = GrainPipeline()
+    grain = pipeline.run(_source(), SR, GrainParams())
+    assert pipeline.last_run == tuple(name for name, _, _ in pipeline.stages)
+    assert grain.shape == (2, 4410)
+    assert grain.dtype == np.float32
+    assert not grain.flags.writeable
+
+
+def test_parameter_change_reruns_only_downstream_stages():
+    pipeline = GrainPipeline()
+    source = _source()
+    p = GrainParams()
+    pipeline.run(source, SR, p)
+    pipeline.run(source, SR, p.replace(distortion=True))
+    assert pipeline.last_run == ('distortion', 'delay')
+    pipeline.run(source, SR, p.replace(distortion=True, delay=True))
+    assert pipeline.last_run == ('delay',)
+    pipeline.run(source, SR, p.replace(envelope='Gauss', distortion=True, delay=True))
+    assert pipeline.last_run == ('envelope', 'ringmod', 'distortion', 'delay')
+
+
+def test_unchanged_and_cached_parameters_rerun_nothing():
+    pipeline = GrainPipeline()
+    source = _source()
+    p = GrainParams()
+    first = pipeline.run(source, SR, p)
+    pipeline.run(source, SR, p.replace(distortion=True))
+    again = pipeline.run(source, SR, p)
+    assert pipeline.last_run == ()
+    assert again is first
+
+
+def test_new_source_invalidates_caches():
+    pipeline = GrainPipeline()
+    p = GrainParams()
+    pipeline.run(_source(), SR, p)
+    pipeline.run(_source(), SR, p)
+    assert pipeline.last_run == tuple(name for name, _, _ in pipeline.stages)
@@ -0,0 +1,79 @@
+import numpy as np
+
+from mixer import GrainMixer
+from param_store import GrainParams, ParamStore
+
+SR = 44100
+BLOCK = 256
+
+
+def _mixer(swap_mode, grain):
+    store = ParamStore()
+    store.publish('voix', GrainParams())
+    mixer = GrainMixer(SR, store, xfade_ms=1.0, swap_mode=swap_mode, blocksize=BLOCK)
+    mixer.set_grain('voix', grain)
+    mixer.set_active('voix', True)
+    return mixer
+
+
+def _render(mixer, blocks):
+    out = np.zeros((blocks * BLOCK, 2), dtype=np.float32)
+    for i in range(blocks):
+        mixer.render(out[i * BLOCK:(i + 1) * BLOCK], BLOCK)
+    return out
+
+
+def test_crossfade_swap_has_no_step_discontinuity():
+    mixer = _mixer('crossfade', np.full((300, 2), 0.5, dtype=np.float32))
+    _render(mixer, 2)          # fondu d'activation
+    before = _render(mixer, 1)
+    mixer.set_grain('voix', np.full((400, 2), -0.25, dtype=np.float32))
+    after = _render(mixer, 3)
+    out = np.concatenate([before, after])[:, 0]
+    np.testing.assert_allclose(before, 0.5, atol=1e-6)
+    np.testing.assert_allclose(after[-BLOCK:], -0.25, atol=1e-6)
+    # Fondu linéaire de xfade_len échantillons : aucun saut plus grand qu'un pas de la rampe
+    assert np.abs(np.diff(out)).max() <= 0.75 / mixer.xfade_len + 1e-6
+    assert mixer.pool.voices() == 1
+
+
+def test_loop_swap_starts_at_the_loop_boundary_and_releases_the_old_source():
+    old = np.repeat((np.arange(300, dtype=np.float32) / 1000.0)[:, None], 2, axis=1)
+    new = np.repeat((-1.0 - np.arange(200, dtype=np.float32) / 1000.0)[:, None], 2, axis=1)
+    mixer = _mixer('loop', old)
+    pool = mixer.pool
+    _render(mixer, 2)          # fondu d'activation ; 512 frames jouées
+    old_source = int(pool.source[mixer._voices['voix'].slot])
+    mixer.set_grain('voix', new)
+    out = _render(mixer, 2)
+    # Fin de boucle à la frame 600 : 88 frames de l'ancien grain, puis le nouveau depuis son début
+    t = np.arange(512, 1024)
+    boundary = 600
+    expected = np.where(t < boundary, old[t % 300, 0], new[(t - boundary) % 200, 0])
+    np.testing.assert_array_equal(out[:, 0], expected)
+    assert pool.voices() == 1
+    assert pool.src_refs[old_source] == 0
+    assert not pool.src_live[old_source]
+
+
+def test_small_blocks_render_like_large_blocks():
+    rng = np.random.default_rng(4)
+    grains = {'bass': rng.standard_normal((3000, 2)).astype(np.float32) * 0.2,
+              'treble': rng.standard_normal((777, 2)).astype(np.float32) * 0.2}
+    params = {'bass': GrainParams(reverb=True, volume=0.8), 'treble': GrainParams(pitch=5, pitch_mode='tape')}
+    frames = 8192
+    outputs = []
+    for blocksize in (64, 1024):
+        store = ParamStore()
+        for name, p in params.items():
+            store.publish(name, p)
+        mixer = GrainMixer(SR, store, blocksize=blocksize)
+        for name, grain in grains.items():
+            mixer.set_grain(name, grain)
+            mixer.set_active(name, True)
+        out = np.zeros((frames, 2), dtype=np.float32)
+        for i in range(0, frames, blocksize):
+            mixer.render(out[i:i + blocksize], blocksize)
+        outputs.append(out)
+    # Hors fondus d'activation (rampes sur un bloc), le rendu ne dépend pas de la taille de bloc
+    np.testing.assert_allclose(outputs[0][2048:], outputs[1][2048:], atol=1e-5)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from mixer import GrainMixer
+from offline_render import loop_frames, render_mix
+from param_store import CloudParams, GrainParams, ParamStore
+
+SR = 44100
+
+
+def _grains():
+    rng = np.random.default_rng(0)
+    return {name: rng.standard_normal((n, 2)).astype(np.float32) * 0.2
+            for name, n in (('bass', 3000), ('medium', 1234), ('treble', 777))}
+
+
+def _params():
+    return {
+        'bass': GrainParams(reverb=True, volume=0.8),
+        'medium': GrainParams(pitch=5, pitch_mode='tape'),
+        'treble': GrainParams(volume=0.5),
+    }
+
+
+def _live(grains, params, frames, blocksize, swap_mode):
+    store = ParamStore()
+    for name, p in params.items():
+        store.publish(name, p)
+    mixer = GrainMixer(SR, store, swap_mode=swap_mode, blocksize=blocksize)
+    for name, grain in grains.items():
+        mixer.set_grain(name, grain)
+        mixer.set_active(name, True)
+    out = np.zeros((frames, 2), dtype=np.float32)
+    for i in range(0, frames, blocksize):
+        mixer.render(out[i:i + blocksize], min(blocksize, frames - i))
+    return out
+
+
+@pytest.mark.parametrize('swap_mode', ['crossfade', 'loop'])
+@pytest.mark.parametrize('blocksize', [256, 1024])
+def test_offline_render_matches_live_callback(swap_mode, blocksize):
+    grains, params = _grains(), _params()
+    frames = 20000
+    live = _live(grains, params, frames, blocksize, swap_mode)
+    offline = np.concatenate([chunk.copy() for chunk in render_mix(
+        grains, params, SR, frames, blocksize=blocksize, swap_mode=swap_mode, write_blocksize=4096)])
+    np.testing.assert_array_equal(offline, live)
+
+
+def test_channel_major_grains_render_like_frame_major():
+    grains, params = _grains(), _params()
+    frames = 8192
+    frame_major = np.concatenate([c.copy() for c in render_mix(grains, params, SR, frames)])
+    channel_major = np.concatenate([c.copy() for c in render_mix(
+        {k: np.ascontiguousarray(g.T) for k, g in grains.items()}, params, SR, frames, channel_major=True)])
+    np.testing.assert_array_equal(channel_major, frame_major)
+
+
+def test_cloud_only_render():
+    zone = np.random.default_rng(1).standard_normal((8000, 2)).astype(np.float32) * 0.2
+    out = np.concatenate([c.copy() for c in render_mix({}, {}, SR, 8192, cloud=(zone, SR, CloudParams(density=100)))])
+    assert out.shape == (8192, 2)
+    assert np.abs(out).max() > 0.0
+
+
+def test_loop_frames_uses_longest_grain():
+    grains = _grains()
+    assert loop_frames(grains, 2) == 6000
+    assert loop_frames({k: g.T for k, g in grains.items()}, 2, channel_major=True) == 6000
+    with pytest.raises(ValueError):
+        loop_frames({}, 1)
+
+
+def test_loop_frames_follows_tape_playback_rate():
+    grains = {'bass': np.zeros((1000, 2), dtype=np.float32), 'treble': np.zeros((600, 2), dtype=np.float32)}
+    params = {'bass': GrainParams(pitch=12, pitch_mode='tape'), 'treble': GrainParams()}
+    assert loop_frames({'bass': grains['bass']}, 4, params) == 2000
+    # La basse, transposée d'une octave, boucle en 500 frames : la plus longue boucle est l'aigu
+    assert loop_frames(grains, 4, params) == 2400
+    params['treble'] = GrainParams(pitch=-12, pitch_mode='tape')
+    assert loop_frames(grains, 4, params) == 4800
+    assert loop_frames(grains, 4) == 4000
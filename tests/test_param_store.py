@@ -0,0 +1,45 @@
+import dataclasses
+
+import pytest
+
+from param_store import GrainParams, ParamStore
+
+
+def test_snapshot_is_read_only():
+    store = ParamStore()
+    store.publish('bass', GrainParams())
+    snapshot = store.snapshot()
+    with pytest.raises(TypeError):
+        snapshot['bass'] = GrainParams(volume=0.0)
+    with pytest.raises(TypeError):
+        del snapshot['bass']
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot['bass'].volume = 0.0
+
+
+def test_publish_swaps_in_a_new_snapshot_without_touching_the_held_one():
+    store = ParamStore()
+    store.publish('bass', GrainParams(volume=0.5))
+    held = store.snapshot()
+    store.publish('bass', held['bass'].replace(volume=0.8))
+    store.publish('treble', GrainParams(pitch=7))
+    assert store.snapshot() is not held
+    assert dict(held) == {'bass': GrainParams(volume=0.5)}
+    assert store.get('bass').volume == 0.8
+    assert store.get('treble').pitch == 7
+
+
+def test_unknown_names_and_defaults():
+    store = ParamStore()
+    assert len(store.snapshot()) == 0
+    assert store.get('bass') is None
+    fallback = GrainParams()
+    assert store.get('bass', fallback) is fallback
+    assert store.snapshot().get('bass') is None
+    # Réglages absents : valeurs par défaut ; réglage inconnu : refusé
+    p = GrainParams(pitch=12)
+    assert p.volume == 1.0 and p.pitch_mode == 'shift'
+    assert p.playback_rate == 1.0 and p.shift_semitones == 12
+    assert p.replace(pitch_mode='tape').playback_rate == pytest.approx(2.0)
+    with pytest.raises(TypeError):
+        p.replace(gain=0.5)
@@ -0,0 +1,90 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from grain_pipeline import GrainPipeline
+from mixer import GrainMixer
+from param_store import GrainParams, ParamStore
+from resampler import SincResampler, sinc_table
+
+SR = 44100
+
+
+def _peak_hz(x, sr=SR):
+    spectrum = np.abs(np.fft.rfft(x * np.hanning(x.shape[0])))
+    return np.argmax(spectrum) * sr / x.shape[0]
+
+
+def _loop(freq, n):
+    # Boucle d'un nombre entier de périodes : pas de discontinuité au bouclage
+    t = np.arange(n) / SR
+    tone = np.sin(2 * np.pi * freq * t).astype(np.float32)
+    return np.stack([tone, tone], axis=1)
+
+
+@pytest.mark.parametrize('semitones', [-12, -5, 7, 12])
+def test_read_loop_transposes_frequency(semitones):
+    rate = 2.0 ** (semitones / 12.0)
+    grain = _loop(441.0, 4400)
+    out = np.zeros((SR, 2), dtype=np.float32)
+    resampler = SincResampler()
+    pos = 0.0
+    for i in range(0, SR, 1000):
+        pos = resampler.read_loop(out[i:i + 1000], grain, pos, rate)
+    assert abs(_peak_hz(out[:, 0]) - 441.0 * rate) < 2.0
+
+
+def test_tables_cover_the_pitch_range_without_rebuilding():
+    resampler = SincResampler()
+    np.testing.assert_array_equal(resampler.table(0.5), sinc_table(1.0))
+    for semitones in (1, 7, 24):
+        rate = 2.0 ** (semitones / 12.0)
+        np.testing.assert_allclose(resampler.table(rate), sinc_table(0.9 / rate), atol=1e-7)
+    # Rapport fractionnaire : table du demi-ton supérieur, déjà construite
+    table = resampler.table(2.0 ** (6.5 / 12.0))
+    assert np.shares_memory(table, resampler._tables)
+    np.testing.assert_allclose(table, sinc_table(0.9 / 2.0 ** (7 / 12.0)), atol=1e-7)
+    assert np.shares_memory(resampler.table(100.0), resampler._tables)
+
+
+def test_read_loop_allocates_no_block_sized_buffers():
+    frames = 8192
+    resampler = SincResampler(max_frames=frames)
+    grain = _loop(441.0, 4400)
+    out = np.zeros((frames, 2), dtype=np.float32)
+    pos = resampler.read_loop(out, grain, 0.0, 1.5)
+    tracemalloc.start()
+    resampler.read_loop(out, grain, pos, 2.0 ** (5.3 / 12.0))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # Un seul tableau (frames, taps) d'indices ferait déjà 1 Mo
+    assert peak < frames * 16 * 8 // 4
+
+
+def test_tape_mode_voice_plays_at_transposed_frequency():
+    store = ParamStore()
+    store.publish('bass', GrainParams(pitch=7, pitch_mode='tape'))
+    mixer = GrainMixer(SR, store, blocksize=512)
+    mixer.set_grain('bass', _loop(441.0, 4400))
+    mixer.set_active('bass', True)
+    out = np.zeros((SR, 2), dtype=np.float32)
+    for i in range(0, SR, 512):
+        mixer.render(out[i:i + 512], min(512, SR - i))
+    assert abs(_peak_hz(out[SR // 4:, 0]) - 441.0 * 2.0 ** (7 / 12.0)) < 3.0
+
+
+def test_resample_keeps_dc_and_length():
+    x = np.ones((2, 1000), dtype=np.float32)
+    y = SincResampler().resample(x, 1500)
+    assert y.shape == (2, 1500)
+    np.testing.assert_allclose(y, 1.0, atol=1e-4)
+
+
+def test_tape_pitch_skips_the_pitch_shifter():
+    pipeline = GrainPipeline()
+    source = _loop(441.0, 4410)
+    p = GrainParams(pitch_mode='tape')
+    pipeline.run(source, SR, p)
+    pipeline.run(source, SR, p.replace(pitch=7))
+    assert pipeline.last_run == ()
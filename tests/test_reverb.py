@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from reverb import BlockReverb
+
+SR = 44100
+
+
+def _impulse_response(reverb, seconds=2.0, block=512):
+    x = np.zeros((int(seconds * SR), 2), dtype=np.float32)
+    x[0] = 1.0
+    for i in range(0, x.shape[0], block):
+        reverb.process(x[i:i + block])
+    return x
+
+
+def _rms(x, start, end):
+    return np.sqrt(np.mean(x[int(start * SR):int(end * SR)] ** 2))
+
+
+@pytest.mark.parametrize('decay', [0.3, 0.6, 1.2])
+def test_tail_loses_60_db_in_decay_time(decay):
+    reverb = BlockReverb(SR)
+    reverb.set_params(room_size=0.5, decay=decay, amount=1.0)
+    x = _impulse_response(reverb)
+    drop = 20 * np.log10(_rms(x, 0.1, 0.2) / _rms(x, 0.1 + decay, 0.2 + decay))
+    assert 57.0 < drop < 63.0
+
+
+def test_room_size_change_keeps_buffers():
+    reverb = BlockReverb(SR)
+    reverb.set_params(room_size=0.0, decay=0.5, amount=0.5)
+    buffers = [c.buf for c in reverb._combs] + [a.buf for a in reverb._allpasses]
+    block = np.random.default_rng(0).standard_normal((256, 2)).astype(np.float32)
+    for room_size in (0.0, 1.0, 0.3, 1.0, 0.0):
+        reverb.set_params(room_size=room_size)
+        out = block.copy()
+        reverb.process(out)
+        assert np.isfinite(out).all()
+    assert all(a is b for a, b in zip(buffers, [c.buf for c in reverb._combs] + [a.buf for a in reverb._allpasses]))
+
+
+def test_silent_reverb_is_idle_and_transparent():
+    reverb = BlockReverb(SR)
+    block = np.random.default_rng(1).standard_normal((256, 2)).astype(np.float32)
+    out = block.copy()
+    reverb.process(out)
+    np.testing.assert_array_equal(out, block)
+    assert reverb.idle
@@ -0,0 +1,49 @@
+import numpy as np
+
+from ring_buffer import SampleRing
+
+
+def test_latest_is_contiguous_across_wrap_around():
+    ring = SampleRing(16)
+    data = np.arange(100, dtype=np.float32)
+    pos = 0
+    for n in (5, 7, 3, 11, 16, 9, 13):
+        ring.write(data[pos:pos + n])
+        pos += n
+        assert ring.available() == min(pos, 16)
+        for k in (1, 4, 16):
+            view = ring.latest(k)
+            expected = data[max(0, pos - k):pos]
+            np.testing.assert_array_equal(view, expected)
+            assert view.base is not None   # vue sans copie
+
+
+def test_block_longer_than_capacity_keeps_its_tail():
+    ring = SampleRing(8)
+    ring.write(np.arange(3, dtype=np.float32))
+    ring.write(np.arange(100, 120, dtype=np.float32))
+    assert ring.written == 23
+    np.testing.assert_array_equal(ring.latest(8), np.arange(112, 120, dtype=np.float32))
+
+
+def test_strided_blocks_are_accepted():
+    ring = SampleRing(8)
+    stereo = np.arange(20, dtype=np.float32).reshape(10, 2)
+    ring.write(stereo[:, 0])
+    np.testing.assert_array_equal(ring.latest(8), stereo[2:, 0])
+
+
+def test_written_is_published_after_the_copy():
+    ring = SampleRing(8)
+    ring.write(np.arange(3, dtype=np.float32))
+    seen = []
+
+    class Spy(np.ndarray):
+        def __setitem__(self, key, value):
+            seen.append(ring.written)
+            super().__setitem__(key, value)
+
+    ring._buf = ring._buf.view(Spy)
+    ring.write(np.arange(100, 120, dtype=np.float32))
+    assert seen and set(seen) == {3}
+    assert ring.written == 23
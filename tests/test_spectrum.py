@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from spectrum import BandAnalyzer
+
+
+def _loop_bands(segment, sr, n_bands, fmin=20.0):
+    # Ancienne réduction de l'égaliseur : une recherche de bins par bande
+    spec = np.abs(np.fft.rfft(segment * np.hanning(segment.size)))
+    freqs = np.fft.rfftfreq(segment.size, 1.0 / sr)
+    edges = np.logspace(np.log10(fmin), np.log10(sr / 2), n_bands + 1)
+    levels = []
+    for i in range(n_bands):
+        idx = np.where((freqs >= edges[i]) & (freqs < edges[i + 1]))[0]
+        levels.append(spec[idx].mean() if idx.size else 0.0)
+    return np.array(levels)
+
+
+@pytest.mark.parametrize('n_fft, sr, n_bands', [
+    (1024, 44100, 32),
+    (512, 48000, 32),
+    (512, 44100, 128),    # bandes basses plus étroites qu'un bin : vides
+    (64, 22050, 48),      # FFT très courte : la plupart des bandes sont vides
+])
+def test_reduceat_bands_match_the_per_band_loop(n_fft, sr, n_bands):
+    rng = np.random.default_rng(n_fft + n_bands)
+    analyzer = BandAnalyzer(n_bands)
+    for _ in range(3):
+        segment = rng.standard_normal(n_fft)
+        expected = _loop_bands(segment, sr, n_bands)
+        np.testing.assert_allclose(analyzer.analyze(segment, sr), expected, rtol=1e-10, atol=1e-12)
+    if n_fft <= 512 and n_bands >= 48:
+        assert (expected == 0).any()
+
+
+def test_silent_segment_gives_zero_bands():
+    analyzer = BandAnalyzer(32)
+    np.testing.assert_array_equal(analyzer.analyze(np.zeros(1024), 44100), np.zeros(32))
@@ -0,0 +1,112 @@
+import numpy as np
+
+from grain_pipeline import to_frames
+from mixer import GrainMixer
+from param_store import GrainParams, ParamStore
+from voice_pool import FOREVER, VoicePool, write_frames
+
+
+def _looped(grain, start, frames):
+    return np.take(grain, np.arange(start, start + frames) % grain.shape[0], axis=0)
+
+
+def _play(pool, grain, loop=False):
+    source = pool.add_source(grain)
+    pool.apply_commands()
+    slot = pool.start_voice(source, loop=loop, fade_in=loop, dur=FOREVER if loop else grain.shape[0])
+    pool.drop(source)
+    return slot
+
+
+def test_mixer_sums_n_named_voices():
+    rng = np.random.default_rng(0)
+    names = [f'voix{i}' for i in range(7)]
+    store = ParamStore()
+    for name in names:
+        store.publish(name, GrainParams())
+    mixer = GrainMixer(44100, store, xfade_ms=1.0, blocksize=256)
+    grains = {name: rng.standard_normal((300 + 37 * i, 2)).astype(np.float32) for i, name in enumerate(names)}
+    for name, grain in grains.items():
+        mixer.set_grain(name, grain)
+        mixer.set_active(name, True)
+    out = np.zeros((256, 2), dtype=np.float32)
+    mixer.render(out, 256)     # fondus d'entrée et normalisation
+    mixer.render(out, 256)
+    expected = sum(_looped(g, 256, 256) for g in grains.values()) / len(names)
+    np.testing.assert_allclose(out, expected, atol=1e-5)
+    assert mixer.pool.voices() == len(names)
+
+
+def test_pool_mixes_many_loops_in_one_pass():
+    rng = np.random.default_rng(1)
+    pool = VoicePool(capacity=64, xfade_len=1, max_frames=128)
+    grains = [rng.standard_normal((n, 2)).astype(np.float32) for n in rng.integers(50, 400, size=40)]
+    for g in grains:
+        _play(pool, g, loop=True)
+    out = np.zeros((128, 2), dtype=np.float32)
+    pool.mix(out, 128)          # fondu d'entrée d'un échantillon
+    out.fill(0)
+    pool.mix(out, 128)
+    expected = sum(_looped(g, 128, 128) for g in grains)
+    np.testing.assert_allclose(out, expected, atol=1e-4)
+    assert pool.voices() == len(grains)
+
+
+def test_pool_releases_finished_one_shots():
+    pool = VoicePool(capacity=4, max_frames=64, arena_frames=400)
+    grain = np.ones((100, 2), dtype=np.float32)
+    for _ in range(3):
+        assert _play(pool, grain) >= 0
+    out = np.zeros((64, 2), dtype=np.float32)
+    pool.mix(out, 64)
+    np.testing.assert_allclose(out, 3.0)
+    pool.mix(out, 64)
+    assert pool.voices() == 0
+    # Les régions libérées sont réutilisées sans agrandir l'arène
+    assert pool.add_source(np.ones((200, 2), dtype=np.float32)) is not None
+    assert pool._arena.shape[0] == 400
+
+
+def test_to_frames_layouts():
+    grain = np.arange(12, dtype=np.float32).reshape(4, 3)
+    np.testing.assert_array_equal(to_frames(grain[:1]), np.stack([grain[0], grain[0]], axis=1))
+    np.testing.assert_array_equal(to_frames(grain[:2]), grain[:2].T)
+    np.testing.assert_array_equal(to_frames(grain), np.stack([grain[0::2].mean(0), grain[1::2].mean(0)], axis=1))
+
+
+def test_channel_major_sources_are_transposed_into_the_arena():
+    grain = np.random.default_rng(3).standard_normal((2, 500)).astype(np.float32)
+    pool = VoicePool(capacity=4, max_frames=256)
+    source = pool.add_source(grain, channel_major=True)
+    pool.apply_commands()
+    start = pool.src_offset[source]
+    np.testing.assert_array_equal(pool._arena[start:start + 500], write_frames(np.empty((500, 2), np.float32), grain))
+    assert pool.src_length[source] == 500
+
+
+def test_grain_set_between_commands_and_block_waits_for_its_source():
+    store = ParamStore()
+    store.publish('a', GrainParams())
+    mixer = GrainMixer(44100, store, xfade_ms=1.0, blocksize=256)
+    old = np.full((300, 2), 0.5, dtype=np.float32)
+    new = np.full((400, 2), -0.25, dtype=np.float32)
+    mixer.set_grain('a', old)
+    mixer.set_active('a', True)
+    out = np.zeros((256, 2), dtype=np.float32)
+    mixer.render(out, 256)
+    # Le GUI dépose un grain entre apply_commands et le rendu du bloc
+    mixer.pool.apply_commands()
+    mixer.set_grain('a', new)
+    mixer._render_block(out, 256)
+    v = mixer._voices['a']
+    assert v.slot >= 0
+    np.testing.assert_allclose(out, 0.5, atol=1e-6)
+    source = v.pending[0]
+    # Bloc suivant : la source est arrivée, le fondu enchaîné démarre et l'ancienne voix s'éteint
+    mixer.render(out, 256)
+    mixer.render(out, 256)
+    assert not v.pending
+    assert mixer.pool.source[v.slot] == source
+    np.testing.assert_allclose(out, -0.25, atol=1e-6)
+    assert mixer.pool.voices() == 1
+    assert mixer.pool.src_refs[source] == 1 and mixer.pool.src_dropped[source]
@@ -0,0 +1,539 @@
+"""Pool de voix de grains en structure de tableaux : des centaines de grains mixés en une passe vectorisée."""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from envelopes import ENVELOPE_TABLES
+from resampler import SincResampler
+
+NO_BUS = -1                              # voix mixée directement dans la sortie
+FOREVER = np.iinfo(np.int64).max // 4    # durée d'une voix bouclée sans fin
+
+
+def write_frames(dest, grain):
+    """Écrit le grain de la chaîne (canaux, frames) dans `dest` (frames, 2), transposé au passage.
+
+    Mono dupliqué, stéréo transposé tel quel ; au-delà de deux canaux, les
+    canaux pairs vont à gauche et les impairs à droite.
+    """
+    if grain.shape[0] == 1:
+        dest[:] = grain[0][:, None]
+    elif grain.shape[0] == 2:
+        dest[:] = grain.T
+    else:
+        dest[:, 0] = grain[0::2].mean(axis=0)
+        dest[:, 1] = grain[1::2].mean(axis=0)
+    return dest
+
+
+class VoicePool:
+    """Voix de grains stockées en colonnes NumPy (source, position, vitesse, gain, pan, bus...).
+
+    Les échantillons vivent dans une seule arène stéréo float32, découpée
+    en sources. L'arène est volontairement rangée par frames (frames, 2) :
+    le gather du mixage lit ainsi les deux canaux d'une frame d'un seul
+    accès. Les grains de la chaîne d'effets, rangés par canaux, y sont
+    transposés pendant la copie dans l'arène (`channel_major`), sans tampon
+    intermédiaire. Une source est lue par une ou plusieurs voix et n'est
+    libérée qu'une fois abandonnée par son propriétaire et terminée par
+    toutes ses voix (compteur de références tenu par le callback). Chaque
+    voix lit sa source en boucle ou une seule fois, à vitesse variable
+    (interpolation linéaire, ou sinc polyphase pour les voix qui le
+    demandent), éventuellement après un délai en frames, avec un gain par
+    canal (pan) et, pour les grains du nuage, une enveloppe lue dans les
+    tables précalculées d'envelopes.py. Le mixage d'un bloc est un gather
+    suivi d'une somme pondérée, quel que soit le nombre de voix actives ;
+    les voix d'un même bus (les voix nommées du mixeur) sont sommées à part
+    pour recevoir leur propre réverb.
+
+    Côté interface : `add_source`, `drop_source` et `release_all` (sous
+    verrou, appelables depuis plusieurs threads). Côté audio :
+    `apply_commands`, `mix` et les méthodes d'accès direct aux voix
+    (`start_voice`, `spawn`, `fade_out`...) utilisées par le mixeur et le
+    nuage de grains. Les deux ne communiquent que par deux files (`deque`,
+    append/popleft atomiques) : commandes vers le callback, sources
+    libérées vers l'interface, qui récupère alors leur place dans l'arène.
+    Le callback ne prend aucun verrou et n'alloue aucun tampon de travail :
+    ils sont dimensionnés à la construction pour `max_frames` frames, les
+    blocs plus longs étant mixés par tranches.
+    """
+
+    def __init__(self, capacity=256, xfade_len=220, arena_frames=1 << 19, max_frames=1024, max_sources=None):
+        self.capacity = capacity
+        self.xfade_len = max(1, xfade_len)
+        self.max_frames = max_frames
+        self.max_sources = max_sources or 2 * capacity
+        self.dropped = 0         # voix refusées faute de place
+        # État des voix (lu et écrit par le callback uniquement)
+        self.source = np.zeros(capacity, dtype=np.int64)
+        self.offset = np.zeros(capacity, dtype=np.int64)
+        self.length = np.ones(capacity, dtype=np.int64)
+        self.pos = np.zeros(capacity, dtype=np.float64)      # position dans la source (frames)
+        self.rate = np.ones(capacity, dtype=np.float64)
+        self.delay = np.zeros(capacity, dtype=np.int64)      # frames de sortie avant l'attaque
+        self.age = np.zeros(capacity, dtype=np.int64)        # frames de sortie déjà jouées
+        self.dur = np.full(capacity, FOREVER, dtype=np.int64)
+        self.gain = np.zeros(capacity, dtype=np.float32)
+        self.target = np.zeros(capacity, dtype=np.float32)
+        self.amp = np.zeros(capacity, dtype=np.float32)
+        self.pan = np.ones((capacity, 2), dtype=np.float32)  # gain par canal
+        self.env = np.full(capacity, -1, dtype=np.int64)     # forme d'enveloppe (indice de ENVELOPES, -1 : aucune)
+        self.bus = np.full(capacity, NO_BUS, dtype=np.int64)
+        self.loop = np.zeros(capacity, dtype=bool)
+        self.sinc = np.zeros(capacity, dtype=bool)
+        self.paused = np.zeros(capacity, dtype=bool)
+        self.active = np.zeros(capacity, dtype=bool)
+        # Sources (callback) : région de l'arène, voix qui la lisent, abandon par le propriétaire
+        self.src_offset = np.zeros(self.max_sources, dtype=np.int64)
+        self.src_length = np.zeros(self.max_sources, dtype=np.int64)
+        self.src_refs = np.zeros(self.max_sources, dtype=np.int64)
+        self.src_dropped = np.zeros(self.max_sources, dtype=bool)
+        self.src_live = np.zeros(self.max_sources, dtype=bool)
+        self._arena = np.zeros((arena_frames, 2), dtype=np.float32)
+        self._mix_arena = self._arena   # arène vue par le callback (bascule via la file de commandes)
+        self._commands = deque()
+        # Commandes du thread interface : (type, arguments...) -> méthode du callback
+        self._handlers = {'source': self._on_source, 'drop': self.drop,
+                          'stop_all': self._on_stop_all, 'arena': self._on_arena}
+        self._finished = deque()
+        # Allocation (thread interface) : sources et régions libres de l'arène
+        self._lock = threading.Lock()
+        self._free_sources = list(range(self.max_sources - 1, -1, -1))
+        self._free_regions = [(0, arena_frames)]
+        self._regions = {}
+        # Tampons de travail du callback
+        self.resampler = SincResampler(max_frames=max_frames)
+        tables = ENVELOPE_TABLES.stacked()
+        # Une ligne de uns en dernier : l'enveloppe -1 (aucune) y tombe
+        self._env_tables = np.vstack([tables, np.ones((1, tables.shape[1]), dtype=np.float32)]).ravel()
+        self._env_size = tables.shape[1]
+        size = capacity * max_frames
+        self._t = np.arange(max_frames, dtype=np.int64)
+        self._steps = np.arange(1, max_frames + 1, dtype=np.float32)
+        self._played = np.empty(size, dtype=np.int64)
+        self._index = np.empty(size, dtype=np.int64)
+        self._index_next = np.empty(size, dtype=np.int64)
+        self._x = np.empty(size, dtype=np.float64)
+        self._frac = np.empty(size, dtype=np.float32)
+        self._weights = np.empty(size, dtype=np.float32)
+        self._fade = np.empty(size, dtype=np.float32)
+        self._mask = np.empty(size, dtype=bool)
+        self._samples = np.empty(size * 2, dtype=np.float32)
+        self._next_samples = np.empty(size * 2, dtype=np.float32)
+
+    # --- Thread interface ---
+
+    def _collect(self):
+        while self._finished:
+            source = self._finished.popleft()
+            self._free_region(*self._regions.pop(source))
+            self._free_sources.append(source)
+
+    def _free_region(self, start, n):
+        regions = self._free_regions
+        regions.append((start, n))
+        regions.sort()
+        # Fusionne les régions contiguës
+        merged = [regions[0]]
+        for s, m in regions[1:]:
+            ps, pm = merged[-1]
+            if ps + pm == s:
+                merged[-1] = (ps, pm + m)
+            else:
+                merged.append((s, m))
+        self._free_regions = merged
+
+    def _alloc(self, n):
+        for i, (s, m) in enumerate(self._free_regions):
+            if m >= n:
+                if m == n:
+                    del self._free_regions[i]
+                else:
+                    self._free_regions[i] = (s + n, m - n)
+                return s
+        # Arène pleine : nouvelle arène plus grande, publiée au callback par la file de commandes.
+        # L'ancienne n'est plus jamais écrite, le callback peut la lire jusqu'à la bascule.
+        old = self._arena
+        size = old.shape[0]
+        new_size = max(2 * size, size + n)
+        arena = np.zeros((new_size, 2), dtype=np.float32)
+        arena[:size] = old
+        self._arena = arena
+        self._commands.append(('arena', arena))
+        self._free_region(size, new_size - size)
+        return self._alloc(n)
+
+    def add_source(self, buffer, channel_major=False):
+        """Copie `buffer` (frames, 2) dans l'arène ; retourne l'identifiant de la source, ou None.
+
+        Avec `channel_major`, `buffer` est un grain de la chaîne (canaux,
+        frames), transposé pendant la copie (voir `write_frames`). La source
+        reste disponible jusqu'à `drop_source`, puis jusqu'à la fin de la
+        dernière voix qui la lit.
+        """
+        n = buffer.shape[-1] if channel_major else buffer.shape[0]
+        with self._lock:
+            self._collect()
+            if n == 0 or not self._free_sources:
+                return None
+            start = self._alloc(n)
+            if channel_major:
+                write_frames(self._arena[start:start + n], buffer)
+            else:
+                self._arena[start:start + n] = buffer
+            source = self._free_sources.pop()
+            self._regions[source] = (start, n)
+            self._commands.append(('source', source, start, n))
+        return source
+
+    def drop_source(self, source):
+        """Abandonne `source` : sa place sera libérée à la fin des voix qui la lisent."""
+        self._commands.append(('drop', source))
+
+    def release_all(self):
+        """Arrête avec un fondu toutes les voix hors bus (les voix nommées du mixeur restent)."""
+        self._commands.append(('stop_all',))
+
+    def voices(self):
+        """Nombre de voix occupées (y compris celles en fin de fondu)."""
+        return int(np.count_nonzero(self.active))
+
+    # --- Callback audio ---
+
+    def apply_commands(self):
+        handlers = self._handlers
+        while self._commands:
+            kind, *args = self._commands.popleft()
+            handlers[kind](*args)
+
+    def _on_source(self, source, start, n):
+        self.src_offset[source] = start
+        self.src_length[source] = n
+        self.src_refs[source] = 0
+        self.src_dropped[source] = False
+        self.src_live[source] = True
+
+    def _on_stop_all(self):
+        self.target[self.bus == NO_BUS] = 0.0
+
+    def _on_arena(self, arena):
+        self._mix_arena = arena
+
+    def drop(self, source):
+        """Abandon de `source` par son propriétaire (callback)."""
+        self.src_dropped[source] = True
+        if self.src_refs[source] == 0:
+            self._free_source(source)
+
+    def _free_source(self, source):
+        if self.src_live[source]:
+            self.src_live[source] = False
+            self._finished.append(source)
+
+    def start_voice(self, source, pos=0.0, rate=1.0, loop=True, amp=1.0, fade_in=True, bus=NO_BUS,
+                    sinc=False, delay=0, dur=FOREVER):
+        """Démarre une voix sur `source` (callback) ; retourne son emplacement, ou -1."""
+        if not self.src_live[source]:
+            return -1
+        slot = int(np.argmin(self.active))
+        if self.active[slot]:
+            self.dropped += 1
+            return -1
+        self.source[slot] = source
+        self.offset[slot] = self.src_offset[source]
+        self.length[slot] = self.src_length[source]
+        self.pos[slot] = pos
+        self.rate[slot] = rate
+        self.delay[slot] = delay
+        self.age[slot] = 0
+        self.dur[slot] = dur
+        self.gain[slot] = 0.0 if fade_in else 1.0
+        self.target[slot] = 1.0
+        self.amp[slot] = amp
+        self.pan[slot] = 1.0
+        self.env[slot] = -1
+        self.bus[slot] = bus
+        self.loop[slot] = loop
+        self.sinc[slot] = sinc
+        self.paused[slot] = False
+        self.active[slot] = True
+        self.src_refs[source] += 1
+        return slot
+
+    def room(self, reserve=0):
+        """Emplacements libres au-delà des `reserve` gardés pour d'autres voix (callback)."""
+        return max(0, self.capacity - int(np.count_nonzero(self.active)) - reserve)
+
+    def spawn(self, source, delay, pos, rate, dur, amp, pan, env):
+        """Démarre d'un coup `len(delay)` grains joués une fois sur `source` (callback).
+
+        Par grain : délai d'attaque et durée en frames de sortie, position
+        de départ et vitesse dans la source, gains par canal `pan` (k, 2).
+        `amp` et `env` (forme d'enveloppe) sont communs. L'appelant vérifie
+        la place disponible avec `room`.
+        """
+        k = len(delay)
+        if k == 0 or not self.src_live[source]:
+            return
+        slots = np.flatnonzero(~self.active)[:k]
+        self.source[slots] = source
+        self.offset[slots] = self.src_offset[source]
+        self.length[slots] = self.src_length[source]
+        self.pos[slots] = pos
+        self.rate[slots] = rate
+        self.delay[slots] = delay
+        self.age[slots] = 0
+        self.dur[slots] = dur
+        self.gain[slots] = 1.0
+        self.target[slots] = 1.0
+        self.amp[slots] = amp
+        self.pan[slots] = pan
+        self.env[slots] = env
+        self.bus[slots] = NO_BUS
+        self.loop[slots] = False
+        self.sinc[slots] = False
+        self.paused[slots] = False
+        self.active[slots] = True
+        self.src_refs[source] += k
+
+    def fade_out(self, slot):
+        self.target[slot] = 0.0
+
+    def end_loop(self, slot, frames):
+        """La voix bouclée `slot` s'arrête net après `frames` frames (fin de boucle)."""
+        self.dur[slot] = self.age[slot] + frames
+
+    def set_bus(self, bus, rate, paused):
+        """Vitesse de lecture et pause de toutes les voix du bus `bus`."""
+        sel = self.active & (self.bus == bus)
+        self.rate[sel] = rate
+        self.sinc[sel] = rate != 1.0
+        self.paused[sel] = paused
+        if rate == 1.0:
+            # Lecture à vitesse unité : positions entières, copie exacte de la source
+            self.pos[sel] = np.floor(self.pos[sel])
+
+    def reset_bus(self, bus, keep=-1):
+        """Coupe les voix du bus `bus` sauf `keep`, qui repart du début de sa source."""
+        sel = self.active & (self.bus == bus)
+        if keep >= 0:
+            sel[keep] = False
+            self.pos[keep] = 0.0
+            self.age[keep] = 0
+        if sel.any():
+            self._finish(np.flatnonzero(sel))
+
+    def _finish(self, slots):
+        self.active[slots] = False
+        sources = self.source[slots]
+        np.subtract.at(self.src_refs, sources, 1)
+        for source in np.unique(sources).tolist():
+            if self.src_refs[source] == 0 and self.src_dropped[source]:
+                self._free_source(source)
+
+    def _view(self, buf, v, m, *tail):
+        # Vue contiguë (v, m, ...) au début d'un tampon de travail préalloué
+        size = v * m
+        for k in tail:
+            size *= k
+        return buf[:size].reshape((v, m) + tail)
+
+    def mix(self, out, frames, buses=None):
+        """Ajoute les voix actives hors bus à `out` (frames, 2) ; appelé par le callback.
+
+        Les voix du bus `b` sont sommées dans `buses[b]` ((bus, frames, 2),
+        remis à zéro ici), à charge pour l'appelant de les traiter et de les
+        ajouter à la sortie.
+        """
+        self.apply_commands()
+        step = self.max_frames
+        for i in range(0, frames, step):
+            m = min(step, frames - i)
+            self._mix_block(out[i:i + m], m, None if buses is None else buses[:, i:i + m])
+
+    def _mix_block(self, out, m, buses):
+        if buses is not None:
+            buses.fill(0)
+        idx = np.flatnonzero(self.active & ~self.paused)
+        if idx.size == 0:
+            return
+        bus = self.bus[idx]
+        if (bus >= 0).any():
+            # Voix directes d'abord, puis groupées par bus : chaque somme porte sur des lignes contiguës
+            order = np.argsort(bus, kind='stable')
+            idx = idx[order]
+            bus = bus[order]
+        delay = self.delay[idx]
+        age = self.age[idx]
+        weights, played = self._start_weights(idx, delay, age, m)
+        self._apply_envelopes(weights, played, idx, age, m)
+        samples = self._read(idx, played, delay, m)
+        g1 = self._apply_fades(weights, idx, m)
+        self._sum(out, buses, weights, samples, bus)
+        self._advance(idx, delay, age, g1, m)
+
+    def _start_weights(self, idx, delay, age, m):
+        """Poids (voix, frames) : amplitude, nuls avant l'attaque et après la fin ; frames jouées."""
+        v = idx.size
+        weights = self._view(self._weights, v, m)
+        if delay.any():
+            # Frames jouées par chaque voix depuis son attaque (nul avant l'attaque, poids nul)
+            played = self._view(self._played, v, m)
+            np.subtract(self._t[:m], delay[:, None], out=played)
+            np.greater_equal(played, 0, out=weights, casting='unsafe')
+            np.maximum(played, 0, out=played)
+            weights *= self.amp[idx][:, None]
+        else:
+            played = self._t[:m]
+            weights[:] = self.amp[idx][:, None]
+        remaining = self.dur[idx] - age
+        if (remaining < m).any():
+            # Voix qui se terminent dans ce bloc : poids nul au-delà de leur durée
+            mask = self._view(self._mask, v, m)
+            np.less(played, remaining[:, None], out=mask)
+            weights *= mask
+        return weights, played
+
+    def _apply_envelopes(self, weights, played, idx, age, m):
+        env = self.env[idx]
+        if not (env >= 0).any():
+            return
+        # Enveloppe lue directement dans la table haute résolution de sa forme (-1 : ligne de uns)
+        size = self._env_size
+        k = self._view(self._index_next, idx.size, m)
+        np.add(played, age[:, None], out=k)
+        k *= size - 1
+        k //= np.maximum(self.dur[idx] - 1, 1)[:, None]
+        np.minimum(k, size - 1, out=k)
+        k += (np.where(env < 0, len(self._env_tables) // size - 1, env) * size)[:, None]
+        weights *= np.take(self._env_tables, k, out=self._view(self._fade, idx.size, m))
+
+    def _read(self, idx, played, delay, m):
+        """Échantillons (voix, frames, 2) lus dans l'arène, transposés et panoramiqués."""
+        v = idx.size
+        rate = self.rate[idx]
+        pos = self.pos[idx]
+        # Position de lecture dans la source, bouclée ou bornée à sa fin
+        i0 = self._view(self._index, v, m)
+        interp = ((rate != 1.0) | (pos != np.floor(pos))).any()
+        if interp:
+            x = self._view(self._x, v, m)
+            np.multiply(played, rate[:, None], out=x)
+            x += pos[:, None]
+            np.copyto(i0, x, casting='unsafe')   # x >= 0 : troncature = partie entière
+            frac = self._view(self._frac, v, m)
+            np.subtract(x, i0, out=frac, casting='unsafe')
+            i1 = self._view(self._index_next, v, m)
+            np.add(i0, 1, out=i1)
+        else:
+            # Vitesse unité, positions entières : lecture exacte, sans interpolation
+            np.add(played, pos.astype(np.int64)[:, None], out=i0)
+        for index in ((i0, i1) if interp else (i0,)):
+            self._wrap(index, idx)
+        samples = np.take(self._mix_arena, i0, axis=0, out=self._view(self._samples, v, m, 2))
+        if interp:
+            s1 = np.take(self._mix_arena, i1, axis=0, out=self._view(self._next_samples, v, m, 2))
+            s1 -= samples
+            s1 *= frac[..., None]
+            samples += s1
+        self._read_sinc(samples, idx, delay, m)
+        pan = self.pan[idx]
+        if (pan != 1.0).any():
+            samples *= pan[:, None, :]
+        return samples
+
+    def _wrap(self, index, idx):
+        # Position dans la source -> indice dans l'arène (bouclée, ou bornée à la dernière frame)
+        length = self.length[idx][:, None]
+        loop = self.loop[idx]
+        if loop.any():
+            np.remainder(index, length, out=index, where=loop[:, None])
+        np.minimum(index, length - 1, out=index)
+        index += self.offset[idx][:, None]
+
+    def _read_sinc(self, samples, idx, delay, m):
+        sinc = self.sinc[idx] & self.loop[idx]
+        # Transposition « bande » des voix nommées : noyaux sinc polyphase, voix par voix
+        for r in np.flatnonzero(sinc).tolist():
+            d = min(int(delay[r]), m)
+            if d < m:
+                slot = idx[r]
+                start = int(self.offset[slot])
+                self.resampler.read_loop(samples[r, d:], self._mix_arena[start:start + int(self.length[slot])],
+                                         float(self.pos[slot]), float(self.rate[slot]))
+
+    def _apply_fades(self, weights, idx, m):
+        """Applique gain et fondus d'entrée/sortie ; retourne le gain en fin de bloc."""
+        g0 = self.gain[idx]
+        tgt = self.target[idx]
+        if not (g0 != tgt).any():
+            weights *= g0[:, None]
+            return g0
+        # Rampes linéaires de `xfade_len` échantillons vers la cible, à l'échantillon près
+        fade = self._view(self._fade, idx.size, m)
+        np.multiply(np.sign(tgt - g0)[:, None] / self.xfade_len, self._steps[:m], out=fade)
+        fade += g0[:, None]
+        np.clip(fade, np.minimum(g0, tgt)[:, None], np.maximum(g0, tgt)[:, None], out=fade)
+        weights *= fade
+        return fade[:, -1].copy()
+
+    def _sum(self, out, buses, weights, samples, bus):
+        # Somme pondérée : voix directes dans `out`, voix nommées dans leur bus (lignes triées par bus)
+        v = bus.size
+        direct = int(np.searchsorted(bus, 0))
+        if direct:
+            out += np.einsum('vf,vfc->fc', weights[:direct], samples[:direct])
+        if direct == v:
+            return
+        if buses is None:
+            raise ValueError("voix de bus sans tampons de bus")
+        bounds = np.flatnonzero(np.diff(bus[direct:])) + direct + 1
+        for a, b in zip([direct] + bounds.tolist(), bounds.tolist() + [v]):
+            np.einsum('vf,vfc->fc', weights[a:b], samples[a:b], out=buses[bus[a]])
+
+    def _advance(self, idx, delay, age, g1, m):
+        # Avance des voix ; libération des grains terminés ou éteints
+        n_played = np.clip(m - delay, 0, m)
+        new_pos = self.pos[idx] + n_played * self.rate[idx]
+        np.remainder(new_pos, self.length[idx], out=new_pos, where=self.loop[idx])
+        self.pos[idx] = new_pos
+        self.age[idx] = age + n_played
+        self.delay[idx] = np.maximum(delay - m, 0)
+        self.gain[idx] = g1
+        done = (age + n_played >= self.dur[idx]) | ((g1 == 0.0) & (self.target[idx] == 0.0))
+        if done.any():
+            self._finish(idx[done])
+
+
+def benchmark(voices=256, blocksize=1024, samplerate=44100, seconds=10.0):
+    """Mixe `voices` grains bouclés hors carte son et retourne le CallbackBudget mesuré."""
+    from mixer import CallbackBudget
+    rng = np.random.default_rng(0)
+    pool = VoicePool(capacity=voices, max_frames=blocksize)
+    sources = [pool.add_source(rng.standard_normal((n, 2)).astype(np.float32) * 0.01)
+               for n in rng.integers(int(0.02 * samplerate), int(0.5 * samplerate), size=voices)]
+    pool.apply_commands()
+    for source in sources:
+        pool.start_voice(source, loop=True)
+        pool.drop(source)
+    out = np.zeros((blocksize, 2), dtype=np.float32)
+    stats = CallbackBudget(samplerate)
+    for _ in range(int(seconds * samplerate / blocksize)):
+        t0 = time.perf_counter()
+        out.fill(0)
+        pool.mix(out, blocksize)
+        stats.record(blocksize, time.perf_counter() - t0)
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Mesure du budget CPU du pool de voix")
+    parser.add_argument('--voices', type=int, default=256)
+    parser.add_argument('--blocksize', type=int, default=1024)
+    parser.add_argument('--samplerate', type=int, default=44100)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+    print(benchmark(args.voices, args.blocksize, args.samplerate, args.seconds).summary())
@@ -0,0 +1,332 @@
+"""Vue waveform Matplotlib (backend Qt5Agg), chargée seulement si choisie dans settings.json."""
+from PyQt5.QtWidgets import QSizePolicy
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+import numpy as np
+
+from redraw_scheduler import RedrawScheduler
+from waveform_view import grain_colors, grain_voices
+
+
+class WaveformCanvas(FigureCanvas):
+    def __init__(self, parent=None, max_fps=60):
+        # Figure hors pyplot : pas de gestionnaire global, libérée avec le widget
+        self.fig = Figure(dpi=100)
+        self.ax = self.fig.add_subplot()
+        super().__init__(self.fig)
+        self.setParent(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        # Fond bleu-vert très foncé
+        dark_teal = '#012b2f'
+        self.fig.patch.set_facecolor(dark_teal)
+        
+        self.ax.set_facecolor(dark_teal)
+        
+        self.ax.spines['bottom'].set_color('white')
+        
+        self.ax.spines['top'].set_color('white')
+        
+        self.ax.spines['left'].set_color('white')
+        
+        self.ax.spines['right'].set_color('white')
+        
+        self.ax.title.set_color('white')
+        
+        self.ax.xaxis.label.set_color('white')
+        
+        self.ax.yaxis.label.set_color('white')        
+        self.fig.patch.set_facecolor(dark_teal)
+
+        # ---- Attributs pour la sélection et affichage des grains ----
+        self.selection_start = None  # début de la zone sélectionnée (sec)
+        self.selection_size = 0.5    # durée de la zone sélectionnée (sec)
+        self.data = None             # waveform complète
+        self.sr = None               # samplerate
+        self.selection_patch = None
+        self.grain_patches = []
+        # Pyramide min/max (AudioStore) et courbe tracée à partir de celle-ci
+        self.pyramid = None
+        self.source_sr = None
+        self.wave_line = None
+        # Calque de sélection/marqueurs (artistes animés blittés sur le fond en cache)
+        self.grain_lines = {}
+        self._background = None
+        self._create_overlay()
+        # Zoom et déplacement : rendus regroupés, cadence plafonnée
+        self.redraw = RedrawScheduler(self._render_frame, max_fps, self)
+
+        # RÉTABLIT LES RÉFÉRENCES PERDUES
+        self.parent = parent  # nécessaire pour accéder aux grains et à la zone depuis MainWindow
+        self.zoom_xlim = None  # mémorise la fenêtre de zoom courante
+
+        # Pour le panning fluide
+        self._panning = False
+        self._pan_start_x = None
+        self._pan_xlim_start = None
+
+        self.setMouseTracking(True)
+        self.mpl_connect('button_press_event', self.on_mouse_press)
+        self.mpl_connect('button_release_event', self.on_mouse_release)
+        self.mpl_connect('motion_notify_event', self.on_mouse_move)
+        self.mpl_connect('scroll_event', self.on_scroll)
+        self.mpl_connect('draw_event', self._on_draw)
+
+        self.draw_selection()
+        self.fig.tight_layout(pad=0.2)
+        
+        self.ax.set_xticks([])
+        
+        self.ax.set_yticks([])
+        self.draw()
+        self.zoom_xlim = None
+
+    def plot_waveform(self, data, samplerate, pyramid=None, source_sr=None):
+        """Trace la waveform ; avec une pyramide min/max, seul le niveau adapté à la largeur
+        en pixels de la vue est dessiné (coût indépendant de la longueur du fichier)"""
+        self.ax.clear()
+        self._create_overlay()
+        self.data = data
+        self.sr = samplerate
+        self.pyramid = pyramid
+        self.source_sr = source_sr
+        duration = len(data) / samplerate
+        if pyramid is not None and source_sr:
+            self.wave_line, = self.ax.plot([], [], color='cyan', linewidth=0.8)
+            mins, maxs = pyramid.levels[-1]
+            peak = max(float(np.max(np.abs(mins))), float(np.max(np.abs(maxs))), 1e-3)
+            self.ax.set_ylim(-peak * 1.05, peak * 1.05)
+            self.ax.set_xlim(0, duration)
+            self.update_peaks_view()
+        else:
+            self.wave_line = None
+            times = np.linspace(0, duration, num=len(data))
+            self.ax.plot(times, data, color='cyan', linewidth=0.8)
+        dark_teal = '#012b2f'
+        self.ax.set_facecolor(dark_teal)
+        
+        self.ax.title.set_color('white')
+        
+        self.ax.xaxis.label.set_color('white')
+        
+        self.ax.yaxis.label.set_color('white')        
+        self.ax.spines['bottom'].set_color('white')
+        
+        self.ax.spines['top'].set_color('white')
+        
+        self.ax.spines['left'].set_color('white')
+        
+        self.ax.spines['right'].set_color('white')
+        self.fig.patch.set_facecolor(dark_teal)
+        self.draw_selection()
+        self.fig.tight_layout(pad=0.2)
+        
+        self.ax.set_xticks([])
+        
+        self.ax.set_yticks([])
+        self.draw()
+        self.zoom_xlim = None
+
+    def update_peaks_view(self):
+        """Met à jour la courbe à partir du niveau de pyramide correspondant à la vue courante"""
+        if self.wave_line is None or self.pyramid is None:
+            return
+        x0, x1 = self.ax.get_xlim()
+        width_px = max(1.0, self.ax.bbox.width)
+        # Environ un couple min/max par pixel
+        samples_per_pixel = max(0.0, x1 - x0) * self.source_sr / width_px
+        level = self.pyramid.level_for(samples_per_pixel)
+        bucket = self.pyramid.bucket(level)
+        mins, maxs = self.pyramid.levels[level]
+        i0 = max(0, int(x0 * self.source_sr / bucket) - 1)
+        i1 = min(mins.shape[0], int(x1 * self.source_sr / bucket) + 2)
+        if i1 <= i0:
+            self.wave_line.set_data([], [])
+            return
+        times = np.repeat(np.arange(i0, i1) * (bucket / self.source_sr), 2)
+        values = np.empty(times.shape[0], dtype=np.float32)
+        values[0::2] = mins[i0:i1]
+        values[1::2] = maxs[i0:i1]
+        self.wave_line.set_data(times, values)
+
+    def _render_frame(self):
+        # Appelé par le planificateur : rend uniquement la dernière vue demandée
+        self.update_peaks_view()
+        self.draw()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._background = None
+        # La largeur en pixels change : le niveau de pyramide adapté aussi
+        if getattr(self, 'wave_line', None) is not None:
+            self.update_peaks_view()
+
+    def _create_overlay(self):
+        """(Re)crée la zone jaune et les marqueurs de grains en artistes animés (après ax.clear())"""
+        self.selection_patch = Rectangle((0, 0), 0, 1, transform=self.ax.get_xaxis_transform(),
+                                         color='yellow', alpha=0.25, zorder=1, animated=True, visible=False)
+        self.ax.add_patch(self.selection_patch)
+        self.grain_lines = {}
+        self.grain_patches = []
+        self._background = None
+        self._ensure_grain_lines()
+
+    def _ensure_grain_lines(self):
+        """Crée les marqueurs des voix qui n'en ont pas encore (voix connues une fois le parent attaché)."""
+        voices = grain_voices(getattr(self, 'parent', None))
+        if all(v in self.grain_lines for v in voices):
+            return
+        colors = grain_colors(voices)
+        for grain_type in voices:
+            if grain_type in self.grain_lines:
+                continue
+            # Lignes verticales début et fin
+            self.grain_lines[grain_type] = tuple(
+                self.ax.axvline(0, color=colors[grain_type], linestyle='-', linewidth=2.5, zorder=20,
+                                label=f'{grain_type}_{edge}', animated=True, visible=False)
+                for edge in ('start', 'end'))
+        self.grain_patches = [line for pair in self.grain_lines.values() for line in pair]
+        self._background = None
+
+    def _draw_overlay(self):
+        self.ax.draw_artist(self.selection_patch)
+        for line in self.grain_patches:
+            self.ax.draw_artist(line)
+
+    def _on_draw(self, event):
+        # Après chaque rendu complet : mémorise le fond (sans le calque) puis dessine le calque
+        self._background = self.copy_from_bbox(self.fig.bbox)
+        self._draw_overlay()
+
+    def draw_selection(self):
+        """Met à jour la zone et les marqueurs ; seul le calque est redessiné (blit) sur le fond en cache"""
+        self.selection_patch.set_visible(False)
+        if self.selection_start is not None and self.selection_size > 0 and self.data is not None and len(self.data) > 0:
+            x0 = self.selection_start
+            x1 = min(x0 + self.selection_size, len(self.data)/self.sr)
+            self.selection_patch.set_x(x0)
+            self.selection_patch.set_width(x1 - x0)
+            self.selection_patch.set_visible(True)
+        # --- Affichage des grains colorés, un par voix ---
+        self._ensure_grain_lines()
+        for grain_type, lines in self.grain_lines.items():
+            for line in lines:
+                line.set_visible(False)
+            if self.parent and hasattr(self.parent, '_grain') and hasattr(self.parent, '_grain_start'):
+                grain = self.parent._grain.get(grain_type)
+                sr = self.parent._grain_sr.get(grain_type)
+                start = self.parent._grain_start.get(grain_type)
+                if grain is not None and sr is not None and start is not None and self.data is not None:
+                    t0 = start / sr
+                    t1 = (start + grain.shape[0]) / sr
+                    for line, t in zip(lines, (t0, t1)):
+                        line.set_xdata([t, t])
+                        line.set_visible(True)
+        if self._background is None:
+            # Pas encore de fond en cache (premier rendu, redimensionnement) : rendu complet
+            self.draw()
+            return
+        self.restore_region(self._background)
+        self._draw_overlay()
+        self.blit(self.fig.bbox)
+
+    def zoom_to_selection(self):
+        # Centre la fenêtre sur la zone de prélèvement (sélection), mais élargit si un grain déborde
+        if self.selection_start is not None and self.selection_size > 0 and self.data is not None and self.sr is not None:
+            x0 = self.selection_start
+            x1 = min(x0 + self.selection_size, len(self.data)/self.sr)
+            # Recherche les bornes min/max de tous les grains actifs (début et fin)
+            min_grain = x0
+            max_grain = x1
+            if self.parent and hasattr(self.parent, '_grain_start') and hasattr(self.parent, '_grain') and hasattr(self.parent, '_grain_sr'):
+                for grain_type in grain_voices(self.parent):
+                    start = self.parent._grain_start.get(grain_type)
+                    grain = self.parent._grain.get(grain_type)
+                    sr = self.parent._grain_sr.get(grain_type)
+                    if start is not None and grain is not None and sr is not None:
+                        t_start = start / sr
+                        t_end = (start + grain.shape[0]) / sr
+                        min_grain = min(min_grain, t_start)
+                        max_grain = max(max_grain, t_end)
+            # Affiche la zone la plus large (zone de prélèvement + grains)
+            zone_width = max_grain - min_grain
+            view_width = zone_width * 3
+            center = (min_grain + max_grain) / 2
+            left = max(0, center - view_width / 2)
+            right = min(len(self.data)/self.sr, center + view_width / 2)
+            
+            self.ax.set_xlim([left, right])
+            self.zoom_xlim = (left, right)
+            self.redraw.request()
+
+    def on_mouse_press(self, event):
+        if self.data is None or len(self.data) == 0 or not event.inaxes:
+            return
+        if event.button == 3:  # Clic droit = début de sélection
+            self.parent.zone_start = max(0, event.xdata)
+            self.selection_start = self.parent.zone_start
+            self.draw_selection()
+            # Réinitialise un grain aléatoire dans la zone pour chaque voix
+            for grain_type in grain_voices(self.parent):
+                self.parent.select_random_grain(grain_type=grain_type)
+            # Correction : forcer la mise à jour des lignes de couleur
+            self.draw_selection()
+            self.zoom_to_selection()
+            # Sélectionne un nouveau grain aléatoire à chaque sélection de zone
+            if self.parent:
+                self.parent.on_new_zone_selected()
+        elif event.button == 1:  # Clic gauche = début du panning
+            self._panning = True
+            self._pan_start_x = event.xdata   # position initiale du drag
+            # Correction : stocker la fenêtre courante SANS zoom_to_selection
+            self._pan_xlim_start = self.ax.get_xlim()
+
+    def on_mouse_release(self, event):
+        if self._panning:
+            self._panning = False
+            self._pan_start_x = None
+            self._pan_xlim_start = None
+
+    def on_mouse_move(self, event):
+        # Navigation ultra-fluide : déplacement proportionnel, sans saut, redraw optimisé
+        if self._panning and event.inaxes and self.data is not None and len(self.data) > 0 and event.xdata is not None:
+            dx = event.xdata - self._pan_start_x
+            left0, right0 = self._pan_xlim_start
+            width = right0 - left0
+            duration = len(self.data) / self.sr
+            # Déplacement proportionnel à la largeur de la vue, sans limite
+            new_left = left0 - dx
+            new_right = right0 - dx
+            # Clamp
+            if new_left < 0:
+                new_left = 0
+                new_right = width
+            if new_right > duration:
+                new_right = duration
+                new_left = duration - width
+            # Correction anti-saccade : ne redessiner que si la fenêtre change vraiment
+            if abs(self.ax.get_xlim()[0] - new_left) > 1e-6 or abs(self.ax.get_xlim()[1] - new_right) > 1e-6:
+                self.ax.set_xlim([new_left, new_right])
+                self.redraw.request()
+
+    def on_scroll(self, event):
+        if self.data is None or len(self.data) == 0 or not event.inaxes:
+            return
+        cur_xlim = self.ax.get_xlim()
+        xdata = event.xdata if event.xdata is not None else (cur_xlim[0] + cur_xlim[1]) / 2
+        scale_factor = 0.8 if event.button == 'up' else 1.25
+        new_width = (cur_xlim[1] - cur_xlim[0]) * scale_factor
+        xcenter = xdata
+        left = max(0, xcenter - new_width / 2)
+        right = min(len(self.data)/self.sr, xcenter + new_width / 2)
+        
+        self.ax.set_xlim([left, right])
+        self.zoom_xlim = self.ax.get_xlim()
+        self.redraw.request()
+
+    def get_selection_times(self):
+        if self.selection_start is not None and self.selection_size > 0 and self.data is not None and len(self.data) > 0:
+            t0 = max(0, self.selection_start)
+            t1 = min(len(self.data)/self.sr, t0 + self.selection_size)
+            return t0, t1
+        return None, None
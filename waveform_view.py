@@ -0,0 +1,278 @@
+"""Vue waveform native QPainter : dessin à partir de la pyramide min/max, sans Matplotlib."""
+import itertools
+
+import numpy as np
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+from PyQt5.QtCore import Qt, QRectF, QLineF
+from PyQt5.QtGui import QImage, QPainter, QColor, QPen
+
+from redraw_scheduler import RedrawScheduler
+
+BACKGROUND = (0x01, 0x2b, 0x2f)   # bleu-vert très foncé, comme la vue Matplotlib
+WAVE_COLOR = (0x00, 0xff, 0xff)   # cyan
+GRAIN_COLORS = {'bass': 'deepskyblue', 'medium': 'limegreen', 'treble': 'magenta'}
+EXTRA_COLORS = ('orange', 'gold', 'orchid', 'tomato', 'springgreen', 'dodgerblue')
+
+
+def grain_voices(parent):
+    """Voix nommées de la fenêtre principale (clés de ses grains), dans l'ordre du moteur."""
+    return list(getattr(parent, '_grain', None) or ())
+
+
+def grain_colors(voices):
+    """Couleur des marqueurs de chaque voix : fixe pour les voix par défaut, palette tournante sinon."""
+    extra = itertools.cycle(EXTRA_COLORS)
+    return {v: GRAIN_COLORS.get(v) or next(extra) for v in voices}
+
+
+def column_peaks(mins, maxs, points_per_sec, x0, x1, width):
+    """Min/max par colonne de pixels pour la fenêtre [x0, x1] (secondes).
+
+    `mins`/`maxs` sont des points à `points_per_sec` points par seconde
+    (un niveau de pyramide ou le signal lui-même). Retourne (mins, maxs,
+    valid) de longueur `width` ; `valid` est faux hors du signal.
+    """
+    n = mins.shape[0]
+    edges = (x0 + (x1 - x0) * np.arange(width + 1) / width) * points_per_sec
+    valid = (edges[1:] > 0) & (edges[:-1] < n)
+    starts = np.clip(np.floor(edges[:-1]).astype(np.int64), 0, n - 1)
+    stop = int(min(n, max(np.ceil(edges[-1]), starts[-1] + 1)))
+    col_min = np.minimum.reduceat(mins[:stop], starts)
+    col_max = np.maximum.reduceat(maxs[:stop], starts)
+    # Relie chaque colonne à la précédente pour un tracé continu quand on zoome fort
+    col_min[1:] = np.minimum(col_min[1:], col_max[:-1])
+    col_max[1:] = np.maximum(col_max[1:], col_min[:-1])
+    return col_min, col_max, valid
+
+
+class WaveformView(QWidget):
+    """Waveform dessinée colonne par colonne dans une QImage, marqueurs peints par-dessus.
+
+    Même interface que WaveformCanvas (clic droit : zone, glisser gauche :
+    déplacement, molette : zoom). L'image n'est recalculée que si la vue
+    ou la taille change ; la zone et les marqueurs de grains sont repeints
+    à chaque paintEvent, ce qui ne coûte que quelques primitives.
+    """
+
+    def __init__(self, parent=None, max_fps=60):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+        # ---- Attributs pour la sélection et affichage des grains ----
+        self.selection_start = None  # début de la zone sélectionnée (sec)
+        self.selection_size = 0.5    # durée de la zone sélectionnée (sec)
+        self.data = None             # signal d'affichage
+        self.sr = None               # samplerate du signal d'affichage
+        self.pyramid = None
+        self.source_sr = None
+        self.xlim = (0.0, 1.0)
+        self.ylim = (-1.0, 1.0)
+        self.zoom_xlim = None
+        self._image = None
+        # Zoom et déplacement : rendus regroupés, cadence plafonnée
+        self.redraw = RedrawScheduler(self.repaint, max_fps, self)
+
+        # Référence vers MainWindow pour accéder aux grains et à la zone
+        self.parent = parent
+
+        # Pour le panning fluide
+        self._panning = False
+        self._pan_start_x = None
+        self._pan_xlim_start = None
+
+    def duration(self):
+        return len(self.data) / self.sr
+
+    def plot_waveform(self, data, samplerate, pyramid=None, source_sr=None):
+        self.data = data
+        self.sr = samplerate
+        self.pyramid = pyramid if source_sr else None
+        self.source_sr = source_sr
+        if self.pyramid is not None:
+            mins, maxs = self.pyramid.levels[-1]
+        else:
+            mins = maxs = data
+        peak = max(float(np.max(np.abs(mins))), float(np.max(np.abs(maxs))), 1e-3) if len(data) else 1.0
+        self.ylim = (-peak * 1.05, peak * 1.05)
+        self.xlim = (0.0, self.duration())
+        self.zoom_xlim = None
+        self._image = None
+        self.update()
+
+    def get_xlim(self):
+        return self.xlim
+
+    def set_xlim(self, left, right):
+        if (left, right) != self.xlim:
+            self.xlim = (left, right)
+            self._image = None
+            self.redraw.request()
+
+    def x_to_time(self, x):
+        x0, x1 = self.xlim
+        return x0 + (x1 - x0) * x / max(1, self.width())
+
+    def time_to_x(self, t):
+        x0, x1 = self.xlim
+        if x1 <= x0:
+            return 0.0
+        return (t - x0) * self.width() / (x1 - x0)
+
+    def _render_image(self):
+        """Rastérise la waveform de la vue courante (une colonne min/max par pixel)."""
+        w, h = max(1, self.width()), max(1, self.height())
+        pixels = np.empty((h, w, 4), dtype=np.uint8)
+        pixels[:, :, 0], pixels[:, :, 1], pixels[:, :, 2] = BACKGROUND[2], BACKGROUND[1], BACKGROUND[0]
+        pixels[:, :, 3] = 255
+        if self.data is not None and len(self.data) > 0:
+            x0, x1 = self.xlim
+            if self.pyramid is not None:
+                samples_per_pixel = max(0.0, x1 - x0) * self.source_sr / w
+                level = self.pyramid.level_for(samples_per_pixel)
+                mins, maxs = self.pyramid.levels[level]
+                points_per_sec = self.source_sr / self.pyramid.bucket(level)
+            else:
+                mins = maxs = np.asarray(self.data)
+                points_per_sec = self.sr
+            col_min, col_max, valid = column_peaks(mins, maxs, points_per_sec, x0, x1, w)
+            y0, y1 = self.ylim
+            scale = (h - 1) / (y1 - y0)
+            top = np.floor((y1 - col_max) * scale)
+            bottom = np.ceil((y1 - col_min) * scale)
+            rows = np.arange(h)[:, None]
+            mask = (rows >= top[None, :]) & (rows <= bottom[None, :]) & valid[None, :]
+            pixels[mask] = (WAVE_COLOR[2], WAVE_COLOR[1], WAVE_COLOR[0], 255)
+        image = QImage(pixels.data, w, h, 4 * w, QImage.Format_ARGB32)
+        # Copie : l'image ne doit pas dépendre du tableau numpy temporaire
+        return image.copy()
+
+    def paintEvent(self, event):
+        if self._image is None or self._image.width() != self.width() or self._image.height() != self.height():
+            self._image = self._render_image()
+        painter = QPainter(self)
+        painter.drawImage(0, 0, self._image)
+        h = self.height()
+        # Zone de prélèvement
+        t0, t1 = self.get_selection_times()
+        if t0 is not None:
+            xa, xb = self.time_to_x(t0), self.time_to_x(t1)
+            painter.fillRect(QRectF(xa, 0, xb - xa, h), QColor(255, 255, 0, 64))
+        # --- Affichage des grains colorés, un par voix ---
+        colors = grain_colors(grain_voices(self.parent))
+        for grain_type, start, end in self._grain_bounds():
+            pen = QPen(QColor(colors[grain_type]))
+            pen.setWidthF(2.5)
+            painter.setPen(pen)
+            for t in (start, end):
+                x = self.time_to_x(t)
+                painter.drawLine(QLineF(x, 0, x, h))
+        painter.end()
+
+    def _grain_bounds(self):
+        # (type, début, fin) en secondes des grains présents
+        bounds = []
+        if self.data is None or not self.parent or not hasattr(self.parent, '_grain_start'):
+            return bounds
+        for grain_type in grain_voices(self.parent):
+            grain = self.parent._grain.get(grain_type)
+            sr = self.parent._grain_sr.get(grain_type)
+            start = self.parent._grain_start.get(grain_type)
+            if grain is not None and sr is not None and start is not None:
+                bounds.append((grain_type, start / sr, (start + grain.shape[0]) / sr))
+        return bounds
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._image = None
+
+    def draw_selection(self):
+        # Seul le calque change : l'image de la waveform en cache est réutilisée
+        self.update()
+
+    def zoom_to_selection(self):
+        # Centre la fenêtre sur la zone de prélèvement (sélection), mais élargit si un grain déborde
+        t0, t1 = self.get_selection_times()
+        if t0 is None:
+            return
+        min_grain = t0
+        max_grain = t1
+        for _, start, end in self._grain_bounds():
+            min_grain = min(min_grain, start)
+            max_grain = max(max_grain, end)
+        # Affiche la zone la plus large (zone de prélèvement + grains)
+        view_width = (max_grain - min_grain) * 3
+        center = (min_grain + max_grain) / 2
+        left = max(0, center - view_width / 2)
+        right = min(self.duration(), center + view_width / 2)
+        self.set_xlim(left, right)
+        self.zoom_xlim = (left, right)
+
+    def mousePressEvent(self, event):
+        if self.data is None or len(self.data) == 0:
+            return
+        if event.button() == Qt.RightButton:  # Clic droit = début de sélection
+            self.parent.zone_start = max(0, self.x_to_time(event.x()))
+            self.selection_start = self.parent.zone_start
+            # Réinitialise un grain aléatoire dans la zone pour chaque voix
+            for grain_type in grain_voices(self.parent):
+                self.parent.select_random_grain(grain_type=grain_type)
+            self.draw_selection()
+            self.zoom_to_selection()
+            if self.parent:
+                self.parent.on_new_zone_selected()
+        elif event.button() == Qt.LeftButton:  # Clic gauche = début du panning
+            self._panning = True
+            self._pan_start_x = event.x()
+            self._pan_xlim_start = self.xlim
+
+    def mouseReleaseEvent(self, event):
+        if self._panning:
+            self._panning = False
+            self._pan_start_x = None
+            self._pan_xlim_start = None
+
+    def mouseMoveEvent(self, event):
+        if not self._panning or self.data is None or len(self.data) == 0:
+            return
+        left0, right0 = self._pan_xlim_start
+        width = right0 - left0
+        duration = self.duration()
+        dx = (event.x() - self._pan_start_x) * width / max(1, self.width())
+        new_left = left0 - dx
+        new_right = right0 - dx
+        # Clamp
+        if new_left < 0:
+            new_left = 0
+            new_right = width
+        if new_right > duration:
+            new_right = duration
+            new_left = duration - width
+        self.set_xlim(new_left, new_right)
+
+    def wheelEvent(self, event):
+        if self.data is None or len(self.data) == 0:
+            return
+        x0, x1 = self.xlim
+        xcenter = self.x_to_time(event.pos().x())
+        scale_factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        new_width = (x1 - x0) * scale_factor
+        left = max(0, xcenter - new_width / 2)
+        right = min(self.duration(), xcenter + new_width / 2)
+        self.set_xlim(left, right)
+        self.zoom_xlim = self.xlim
+
+    def get_selection_times(self):
+        if self.selection_start is not None and self.selection_size > 0 and self.data is not None and len(self.data) > 0:
+            t0 = max(0, self.selection_start)
+            t1 = min(self.duration(), t0 + self.selection_size)
+            return t0, t1
+        return None, None
+
+
+def make_waveform_widget(backend, parent=None, max_fps=60):
+    """Crée la vue waveform : 'qpainter' (native) ou 'matplotlib' (importé seulement dans ce cas)."""
+    if backend == 'qpainter':
+        return WaveformView(parent, max_fps)
+    from waveform_canvas import WaveformCanvas
+    return WaveformCanvas(parent, max_fps)